@@ -17,4 +17,6 @@ admin.site.register(Group)
 admin.site.register(Solution)
 admin.site.register(SolutionType)
 admin.site.register(SolutionExercise)
-admin.site.register(SolutionTest)
\ No newline at end of file
+admin.site.register(SolutionTest)
+admin.site.register(TestCaseResult)
+admin.site.register(GradingJob)
\ No newline at end of file
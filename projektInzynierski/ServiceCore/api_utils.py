@@ -0,0 +1,33 @@
+from rest_framework.pagination import CursorPagination
+
+# Wspolne elementy widokow API: stronicowanie oraz wybor zwracanych pol.
+
+def get_query_param_list(request, name):
+    # parametr w postaci ?name=a,b,c zwracany jako lista ['a', 'b', 'c']
+    value = request.query_params.get(name, '')
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def is_query_param_true(request, name):
+    return request.query_params.get(name, '').lower() in ('1', 'true', 'yes')
+
+class OptionalCursorPagination(CursorPagination):
+    # stronicowanie kursorem wlaczane jedynie parametrem ?page_size=<n> lub ?cursor=<kursor>,
+    # bez nich lista zwracana jest w calosci (jak dotychczas)
+    ordering = 'pk'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_size_query_param not in request.query_params and self.cursor_query_param not in request.query_params:
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
+
+class DynamicFieldsViewMixin():
+    # przekazanie parametrow ?fields= i ?expand= do serializera (DynamicFieldsMixin)
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', get_query_param_list(self.request, 'fields'))
+        kwargs.setdefault('expand', get_query_param_list(self.request, 'expand'))
+
+        return super().get_serializer(*args, **kwargs)
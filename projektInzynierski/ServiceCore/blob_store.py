@@ -0,0 +1,76 @@
+import hashlib
+import os
+import tempfile
+import time
+
+from django.conf import settings
+
+# Magazyn plikow z rozwiazaniami adresowany skrotem zawartosci (SHA-256).
+# Plik zapisywany jest jako <BASE_DIR>/solution_blobs/ab/cd/abcd...; identyczne rozwiazania
+# zajmuja na dysku jedno miejsce, a sciezka nie zalezy od nazw zadan, grup i uzytkownikow.
+# Zapisane pliki nie sa zmieniane - nowa zawartosc to nowy skrot.
+
+SOLUTION_BLOBS_DIRECTORY_ROOT = "solution_blobs"
+TEMPORARY_FILE_PREFIX = ".tmp-"
+
+def get_blob_store_root():
+    return os.path.join(settings.BASE_DIR, SOLUTION_BLOBS_DIRECTORY_ROOT)
+
+def get_blob_path(blob_hash):
+    return os.path.join(get_blob_store_root(), blob_hash[:2], blob_hash[2:4], blob_hash)
+
+def store_blob(content):
+    # zapisanie zawartosci (bytes) i zwrocenie jej skrotu
+    blob_hash = hashlib.sha256(content).hexdigest()
+    blob_path = get_blob_path(blob_hash)
+
+    if os.path.isfile(blob_path):
+        # odswiezenie czasu modyfikacji - plik nie zostanie usuniety przez --gc w trakcie sprawdzania
+        try:
+            os.utime(blob_path)
+        except OSError:
+            pass
+
+        return blob_hash
+
+    blob_dir = os.path.dirname(blob_path)
+    os.makedirs(blob_dir, exist_ok=True)
+
+    # zapis do pliku tymczasowego i przeniesienie - inne procesy nie odczytaja niepelnego pliku
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=blob_dir, prefix=TEMPORARY_FILE_PREFIX)
+
+    try:
+        with os.fdopen(file_descriptor, 'wb') as blob_file:
+            blob_file.write(content)
+
+        os.chmod(temporary_path, 0o444)
+        os.replace(temporary_path, blob_path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+    return blob_hash
+
+def store_blob_file(path):
+    with open(path, 'rb') as source_file:
+        return store_blob(source_file.read())
+
+def iter_blob_hashes():
+    for subdir, dirs, files in os.walk(get_blob_store_root()):
+        for file in files:
+            if not file.startswith(TEMPORARY_FILE_PREFIX):
+                yield file
+
+def get_blob_age(blob_hash):
+    # czas w sekundach od ostatniego zapisu pliku
+    return time.time() - os.path.getmtime(get_blob_path(blob_hash))
+
+def remove_blob(blob_hash):
+    blob_path = get_blob_path(blob_hash)
+
+    if os.path.isfile(blob_path):
+        os.remove(blob_path)
+        return True
+
+    return False
@@ -0,0 +1,56 @@
+from collections import OrderedDict
+
+from django.db.models import Case, Prefetch, Value, When
+
+def apply_eager_loading(queryset, lookups):
+    # pobranie z wyprzedzeniem relacji wykorzystywanych przez serializery
+    #   - lookups - sciezki relacji w postaci 'relacja__relacja__...'
+    # relacje jednowartosciowe (ForeignKey, OneToOne) dolaczane sa przez select_related,
+    # a kazda relacja wielowartosciowa pobierana jest jednym zapytaniem (Prefetch),
+    # ktorego queryset rekurencyjnie pobiera pozostala czesc sciezek
+    select_lookups = []
+    nested_lookups = OrderedDict()
+
+    for lookup in lookups:
+        model = queryset.model
+        parts = lookup.split('__')
+
+        for index, part in enumerate(parts):
+            field = model._meta.get_field(part)
+            model = field.related_model
+
+            if field.many_to_many or field.one_to_many:
+                if index > 0:
+                    select_lookups.append('__'.join(parts[:index]))
+
+                related_model, rest_lookups = nested_lookups.setdefault('__'.join(parts[:index + 1]), (model, []))
+
+                if index + 1 < len(parts):
+                    rest_lookups.append('__'.join(parts[index + 1:]))
+                break
+        else:
+            select_lookups.append(lookup)
+
+    prefetches = [Prefetch(path, queryset=apply_eager_loading(related_model.objects.all(), rest_lookups))
+                  for path, (related_model, rest_lookups) in nested_lookups.items()]
+
+    return queryset.select_related(*select_lookups).prefetch_related(*prefetches)
+
+def bulk_update_fields(model, objects, fields, batch_size=500):
+    # zapisanie pol 'fields' wielu obiektow jednym zapytaniem UPDATE ... SET pole = CASE WHEN pk = ... na partie
+    # (Django 2.1 nie ma QuerySet.bulk_update)
+    objects = [obj for obj in objects if obj.pk is not None]
+
+    for start in range(0, len(objects), batch_size):
+        batch = objects[start:start + batch_size]
+        updates = {}
+
+        for field_name in fields:
+            field = model._meta.get_field(field_name)
+            updates[field.attname] = Case(*[When(pk=obj.pk, then=Value(getattr(obj, field.attname), output_field=field))
+                                            for obj in batch],
+                                          output_field=field)
+
+        model.objects.filter(pk__in=[obj.pk for obj in batch]).update(**updates)
+
+    return len(objects)
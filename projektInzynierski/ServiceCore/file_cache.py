@@ -0,0 +1,40 @@
+import os
+import threading
+
+from django.conf import settings
+
+from ServiceCore.lru_cache import LRUCache
+
+# Pamiec podreczna zawartosci plikow (rozwiazan, raportow z testow) odczytywanych
+# przez serializery. Kluczem jest sciezka, czas modyfikacji i rozmiar pliku, wiec
+# po nadpisaniu pliku odczytywana jest jego nowa zawartosc.
+
+_file_cache = None
+_file_cache_lock = threading.Lock()
+
+def get_file_cache():
+    global _file_cache
+
+    with _file_cache_lock:
+        if _file_cache is None:
+            _file_cache = LRUCache(settings.FILE_CONTENT_CACHE_SIZE)
+
+    return _file_cache
+
+def read_file_cached(path):
+    # zwraca zawartosc pliku lub None, jezeli plik nie istnieje
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    content = get_file_cache().get(key)
+
+    if content is None:
+        with open(path, 'r') as f:
+            content = f.read()
+
+        get_file_cache().put(key, content)
+
+    return content
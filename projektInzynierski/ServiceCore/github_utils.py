@@ -9,15 +9,14 @@ from subprocess import PIPE
 # Aktualnie nie wykorzystywane
 def getRemoteRepository(repository_url, destination_path):
     '''
-    zmiana katalogu - chdir
     git init
     git remote add origin repository
     git pull origin master
-    powrot do glownego katalogu - chdir
+    - polecenia uruchamiane w katalogu destination_path (cwd),
+      bez zmiany katalogu roboczego procesu
     '''
     logger = logging.getLogger(os.path.basename(__file__)) 
-    logger.info("Zmiana katalogu roboczego na " + destination_path)
-    os.chdir(destination_path)
+    logger.info("Pobieranie repozytorium do katalogu " + destination_path)
 
     git_commands = [
         ['git', 'init'],
@@ -27,12 +26,10 @@ def getRemoteRepository(repository_url, destination_path):
 
     for git_command in git_commands:
         process = subprocess.run(
-            git_command, stdout=PIPE, stderr=PIPE, shell=False)
+            git_command, stdout=PIPE, stderr=PIPE, shell=False, cwd=destination_path)
         logger.info("Wynik wykonania instrukcji " +
                          " ".join(git_command) +
                          " - " + str(process.stdout.decode("utf-8")) +
                          str(process.stderr.decode("utf-8")))
     
-    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    
     return True
@@ -0,0 +1,69 @@
+import hashlib
+import logging
+import subprocess
+import threading
+
+from subprocess import PIPE
+from django.conf import settings
+
+from ServiceCore.models import UnitTest
+from ServiceCore.lru_cache import LRUCache
+
+# Pamiec podreczna wynikow sprawdzania rozwiazan.
+# Kluczem jest skrot z (zawartosc pliku z rozwiazaniem, tresc unit testow cwiczenia,
+# wersja srodowiska uruchomieniowego), wiec ponownie nadeslane identyczne rozwiazanie
+# nie jest testowane drugi raz. Zmiana unit testow zmienia klucz, dlatego nieaktualne
+# wyniki nie moga zostac zwrocone rowniez w innych procesach.
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+_runtime_versions = {}
+
+def get_grading_result_cache():
+    global _result_cache
+
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = LRUCache(settings.GRADING_RESULT_CACHE_SIZE)
+
+    return _result_cache
+
+def get_unit_tests_hash(exercise):
+    # skrot tresci unit testow cwiczenia
+    unit_tests_hash = hashlib.sha256()
+
+    for content in UnitTest.objects.filter(exercise=exercise).order_by('pk').values_list('content', flat=True):
+        unit_tests_hash.update(content.encode("utf-8"))
+        unit_tests_hash.update(b"\0")
+
+    return unit_tests_hash.hexdigest()
+
+def get_runtime_version(command):
+    # wersja srodowiska (np. ['python', '--version']) - odczytywana raz na proces
+    key = tuple(command)
+
+    if key not in _runtime_versions:
+        try:
+            process = subprocess.run(command, stdout=PIPE, stderr=PIPE, shell=False, timeout=30)
+            _runtime_versions[key] = (process.stdout + process.stderr).decode("utf-8", errors='ignore').strip()
+        except (OSError, subprocess.TimeoutExpired):
+            _runtime_versions[key] = "unknown"
+
+    return _runtime_versions[key]
+
+def get_grading_cache_key(solution_bytes, exercise, runtime_version):
+    cache_key = hashlib.sha256()
+    cache_key.update(hashlib.sha256(solution_bytes).digest())
+    cache_key.update(get_unit_tests_hash(exercise).encode("utf-8"))
+    cache_key.update(runtime_version.encode("utf-8"))
+
+    return cache_key.hexdigest()
+
+def invalidate_exercise_results(exercise):
+    # usuniecie wynikow dla cwiczenia, ktorego unit testy zostaly zmienione
+    removed = get_grading_result_cache().remove_if(lambda key, value: value['exercise_pk'] == exercise.pk)
+
+    if removed:
+        logging.getLogger(__name__).info("Usunieto " + str(removed) + " wynikow z pamieci podrecznej dla cwiczenia pk=" + str(exercise.pk))
+
+    return removed
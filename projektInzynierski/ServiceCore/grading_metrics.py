@@ -0,0 +1,80 @@
+import json
+import logging
+import math
+import time
+
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+# Pomiar czasu etapow sprawdzania rozwiazania.
+# Executor mierzy etapy (PhaseTimer), a process_grading_job zapisuje pomiary zlecenia
+# w GradingJob.timings ({"labels": {...}, "phases": {etap: sekundy}}) - dzieki temu statystyki
+# obejmuja wszystkie procesy workerow. Etapy moga byc zagniezdzone (np. run_tests zawiera
+# parse_results i save_solution). Przy GRADING_TIMINGS_LOG pomiary kazdego zlecenia zapisywane
+# sa rowniez jako wiersz JSON w logu TIMINGS_LOGGER_NAME.
+
+TIMINGS_LOGGER_NAME = 'grading.timings'
+PERCENTILES = (50, 95, 99)
+LABEL_NAMES = ('language', 'solution_type', 'task_type')
+
+class PhaseTimer():
+    def __init__(self):
+        self.phases = OrderedDict()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        # etap wykonany kilka razy - czasy sa sumowane
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def as_dict(self):
+        return OrderedDict((name, round(seconds, 6)) for name, seconds in self.phases.items())
+
+def percentile(sorted_values, percent):
+    # percentyl metoda najblizszej pozycji (nearest-rank)
+    if not sorted_values:
+        return None
+
+    rank = max(1, int(math.ceil(percent / 100.0 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+def summarize(values):
+    values = sorted(values)
+    summary = OrderedDict([('count', len(values)),
+                           ('mean', round(sum(values) / len(values), 6) if values else None)])
+
+    for percent in PERCENTILES:
+        summary['p' + str(percent)] = percentile(values, percent)
+
+    summary['max'] = values[-1] if values else None
+    return summary
+
+def get_phase_statistics(timings_records):
+    # statystyki etapow pogrupowane wedlug (etap, jezyk, rodzaj rozwiazania, rodzaj zadania)
+    samples = defaultdict(list)
+
+    for record in timings_records:
+        labels = tuple(record.get('labels', {}).get(name) for name in LABEL_NAMES)
+
+        for phase, seconds in record.get('phases', {}).items():
+            samples[(phase,) + labels].append(seconds)
+
+    statistics = []
+
+    for key in sorted(samples, key=lambda key: tuple(str(part) for part in key)):
+        entry = OrderedDict([('phase', key[0])])
+        entry.update(zip(LABEL_NAMES, key[1:]))
+        entry.update(summarize(samples[key]))
+        statistics.append(entry)
+
+    return statistics
+
+def log_timings(record):
+    logging.getLogger(TIMINGS_LOGGER_NAME).info(json.dumps(record))
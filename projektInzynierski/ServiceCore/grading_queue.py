@@ -0,0 +1,338 @@
+import json
+import logging
+import threading
+import time
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.http import QueryDict
+from django.utils import timezone
+
+from ServiceCore.models import GradingJob
+from ServiceCore.db_utils import bulk_update_fields
+from ServiceCore.executor import Executor
+from ServiceCore.python_executor import PythonExecutor
+from ServiceCore.java_executor import JavaExecutor
+from ServiceCore import python_runner
+from ServiceCore import sandbox_pool
+from ServiceCore.grading_metrics import PhaseTimer, log_timings
+from ServiceCore.metrics import observe_grading_job, start_metrics_server
+from ServiceCore.utils import createUserSolutionDirectory, getExerciseDirectoryRootPath, getUserSolutionLockPath, workspaceLock
+
+# Kolejka zlecen sprawdzania rozwiazan oparta o tabele GradingJob.
+# Widok SolutionViewSet.create jedynie zapisuje zlecenie, a rozwiazania
+# sa testowane przez workery uruchamiane poleceniem run_grading_workers.
+
+GRADING_JOB_RESULT_FIELDS = ['status', 'execution_success', 'unit_tests_passed', 'message', 'test_results', 'timings', 'finished_at']
+GRADING_BATCH_SAVE_SIZE = 100
+
+def get_concrete_executor(language):
+    # zwraca executor odpowiedni dla jezyka programowania cwiczenia
+    if language.name == 'Python':
+        return PythonExecutor()
+    elif language.name == 'Java':
+        return JavaExecutor()
+
+    return None
+
+def enqueue_solution(user, task, exercise, data):
+    # zapisanie danych requesta w kolejce - QueryDict zapisywany jest jako
+    # slownik klucz -> lista wartosci, plik z rozwiazaniem jako tekst
+    payload = {}
+    file_name = None
+    file_content = None
+
+    if hasattr(data, 'lists'):
+        items = data.lists()
+    else:
+        items = [(key, value if isinstance(value, list) else [value]) for key, value in data.items()]
+
+    for key, values in items:
+        if key == 'file':
+            uploaded_file = values[-1]
+
+            if uploaded_file is not None and hasattr(uploaded_file, 'read'):
+                file_name = uploaded_file.name
+                file_content = uploaded_file.read().decode("utf-8", errors='ignore')
+            continue
+
+        payload[key] = [str(value) if value is not None else None for value in values]
+
+    return GradingJob.objects.create(user=user,
+                                     task=task,
+                                     exercise=exercise,
+                                     payload=json.dumps(payload),
+                                     file_name=file_name,
+                                     file_content=file_content)
+
+def build_solution_data(job):
+    # odtworzenie danych requesta w postaci oczekiwanej przez executory
+    solution_data = QueryDict(mutable=True)
+
+    for key, values in json.loads(job.payload).items():
+        solution_data.setlist(key, values)
+
+    if job.file_name is not None:
+        solution_data['file'] = ContentFile(job.file_content.encode("utf-8"), name=job.file_name)
+    elif 'file' not in solution_data:
+        solution_data['file'] = None
+
+    return solution_data
+
+def claim_job(job):
+    # oznaczenie zlecenia jako RUNNING - udaje sie tylko jednemu workerowi
+    claimed = GradingJob.objects.filter(pk=job.pk, status=GradingJob.PENDING).update(status=GradingJob.RUNNING,
+                                                                                    started_at=timezone.now())
+    return claimed == 1
+
+def claim_next_job():
+    # pobranie najstarszego oczekujacego zlecenia
+    while True:
+        job = GradingJob.objects.filter(status=GradingJob.PENDING).order_by('created_at', 'pk').first()
+
+        if job is None:
+            return None
+
+        if claim_job(job):
+            job.refresh_from_db()
+            return job
+
+def requeue_stale_jobs():
+    # zlecenia w stanie RUNNING dluzej niz GRADING_JOB_STALE_TIMEOUT sekund
+    # (np. po awarii workera) wracaja do kolejki
+    stale_before = timezone.now() - timedelta(seconds=settings.GRADING_JOB_STALE_TIMEOUT)
+
+    return GradingJob.objects.filter(status=GradingJob.RUNNING,
+                                     started_at__lt=stale_before).update(status=GradingJob.PENDING,
+                                                                         started_at=None)
+
+def execute_job(concreteExecutor, job, sandbox_path=None):
+    concreteExecutor.configure(job.user, job.task, build_solution_data(job), sandbox_path)
+
+    solExecutor = Executor(concreteExecutor)
+    return (solExecutor, solExecutor.execute())
+
+def process_grading_job(job, save=True):
+    # uruchomienie executora dla zlecenia i zapisanie wyniku (save=False - wynik zapisuje wywolujacy)
+    logger = logging.getLogger(__name__)
+    logger.info("Sprawdzanie zlecenia pk=" + str(job.pk))
+    concreteExecutor = None
+    start = time.perf_counter()
+
+    try:
+        task = job.task
+        exercise = job.exercise if job.exercise is not None else task.exercise
+        concreteExecutor = get_concrete_executor(exercise.language)
+
+        if concreteExecutor is None:
+            raise ValueError("Brak executora dla jezyka " + exercise.language.name)
+
+        # rozwiazania studenta do zadania sprawdzane sa pojedynczo (blokada katalogu),
+        # a plik z rozwiazaniem zachowywany jest w magazynie blob_store
+        with workspaceLock(getUserSolutionLockPath(task, job.user)):
+            if settings.GRADING_SANDBOX_ENABLED:
+                # testowanie w piaskownicy z puli - w miare mozliwosci z unit testami tego cwiczenia
+                with sandbox_pool.get_sandbox_pool().sandbox(exercise.language.name.lower(),
+                                                             getExerciseDirectoryRootPath(exercise)) as sandbox_path:
+                    (solExecutor, (execution_success, unit_tests_passed, message)) = execute_job(concreteExecutor, job, sandbox_path)
+            else:
+                # katalog z rozwiazaniami studenta tworzony jest przy pierwszym sprawdzaniu
+                with concreteExecutor.timer.phase('create_workspace'):
+                    if createUserSolutionDirectory(task, task.assigned_to, job.user):
+                        logger.info("Utworzono katalog z rozwiazaniami uzytkownika " + job.user.username + " dla zadania pk=" + str(task.pk))
+
+                (solExecutor, (execution_success, unit_tests_passed, message)) = execute_job(concreteExecutor, job)
+
+        job.status = GradingJob.DONE
+        job.execution_success = execution_success
+        job.unit_tests_passed = unit_tests_passed
+        job.message = message
+        job.test_results = json.dumps(solExecutor.get_result())
+
+        logger.info("Wynik dzialania Executora: Wykonanie testów: " + str(execution_success) + \
+                    "; Zaliczenie testow jednostkowych: " + str(unit_tests_passed) + \
+                    "; Komunikat executora: " + message)
+    except Exception as e:
+        logger.info("Nie udalo sie sprawdzic zlecenia pk=" + str(job.pk) + " - " + str(e))
+        job.status = GradingJob.FAILED
+        job.execution_success = False
+        job.unit_tests_passed = False
+        job.message = "Nie udalo sie przetestowac kodu"
+
+    job.finished_at = timezone.now()
+    timings = get_job_timings(job, concreteExecutor, time.perf_counter() - start)
+    job.timings = json.dumps(timings)
+    observe_grading_job(timings['labels'].get('language') or 'unknown', job.status, timings['phases'])
+
+    if settings.GRADING_TIMINGS_LOG:
+        log_timings(dict(json.loads(job.timings), job=job.pk, status=job.status, finished_at=job.finished_at.isoformat()))
+
+    if save:
+        job.save(update_fields=GRADING_JOB_RESULT_FIELDS)
+
+    return job
+
+def get_job_timings(job, concreteExecutor, total):
+    # czasy etapow zlecenia wraz z oczekiwaniem w kolejce i calkowitym czasem sprawdzania
+    timer = concreteExecutor.timer if concreteExecutor is not None else PhaseTimer()
+    phases = timer.as_dict()
+
+    if job.started_at is not None and job.created_at is not None:
+        phases['queue_wait'] = round((job.started_at - job.created_at).total_seconds(), 6)
+
+    phases['total'] = round(total, 6)
+
+    labels = concreteExecutor.getTimingLabels() if concreteExecutor is not None else {}
+    return {'labels': labels, 'phases': phases}
+
+def get_regrade_source(solution_exercise):
+    # zawartosc zapisanego pliku z rozwiazaniem w postaci rozwiazania z edytora
+    with open(solution_exercise.pathToFile, 'r') as solution_file:
+        source = solution_file.read()
+
+    # executor Javy dodaje instrukcje package do rozwiazania z edytora
+    if solution_exercise.exercise.language.name == 'Java':
+        lines = source.split('\n', 1)
+
+        if len(lines) == 2 and lines[0].strip().startswith('package '):
+            source = lines[1]
+
+    return source
+
+def enqueue_regrade(solution_exercises):
+    # dodanie do kolejki ponownego sprawdzenia podanych rozwiazan cwiczen (jedna partia zlecen)
+    logger = logging.getLogger(__name__)
+    batch = uuid.uuid4().hex
+    jobs = []
+
+    for solution_exercise in solution_exercises.select_related('solution__user', 'solution__task__taskType', 'exercise__language'):
+        task = solution_exercise.solution.task
+
+        try:
+            source = get_regrade_source(solution_exercise)
+        except (OSError, UnicodeDecodeError) as e:
+            logger.info("Pominieto rozwiazanie pk=" + str(solution_exercise.pk) + " - " + str(e))
+            continue
+
+        payload = {'taskPk': [str(task.pk)], 'solutionType': ['Editor'], 'solution': [source]}
+
+        if task.taskType.name == 'Test':
+            payload['exercisePk'] = [str(solution_exercise.exercise.pk)]
+
+        jobs.append(GradingJob(user=solution_exercise.solution.user,
+                               task=task,
+                               exercise=solution_exercise.exercise,
+                               payload=json.dumps(payload),
+                               batch=batch))
+
+    GradingJob.objects.bulk_create(jobs)
+    logger.info("Dodano do kolejki " + str(len(jobs)) + " zlecen ponownego sprawdzenia (partia " + batch + ")")
+
+    return (batch, len(jobs))
+
+def run_grading_batch(batch, workers_number, progress=None):
+    # sprawdzenie oczekujacych zlecen partii w puli watkow
+    #   - progress(liczba sprawdzonych, liczba wszystkich, zlecenie) - wywolywane po kazdym zleceniu
+    # wyniki zapisywane sa zbiorczo (bulk_update_fields) co GRADING_BATCH_SAVE_SIZE zlecen i na koniec
+    jobs = list(GradingJob.objects.filter(batch=batch, status=GradingJob.PENDING)
+                .select_related('user', 'task__taskType', 'exercise__language').order_by('pk'))
+    finished_jobs = []
+    unsaved_jobs = []
+
+    def grade(job):
+        try:
+            if not claim_job(job):
+                return None
+
+            job.status = GradingJob.RUNNING
+            job.started_at = timezone.now()
+            return process_grading_job(job, save=False)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers_number)) as pool:
+        futures = [pool.submit(grade, job) for job in jobs]
+
+        for future in as_completed(futures):
+            job = future.result()
+
+            if job is None:
+                # zlecenie pobral inny worker
+                continue
+
+            finished_jobs.append(job)
+            unsaved_jobs.append(job)
+
+            if len(unsaved_jobs) >= GRADING_BATCH_SAVE_SIZE:
+                bulk_update_fields(GradingJob, unsaved_jobs, GRADING_JOB_RESULT_FIELDS + ['started_at'])
+                unsaved_jobs = []
+
+            if progress is not None:
+                progress(len(finished_jobs), len(jobs), job)
+
+    bulk_update_fields(GradingJob, unsaved_jobs, GRADING_JOB_RESULT_FIELDS + ['started_at'])
+
+    return finished_jobs
+
+def start_regrade(solution_exercises):
+    # ponowne sprawdzenie rozwiazan - w trybie synchronicznym od razu w procesie serwera
+    (batch, jobs_number) = enqueue_regrade(solution_exercises)
+
+    if not settings.GRADING_QUEUE_ASYNC:
+        run_grading_batch(batch, settings.GRADING_REGRADE_WORKERS)
+
+    return (batch, jobs_number)
+
+def run_worker(poll_interval=None):
+    # petla workera - pobiera i sprawdza kolejne zlecenia
+    logger = logging.getLogger(__name__)
+
+    if poll_interval is None:
+        poll_interval = settings.GRADING_WORKER_POLL_INTERVAL
+
+    requeued = requeue_stale_jobs()
+
+    if requeued:
+        logger.info("Przywrocono do kolejki " + str(requeued) + " przerwanych zlecen")
+
+    while True:
+        job = claim_next_job()
+
+        if job is None:
+            # zamkniecie polaczenia, aby nie trzymac go podczas bezczynnosci
+            connection.close()
+            time.sleep(poll_interval)
+            continue
+
+        process_grading_job(job)
+
+def run_worker_pool(threads_number, poll_interval=None, metrics_port=None):
+    # uruchomienie kilku workerow w watkach jednego procesu - executory nie zmieniaja
+    # katalogu roboczego procesu, wiec rozwiazania moga byc sprawdzane rownolegle
+    # metrics_port - port, na ktorym proces udostepnia metryki (ServiceCore.metrics)
+    if metrics_port is not None:
+        start_metrics_server(metrics_port, settings.METRICS_SERVER_ADDRESS)
+        logging.getLogger(__name__).info("Metryki workera dostepne pod adresem " + (settings.METRICS_SERVER_ADDRESS or '*') + ":" + str(metrics_port))
+
+    if settings.PYTHON_RUNNER_ENABLED:
+        python_runner.warm_up()
+
+    sandbox_pool.warm_up()
+
+    if threads_number == 1:
+        run_worker(poll_interval)
+        return
+
+    threads = [threading.Thread(target=run_worker, args=(poll_interval,), daemon=True)
+               for index in range(threads_number)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
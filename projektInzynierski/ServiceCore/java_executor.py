@@ -3,39 +3,69 @@ import logging
 
 from subprocess import PIPE
 from shutil import copy
+from xml.etree import ElementTree
 
 from django.conf import settings
-from ServiceCore.models import Solution, SolutionExercise, SolutionTest
+from ServiceCore.models import Solution, SolutionExercise, SolutionTest, TestCaseResult
 from ServiceCore.solution_executor import *
 from ServiceCore.unit_tests_utils import get_java_package_name_from_file, insert_java_package_instruction
+from ServiceCore.grading_cache import get_runtime_version
+from ServiceCore.jvm_daemon import get_jvm_daemon, get_test_classes_cache_path, format_surefire_report, JvmDaemonTimeout
+
+UNIT_TEST_CLASS_NAME = "UnitTest"
+
+def parse_surefire_xml_report(report_path):
+    # wyniki poszczegolnych testow z raportu XML surefire (TEST-<klasa testowa>.xml)
+    test_cases = []
+
+    for test_case in ElementTree.parse(report_path).getroot().iter('testcase'):
+        status = TestCaseResult.PASSED
+        message = None
+
+        for tag, tag_status in (('failure', TestCaseResult.FAILED), ('error', TestCaseResult.ERROR), ('skipped', TestCaseResult.SKIPPED)):
+            element = test_case.find(tag)
+
+            if element is not None:
+                status = tag_status
+                message = element.get('message') or element.text
+                break
+
+        test_cases.append({"name": test_case.get('name'),
+                           "status": status,
+                           "duration": float((test_case.get('time') or '0').replace(',', '')),
+                           "message": message})
+
+    return test_cases
 
 class JavaExecutor(SolutionExecutor):
+    languageName = 'Java'
+
     def __init__(self):
         SolutionExecutor.__init__(self)
         self.logger = logging.getLogger(self.__class__.__name__)
         self.testCommand = [settings.MAVEN_HOME, 'test']
+        self.exercisePath = None
     
     def configureRuntime(self):
-        group = self.task.assigned_to
-                
         if self.task.taskType.name == 'Exercise':
-            self.fs.location = getUserSolutionPath(self.task, group, self.user)
+            self.fs.location = self.getWorkspacePath()
         else:
             exercise_pk = self.solutionData['exercisePk']
-            self.fs.location = getUserSolutionPath(self.task, group, self.user, self.task.test.exercises.get(pk=exercise_pk))
+            self.fs.location = self.getWorkspacePath(self.task.test.exercises.get(pk=exercise_pk))
 
         self.fs.location = os.path.join(self.fs.location, 'src', 'main', 'java')
 
-        for filename in os.listdir(self.fs.location):
-            file_path = os.path.join(self.fs.location, filename)
-            try:
-                if os.path.isfile(file_path):
-                    os.unlink(file_path)
-                else:
-                    print(file_path, "to nie jest plik")
-            except Exception as e:
-                self.logger.info("Nie udalo sie usunac istniejacego rozwiazania")
-                print("Nie udalo sie usunac istniejacego rozwiazania")
+        with self.timer.phase('cleanup'):
+            for filename in os.listdir(self.fs.location):
+                file_path = os.path.join(self.fs.location, filename)
+                try:
+                    if os.path.isfile(file_path):
+                        os.unlink(file_path)
+                    else:
+                        print(file_path, "to nie jest plik")
+                except Exception as e:
+                    self.logger.info("Nie udalo sie usunac istniejacego rozwiazania")
+                    print("Nie udalo sie usunac istniejacego rozwiazania")
 
         self.solutionType = SolutionType.objects.get(name=self.solutionData['solutionType'])
 
@@ -54,18 +84,17 @@ class JavaExecutor(SolutionExecutor):
                 self.logger.info("Niepoprawny format pliku")
                 return
 
-            group = self.task.assigned_to
-
-            self.fs.location = getUserSolutionPath(self.task, group, self.user)
+            self.fs.location = self.getWorkspacePath()
             # self.solutionData['filename'] = self.solutionsToRun.name
             self.solutionsToRun.name = self.solutionData['filename'] = 'Solution' + extensionToCheck
                 
             destinatedPath = os.path.join(self.fs.location, 'src', 'main', 'java', self.solutionsToRun.name)
 
-            if os.path.isfile(destinatedPath):
-                os.remove(destinatedPath)
-                
-            self.fs.save(destinatedPath, self.solutionsToRun)
+            with self.timer.phase('write_solution'):
+                if os.path.isfile(destinatedPath):
+                    os.remove(destinatedPath)
+
+                self.fs.save(destinatedPath, self.solutionsToRun)
             
         elif self.solutionType.name == 'Editor':
             # rozwiazanie nadeslane przez edytor
@@ -85,12 +114,10 @@ class JavaExecutor(SolutionExecutor):
                 solutionExtension = self.task.test.exercises.get(pk=self.solutionData['exercisePk'][0]).language.allowed_extension
             
             # tworze plik z rozwiazaniem
-            group = self.task.assigned_to
-            
             if self.task.taskType.name == 'Exercise':
-                self.fs.location = getUserSolutionPath(self.task, group, self.user)
+                self.fs.location = self.getWorkspacePath()
             else:
-                self.fs.location = getUserSolutionPath(self.task, group, self.user, self.task.test.exercises.get(pk=self.solutionData['exercisePk'][0]))
+                self.fs.location = self.getWorkspacePath(self.task.test.exercises.get(pk=self.solutionData['exercisePk'][0]))
 
             # pobranie nazwy klasy i uzycie jej do nazwania pliku
             fname = ''
@@ -108,35 +135,37 @@ class JavaExecutor(SolutionExecutor):
             destinatedPath = os.path.join(self.fs.location, 'src', 'main', 'java', self.solutionData['filename'])
                 
             try:
-                with open(destinatedPath, 'w') as solution_file:
-                    solution_file.write("package solution; \n")
+                with self.timer.phase('write_solution'):
+                    prepareFileForWrite(destinatedPath)
 
-                with open(destinatedPath, 'a') as solution_file:
-                    solution_file.write(self.solutionsToRun[0])
+                    with open(destinatedPath, 'w') as solution_file:
+                        solution_file.write("package solution; \n")
+
+                    with open(destinatedPath, 'a') as solution_file:
+                        solution_file.write(self.solutionsToRun[0])
             except Exception as e:
                 self.logger.info("Nie udalo sie zapisac rozwiazania - " + str(e))
 
         elif self.solutionType.name == 'GitHub-Repository':
-            solution_path = getUserSolutionPath(self.task, self.task.assigned_to, self.user)            
+            solution_path = self.getWorkspacePath()            
             self.fs.location = solution_path
             solution_path = os.path.join(solution_path, 'src', 'main', 'java')
-            self.logger.info("Zmiana katalogu roboczego na " + solution_path)
-            os.chdir(solution_path)
             
             # pobieranie pliku z repozytorium
             try:
-                solution_file_binary = requests.get(self.solutionData['fileDownloadURL'])
+                with self.timer.phase('download'):
+                    solution_file_binary = requests.get(self.solutionData['fileDownloadURL'])
+
+                prepareFileForWrite(os.path.join(solution_path, self.solutionData['filename']))
 
-                with open(self.solutionData['filename'], 'wb') as solution_file:
+                with open(os.path.join(solution_path, self.solutionData['filename']), 'wb') as solution_file:
                     solution_file.write(solution_file_binary.content)
                 
                 self.logger.info("Pobrano " +  self.solutionData['fileDownloadURL'] + " i zapisano plik: " + self.solutionData['filename'] )
-                os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
                 
             except Exception as e:
                 self.logger.info("Nastapil blad pobierania pliku z GitHub i jego zapisania: " + str(e))
                 self.readyToRunSolution = False
-                os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
                 return
         else:
             self.logger.info("Niepoprawny rodzaj rozwiazania - " + self.solutionType.name)
@@ -152,9 +181,38 @@ class JavaExecutor(SolutionExecutor):
             exercisePath = getExerciseDirectoryRootPath(self.task.test.exercises.get(pk=self.solutionData['exercisePk'][0]))
 
 
-        self.copyUnitTestsToSolutionDir(exercisePath)
+        self.exercisePath = exercisePath
+        with self.timer.phase('copy_unit_tests'):
+            # unit testy w piaskownicy zaleza od pakietu rozwiazania (instrukcja package)
+            solution_file_path = os.path.join(self.fs.location, 'src', 'main', 'java', self.solutionData['filename'])
+
+            if self.stageUnitTests(exercisePath, get_java_package_name_from_file(solution_file_path) or "solution"):
+                self.insertSolutionPackage()
         self.readyToRunSolution = True
 
+    def insertSolutionPackage(self):
+        # nazwa pakietu rozwiazania - jezeli brak instrukcji package, dodawany jest pakiet "solution"
+        solution_file_path = os.path.join(self.fs.location, 'src', 'main', 'java', self.solutionData['filename'])
+        package_name = get_java_package_name_from_file(solution_file_path)
+        
+        if not package_name:
+            # brak instrukcji package, trzeba ja dodac
+            package_name = "solution"
+            solution_file_tmp = ""
+            
+            with open(solution_file_path, "r") as solution_file:
+                solution_file_tmp = solution_file.read()
+            
+            prepareFileForWrite(solution_file_path)
+
+            with open(solution_file_path, "w") as solution_file:
+                solution_file.write("package " + package_name + "; \n")
+            
+            with open(solution_file_path, "a") as solution_file:
+                solution_file.write(solution_file_tmp)
+
+        return package_name
+
     def copyUnitTestsToSolutionDir(self, exercisePath):
         # kopiowanie unit testow z katalogu Root Exercise do Root Solution
         if os.path.isdir(exercisePath):
@@ -165,29 +223,18 @@ class JavaExecutor(SolutionExecutor):
                         if not file.endswith(".java"):
                             continue
 
-                        solution_file_path = os.path.join(self.fs.location, 'src', 'main', 'java', self.solutionData['filename'])
-                        package_name = get_java_package_name_from_file(solution_file_path)
-                        
-                        if not package_name:
-                            # brak instrukcji package, trzeba ja dodac
-                            package_name = "solution"
-                            solution_file_tmp = ""
-                            
-                            with open(solution_file_path, "r") as solution_file:
-                                solution_file_tmp = solution_file.read()
-                            
-                            with open(solution_file_path, "w") as solution_file:
-                                solution_file.write("package " + package_name + "; \n")
-                            
-                            with open(solution_file_path, "a") as solution_file:
-                                solution_file.write(solution_file_tmp)
+                        package_name = self.insertSolutionPackage()
 
                         source_path = os.path.join(subdir, file)
                         destination_path = os.path.join(self.fs.location, 'src', 'test', 'java', file)
                         
+                        # plik w katalogu rozwiazania moze byc dowiazaniem do unit testow cwiczenia
+                        prepareFileForWrite(destination_path)
                         copy(source_path, destination_path)
 
                         result = insert_java_package_instruction(destination_path, package_name)
+                        self.unitTestFiles.append(destination_path)
+                        record_bytes_written('unit_tests', self.languageName, [destination_path])
                         
                         if not result:
                             self.readyToRunSolution = False
@@ -195,17 +242,111 @@ class JavaExecutor(SolutionExecutor):
 
             self.readyToRunSolution = True
 
-    def run(self):
-        if not self.isReady():
-            self.logger.info("Executor nie jest gotowy do uruchomienia")
-            return (False, False, "Executor nie jest gotowy do uruchomienia")
+    def getRuntimeVersion(self):
+        # raport z demona i z Mavena ma inna postac, dlatego sposob uruchomienia jest czescia wersji
+        runner = "daemon" if get_jvm_daemon().isAvailable() else "maven"
+        return runner + " " + get_runtime_version([settings.JAVA_BIN, '-version'])
+
+    def getSolutionFilePath(self):
+        return os.path.join(self.fs.location, 'src', 'main', 'java', self.solutionData['filename'])
+
+    def getTestOutputFile(self):
+        return os.path.join('target', 'surefire-reports', UNIT_TEST_CLASS_NAME + '.txt')
+
+    def getResultFiles(self):
+        return ["result.txt", os.path.join('target', 'surefire-reports', UNIT_TEST_CLASS_NAME + '.txt')]
+
+    def runUnitTests(self):
+        result = self.runInDaemon()
+
+        if result is not None:
+            return result
+
+        # demon JVM jest niedostepny - testy uruchamiane sa Mavenem
+        return self.runWithMaven()
+
+    def runInDaemon(self):
+        # uruchomienie testow w demonie JVM, zwraca None jezeli demon jest niedostepny
+        daemon = get_jvm_daemon()
+
+        if not daemon.isAvailable():
+            return None
+
+        sources = {}
+
+        for sources_dir in (os.path.join(self.fs.location, 'src', 'main', 'java'), os.path.join(self.fs.location, 'src', 'test', 'java')):
+            for filename in os.listdir(sources_dir):
+                if filename.endswith(".java"):
+                    with open(os.path.join(sources_dir, filename), "r") as source_file:
+                        sources[filename] = source_file.read()
 
-        solution_exercise = None
-        
         try:
-            os.chdir(self.fs.location) # zmiana folderu roboczego w celu uruchomienia testowania mavena
+            with self.timer.phase('subprocess'):
+                daemon_result = daemon.runTests(sources, UNIT_TEST_CLASS_NAME, get_test_classes_cache_path(self.exercisePath))
+        except JvmDaemonTimeout:
+            # przekroczenie czasu nie musi sie powtorzyc - wynik nie trafia do pamieci podrecznej
+            self.resultCacheable = False
+            daemon_result = {"compiled": True,
+                             "compilationErrors": "",
+                             "tests": [{"name": UNIT_TEST_CLASS_NAME,
+                                        "status": "error",
+                                        "duration": float(settings.JAVA_GRADING_TEST_TIMEOUT),
+                                        "message": "Przekroczono limit czasu wykonania testow"}]}
+
+        if daemon_result is None:
+            return None
+
+        if daemon_result['compiled']:
+            report_lines = format_surefire_report(UNIT_TEST_CLASS_NAME, daemon_result)
+        else:
+            report_lines = [line + "\n" for line in daemon_result['compilationErrors'].splitlines()]
+
+        try:
+            with open(os.path.join(self.fs.location, "result.txt"), "w") as result_file:
+                result_file.writelines(report_lines)
+
+            # raport zapisywany rowniez w miejscu raportu surefire, z ktorego korzystaja serializery
+            reports_dir = os.path.join(self.fs.location, 'target', 'surefire-reports')
+            report_path = os.path.join(reports_dir, UNIT_TEST_CLASS_NAME + '.txt')
+            os.makedirs(reports_dir, exist_ok=True)
+
+            if daemon_result['compiled']:
+                with open(report_path, "w") as report_file:
+                    report_file.writelines(report_lines)
+            elif os.path.isfile(report_path):
+                os.remove(report_path)
+
+            with self.timer.phase('save_solution'):
+                self.saveSolutionExercise()
+        except Exception as e:
+            self.logger.info("Nie udalo sie przetestowac kodu - " + str(e))
+            return (False, False, "Nie udalo sie przetestowac kodu")
+
+        for line in report_lines:
+            if len(line) == 1:
+                continue
+            self.testsResult.append(line)
+
+        if not daemon_result['compiled']:
+            return (False, False, "Testy niezaliczone")
+
+        self.testCaseResults = daemon_result['tests']
+
+        return (True, self.areAllTestsPassed(), "Testowanie zakonczone pomyslnie")
+
+    def runWithMaven(self):
+        # uruchomienie testow poleceniem mvn test
+        xml_report_path = os.path.join(self.fs.location, 'target', 'surefire-reports', 'TEST-' + UNIT_TEST_CLASS_NAME + '.xml')
+
+        try:
+            # raport poprzedniego rozwiazania nie moze zostac odczytany, gdy kompilacja sie nie powiedzie
+            if os.path.isfile(xml_report_path):
+                os.remove(xml_report_path)
+
+            # maven uruchamiany jest w katalogu z rozwiazaniem (cwd), bez zmiany katalogu roboczego procesu
             self.logger.info("Uruchamiam polecenie " + str(self.testCommand) + " z lokalizacji " + self.fs.location)
-            process = subprocess.run(self.testCommand, stdout=PIPE, stderr=PIPE, shell=False) # uruchomienie testow
+            with self.timer.phase('subprocess'):
+                process = subprocess.run(self.testCommand, stdout=PIPE, stderr=PIPE, shell=False, cwd=self.fs.location) # uruchomienie testow
 
             process_out = process.stdout.decode("utf-8", errors='ignore')           
             process_err = process.stderr.decode("utf-8", errors='ignore')
@@ -217,53 +358,23 @@ class JavaExecutor(SolutionExecutor):
                 result_file.write(process_out)                       
                 result_file.write(process_err)
 
-                main_solution_object = Solution.objects.get(task=self.task, user=self.user)
-
-                if self.task.taskType.name == 'Test':
-                    test_solution, created = SolutionTest.objects.update_or_create(solution=main_solution_object)
-                    exercise_pk = str(self.solutionData['exercisePk'][0])
-                    solution_exercise, create = SolutionExercise.objects.update_or_create(solution=main_solution_object, exercise=self.task.test.exercises.get(pk=exercise_pk))                                                                        
-                    solution_exercise.pathToFile = os.path.join(self.fs.location, 'src', 'main', 'java', self.solutionData['filename'])
-                    solution_exercise.test = test_solution
-
-                    if self.solutionType.name == 'GitHub-Repository':
-                        solution_exercise.github_link = self.solutionData['fileDownloadURL']
-                    
-                    test_solution.save()
-                    solution_exercise.save()                    
-                else:
-                    solution_exercise, create = SolutionExercise.objects.update_or_create(solution=main_solution_object)                                                                        
-                    solution_exercise.pathToFile = os.path.join(self.fs.location, 'src', 'main', 'java', self.solutionData['filename'])
-                    solution_exercise.exercise = self.task.exercise
-
-                    if self.solutionType.name == 'GitHub-Repository':
-                        solution_exercise.github_link = self.solutionData['fileDownloadURL']
-
-                    solution_exercise.save()
+            with self.timer.phase('save_solution'):
+                self.saveSolutionExercise()
 
         except Exception as e:
-            os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))            
             self.logger.info("Nie udalo sie przetestowac kodu - " + str(e))
             return (False, False, "Nie udalo sie przetestowac kodu")
 
         
-        unit_tests_passed = False
+        try:
+            with self.timer.phase('parse_results'):
+                self.testCaseResults = parse_surefire_xml_report(xml_report_path)
 
-        try:            
             with open(os.path.join(self.fs.location, 'target', 'surefire-reports', 'UnitTest.txt'), "r") as result_file:
                 file_lines = result_file.readlines()
 
                 file_lines_without_newline_chars = [line for line in file_lines if line != '\n']
 
-                # pobranie liczby testow FAILURES
-                fail_number = file_lines_without_newline_chars[-1].split(',')[1].split(':')[-1]
-                fail_number = int(fail_number)
-
-                if fail_number > 0:
-                    unit_tests_passed = False
-                else:
-                    unit_tests_passed = True
-
                 for line in file_lines_without_newline_chars:
                     if len(line) == 1:
                         continue
@@ -283,13 +394,38 @@ class JavaExecutor(SolutionExecutor):
             except Exception as ex:
                 self.logger.info("Nie udalo sie odczytac wynikow testowania z result.txt - " + str(ex))
                 result_message = "Nie udalo sie odczytac wynikow testowania"
-            finally:
-                # powrot do glownego folderu
-                os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))           
             
             return (False, False, result_message)
-        
-        # powrot do glownego folderu
-        os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-        return (True, unit_tests_passed, "Testowanie zakonczone pomyslnie")      
\ No newline at end of file
+        return (True, self.areAllTestsPassed(), "Testowanie zakonczone pomyslnie")
+
+    def saveSolutionExercise(self):
+        # zapisanie informacji o rozwiazaniu w bazie danych
+        main_solution_object = Solution.objects.get(task=self.task, user=self.user)
+
+        if self.task.taskType.name == 'Test':
+            test_solution, created = SolutionTest.objects.update_or_create(solution=main_solution_object)
+            exercise_pk = str(self.solutionData['exercisePk'][0])
+            solution_exercise, created = SolutionExercise.objects.update_or_create(solution=main_solution_object, exercise=self.task.test.exercises.get(pk=exercise_pk))
+            solution_exercise.pathToFile = self.getPersistentSolutionFilePath()
+            solution_exercise.source_hash = self.sourceHash
+            solution_exercise.test = test_solution
+
+            if self.solutionType.name == 'GitHub-Repository':
+                solution_exercise.github_link = self.solutionData['fileDownloadURL']
+
+            test_solution.save()
+            solution_exercise.save()
+        else:
+            solution_exercise, created = SolutionExercise.objects.update_or_create(solution=main_solution_object)
+            solution_exercise.pathToFile = self.getPersistentSolutionFilePath()
+            solution_exercise.source_hash = self.sourceHash
+            solution_exercise.exercise = self.task.exercise
+
+            if self.solutionType.name == 'GitHub-Repository':
+                solution_exercise.github_link = self.solutionData['fileDownloadURL']
+
+            solution_exercise.save()
+
+        self.solutionExercise = solution_exercise
+        return solution_exercise
@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+import re
+import socket
+import subprocess
+import threading
+
+from subprocess import PIPE, DEVNULL
+from django.conf import settings
+
+# Klient demona JVM (java_daemon/src/GradingDaemon.java), ktory kompiluje
+# rozwiazania Java w pamieci i uruchamia testy przez JUnit Platform Launcher.
+# Demon uruchamiany jest raz na proces i wykorzystywany przez kolejne zlecenia,
+# dzieki czemu nie trzeba placic za start JVM i Mavena przy kazdym rozwiazaniu.
+
+DAEMON_CLASS_NAME = "GradingDaemon"
+# SecurityManager blokujacy System.exit: od Java 18 wymaga -Djava.security.manager=allow,
+# od Java 24 nie moze zostac wlaczony - rozwiazania sa wtedy sprawdzane Mavenem
+SECURITY_MANAGER_ALLOW_VERSION = 18
+SECURITY_MANAGER_REMOVED_VERSION = 24
+JAVA_VERSION_PATTERN = re.compile(r'version "(\d+)(?:\.(\d+))?')
+TEST_CLASSES_CACHE_DIR_NAME = "test-classes-cache"
+
+def get_test_classes_cache_path(exercise_path):
+    # katalog, w ktorym demon przechowuje skompilowane unit testy cwiczenia
+    return os.path.join(exercise_path, 'target', TEST_CLASSES_CACHE_DIR_NAME)
+
+class JvmDaemonTimeout(Exception):
+    pass
+
+class JvmGradingDaemon():
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.process = None
+        self.port = None
+        self.lock = threading.Lock()
+        self.javaVersion = None
+        # demon nie moze bezpiecznie sprawdzac rozwiazan w tej JVM (brak blokady System.exit)
+        self.unsupported = False
+
+    def getClasspath(self):
+        return os.pathsep.join([settings.JUNIT_PLATFORM_CONSOLE_JAR, settings.JAVA_GRADING_DAEMON_BUILD_DIR])
+
+    def isAvailable(self):
+        return settings.JAVA_GRADING_DAEMON_ENABLED and not self.unsupported and os.path.isfile(settings.JUNIT_PLATFORM_CONSOLE_JAR)
+
+    def getJavaVersion(self):
+        # glowna wersja JVM (1.8 -> 8), None jezeli nie udalo sie jej ustalic
+        if self.javaVersion is None:
+            try:
+                process = subprocess.run([settings.JAVA_BIN, '-version'], stdout=PIPE, stderr=PIPE, shell=False)
+            except OSError:
+                return None
+
+            match = JAVA_VERSION_PATTERN.search(process.stderr.decode("utf-8", errors='ignore'))
+
+            if match is not None:
+                major_version = int(match.group(1))
+                self.javaVersion = int(match.group(2) or 0) if major_version == 1 else major_version
+
+        return self.javaVersion
+
+    def getJvmOptions(self):
+        if self.getJavaVersion() >= SECURITY_MANAGER_ALLOW_VERSION:
+            return ['-Djava.security.manager=allow']
+
+        return []
+
+    def isRunning(self):
+        return self.process is not None and self.process.poll() is None
+
+    def build(self):
+        # kompilacja demona, jezeli zrodlo jest nowsze niz skompilowana klasa
+        java_version = self.getJavaVersion()
+
+        if java_version is None or java_version >= SECURITY_MANAGER_REMOVED_VERSION:
+            self.logger.info("Demon JVM wymaga Java 8-" + str(SECURITY_MANAGER_REMOVED_VERSION - 1) +
+                             " (wersja " + str(java_version) + ") - rozwiazania sprawdzane sa Mavenem")
+            self.unsupported = True
+            return False
+
+        source_path = os.path.join(settings.JAVA_GRADING_DAEMON_SOURCE_DIR, DAEMON_CLASS_NAME + ".java")
+        class_path = os.path.join(settings.JAVA_GRADING_DAEMON_BUILD_DIR, DAEMON_CLASS_NAME + ".class")
+
+        if os.path.isfile(class_path) and os.path.getmtime(class_path) >= os.path.getmtime(source_path):
+            return True
+
+        os.makedirs(settings.JAVA_GRADING_DAEMON_BUILD_DIR, exist_ok=True)
+        process = subprocess.run([settings.JAVAC_BIN, '-encoding', 'UTF-8',
+                                  '-cp', settings.JUNIT_PLATFORM_CONSOLE_JAR,
+                                  '-d', settings.JAVA_GRADING_DAEMON_BUILD_DIR, source_path],
+                                 stdout=PIPE, stderr=PIPE, shell=False)
+
+        if process.returncode != 0:
+            self.logger.info("Nie udalo sie skompilowac demona JVM - " + process.stderr.decode("utf-8", errors='ignore'))
+            return False
+
+        return True
+
+    def start(self):
+        # uruchomienie demona i odczytanie portu, na ktorym nasluchuje
+        with self.lock:
+            if self.isRunning():
+                return True
+
+            if not self.isAvailable() or not self.build():
+                return False
+
+            self.process = subprocess.Popen([settings.JAVA_BIN] + self.getJvmOptions() +
+                                            ['-cp', self.getClasspath(), DAEMON_CLASS_NAME, str(settings.JAVA_GRADING_TEST_TIMEOUT)],
+                                            stdout=PIPE, stderr=DEVNULL, shell=False)
+            # PORT <numer> <1 - System.exit w rozwiazaniach jest blokowane>
+            first_line = self.process.stdout.readline().decode("utf-8", errors='ignore').split()
+
+            if len(first_line) != 3 or first_line[0] != 'PORT':
+                self.logger.info("Demon JVM nie zwrocil numeru portu")
+                self.process.kill()
+                self.process = None
+                return False
+
+            if first_line[2] != '1':
+                # System.exit w jednym rozwiazaniu zatrzymalby demona i wszystkie sprawdzane rozwiazania
+                self.logger.info("Demon JVM nie blokuje System.exit - rozwiazania sprawdzane sa Mavenem")
+                self.unsupported = True
+                self.process.kill()
+                self.process = None
+                return False
+
+            self.port = int(first_line[1])
+            self.logger.info("Uruchomiono demona JVM na porcie " + str(self.port))
+            return True
+
+    def stop(self):
+        with self.lock:
+            if self.process is not None:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+            self.port = None
+
+    def runTests(self, sources, test_class_name, test_classes_cache_path=None):
+        # sources - slownik nazwa pliku -> zawartosc pliku
+        # test_classes_cache_path - katalog ze skompilowanymi unit testami; jezeli sa w nim
+        # klasy dla tego samego zrodla testow, demon kompiluje jedynie rozwiazanie
+        # zwraca slownik z kluczami compiled, compilationErrors, tests
+        # lub None jezeli demon jest niedostepny
+        if not self.start():
+            return None
+
+        request = b""
+
+        for file_name, content in sources.items():
+            content_bytes = content.encode("utf-8")
+            request += "FILE {} {}\n".format(file_name, len(content_bytes)).encode("utf-8") + content_bytes
+
+        if test_classes_cache_path is not None:
+            request += "CACHE {}\n".format(os.path.abspath(test_classes_cache_path)).encode("utf-8")
+
+        request += "RUN {}\n".format(test_class_name).encode("utf-8")
+
+        try:
+            with socket.create_connection(('127.0.0.1', self.port), timeout=settings.JAVA_GRADING_DAEMON_TIMEOUT) as connection:
+                connection.sendall(request)
+                response = b""
+
+                while not response.endswith(b"\n"):
+                    chunk = connection.recv(65536)
+
+                    if not chunk:
+                        break
+                    response += chunk
+        except socket.timeout:
+            # demon przestal odpowiadac (limit czasu rozwiazania egzekwuje sam demon) - restart
+            self.logger.info("Przekroczono czas oczekiwania na odpowiedz demona JVM - restart demona")
+            self.stop()
+            raise JvmDaemonTimeout()
+        except OSError as e:
+            self.logger.info("Blad komunikacji z demonem JVM - " + str(e))
+            self.stop()
+            return None
+
+        if not response:
+            self.stop()
+            return None
+
+        result = json.loads(response.decode("utf-8"))
+
+        if result.get('timeout'):
+            self.logger.info("Rozwiazanie przekroczylo limit czasu wykonania testow w demonie JVM")
+
+            if not result.get('stopped'):
+                # watki rozwiazania nadal dzialaja (np. Java 20+ bez Thread.stop) - restart demona
+                self.logger.info("Nie udalo sie zatrzymac watkow rozwiazania - restart demona JVM")
+                self.stop()
+
+            raise JvmDaemonTimeout()
+
+        return result
+
+
+_daemon = None
+_daemon_lock = threading.Lock()
+
+def get_jvm_daemon():
+    # demon wspoldzielony przez wszystkie watki procesu
+    global _daemon
+
+    with _daemon_lock:
+        if _daemon is None:
+            _daemon = JvmGradingDaemon()
+
+    return _daemon
+
+def format_surefire_report(test_class_name, result):
+    # raport w formacie zblizonym do surefire-reports/UnitTest.txt
+    tests = result['tests']
+    failures = len([test for test in tests if test['status'] == 'failed'])
+    errors = len([test for test in tests if test['status'] == 'error'])
+    skipped = len([test for test in tests if test['status'] == 'skipped'])
+    elapsed = sum([test['duration'] for test in tests])
+    summary = "Tests run: {}, Failures: {}, Errors: {}, Skipped: {}, Time elapsed: {:.3f} s".format(len(tests), failures, errors, skipped, elapsed)
+
+    if failures or errors:
+        summary += " <<< FAILURE!"
+
+    lines = ["-" * 79 + "\n",
+             "Test set: " + test_class_name + "\n",
+             "-" * 79 + "\n",
+             summary + " - in " + test_class_name + "\n"]
+
+    for test in tests:
+        if test['status'] in ('failed', 'error'):
+            lines.append("{}  Time elapsed: {:.3f} s  <<< {}!\n".format(test['name'], test['duration'], test['status'].upper()))
+            lines.append(str(test['message']) + "\n")
+
+    return lines
@@ -0,0 +1,62 @@
+import threading
+
+from collections import OrderedDict
+
+class LRUCache():
+    # slownik o ograniczonym rozmiarze - po przekroczeniu max_size usuwany jest
+    # najdawniej uzywany element; bezpieczny przy dostepie z wielu watkow
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.items:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self.items.move_to_end(key)
+            return self.items[key]
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def remove(self, key):
+        with self.lock:
+            return self.items.pop(key, None) is not None
+
+    def remove_if(self, predicate):
+        # usuwa elementy, dla ktorych predicate(klucz, wartosc) jest prawdziwy
+        with self.lock:
+            keys_to_remove = [key for key, value in self.items.items() if predicate(key, value)]
+
+            for key in keys_to_remove:
+                del self.items[key]
+
+        return len(keys_to_remove)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self.items),
+                    "max_size": self.max_size,
+                    "hits": self.hits,
+                    "misses": self.misses}
+
+    def __len__(self):
+        return len(self.items)
@@ -0,0 +1,453 @@
+import datetime
+import json
+import os
+import platform
+import shutil
+import threading
+import time
+import uuid
+
+import django
+import requests
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from rest_framework.test import APIClient
+from ServiceCore.models import Exercise, Group, Language, Level, Profile, SolutionType, Task, TaskType, UserType
+from ServiceCore.serializers import UserTypeTokenObtainPairSerializer
+from ServiceCore.utils import (createExerciseRootDirectory, createTaskSolutionsRootDirectory, getExerciseDirectoryRootPath,
+                               getTaskSolutionsDirectoryPath)
+from ServiceCore.unit_tests_utils import create_unit_tests
+from ServiceCore.grading_metrics import summarize
+from ServiceCore.middleware import QueryCounter
+
+# Test obciazeniowy API sprawdzania rozwiazan.
+# Dane testowe (nauczyciele, grupy, studenci, cwiczenia Python i Java, zadania) tworzone sa na
+# podstawie fixtures z ServiceCore/fixtures i skalowane parametrami polecenia. Wszystkie obiekty
+# maja nazwy z prefiksem przebiegu i sa usuwane po zakonczeniu (chyba ze podano --keep).
+#
+# Scenariusze (wykonywane wspolbieznie w --concurrency watkach):
+#   - submit_python, submit_java - rozwiazania studentow wysylane do SolutionViewSet.create
+#   - list_* - listy zwracane nauczycielom i studentom
+# Domyslnie zadania wykonywane sa w procesie polecenia (APIClient, liczba zapytan SQL dla kazdego
+# zadania); z --url zadania trafiaja do dzialajacego serwera, a liczba zapytan odczytywana jest
+# z jego metryk /metrics. Wynik zapisywany jest jako JSON; --compare porownuje go z poprzednim.
+
+FIXTURES_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'fixtures')
+BENCHMARKS_DIRECTORY_ROOT = "benchmarks"
+PASSWORD = "loadtest-haslo"
+
+SOLUTIONS = {
+    'Python': {'unit_tests': ['self.assertEqual(suma(1, 2), 3)', 'self.assertEqual(suma(-1, 1), 0)'],
+               'correct': 'def suma(a, b):\n    return a + b\n',
+               'incorrect': 'def suma(a, b):\n    return a - b\n'},
+    'Java': {'unit_tests': ['assertEquals(3, Solution.suma(1, 2));', 'assertEquals(0, Solution.suma(-1, 1));'],
+             'correct': 'public class Solution {\n    public static int suma(int a, int b) {\n        return a + b;\n    }\n}\n',
+             'incorrect': 'public class Solution {\n    public static int suma(int a, int b) {\n        return a - b;\n    }\n}\n'},
+}
+
+def load_fixture(name):
+    # czesc fixtures zapisana jest w UTF-16 (z BOM)
+    with open(os.path.join(FIXTURES_DIRECTORY, name + '.json'), 'rb') as fixture_file:
+        content = fixture_file.read()
+
+    encoding = 'utf-16' if content[:2] in (b'\xff\xfe', b'\xfe\xff') else 'utf-8-sig'
+    return json.loads(content.decode(encoding))
+
+class InProcessClient():
+    # zadania obslugiwane w procesie polecenia; liczba zapytan SQL liczona dla kazdego zadania
+    def __init__(self):
+        self.local = threading.local()
+        self.tokens = {}
+
+    def login(self, users):
+        for user in users:
+            self.tokens[user.pk] = str(UserTypeTokenObtainPairSerializer.get_token(user).access_token)
+
+    def request(self, user, method, path, data=None):
+        client = getattr(self.local, 'client', None)
+
+        if client is None:
+            client = self.local.client = APIClient()
+
+        query_counter = QueryCounter()
+        authorization = 'Bearer ' + self.tokens[user.pk]
+        start = time.perf_counter()
+
+        with ExitStack() as stack:
+            for database_connection in connections.all():
+                stack.enter_context(database_connection.execute_wrapper(query_counter))
+
+            if method == 'get':
+                response = client.get(path, HTTP_AUTHORIZATION=authorization)
+            else:
+                response = client.post(path, data, format='multipart', HTTP_AUTHORIZATION=authorization)
+
+        return {'status': response.status_code,
+                'latency': time.perf_counter() - start,
+                'queries': query_counter.count,
+                'data': getattr(response, 'data', None)}
+
+class HttpClient():
+    # zadania wysylane do dzialajacego serwera (--url)
+    def __init__(self, url, timeout):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.local = threading.local()
+        self.tokens = {}
+
+    def getSession(self):
+        session = getattr(self.local, 'session', None)
+
+        if session is None:
+            session = self.local.session = requests.Session()
+
+        return session
+
+    def login(self, users):
+        for user in users:
+            response = self.getSession().post(self.url + '/token/', data={'username': user.username, 'password': PASSWORD}, timeout=self.timeout)
+
+            if response.status_code != 200:
+                raise CommandError("Nie udalo sie zalogowac uzytkownika " + user.username + " (" + str(response.status_code) + ")")
+
+            self.tokens[user.pk] = response.json()['access']
+
+    def request(self, user, method, path, data=None):
+        start = time.perf_counter()
+        response = self.getSession().request(method.upper(), self.url + path, data=data, timeout=self.timeout,
+                                             headers={'Authorization': 'Bearer ' + self.tokens[user.pk]})
+        latency = time.perf_counter() - start
+
+        try:
+            response_data = response.json()
+        except ValueError:
+            response_data = None
+
+        return {'status': response.status_code, 'latency': latency, 'queries': None, 'data': response_data}
+
+    def getServerQueryCounts(self):
+        # suma i liczba obserwacji histogramu http_request_db_queries serwera (bez odczytow samych metryk)
+        response = self.getSession().get(self.url + '/metrics', timeout=self.timeout)
+        totals = {'sum': 0.0, 'count': 0.0}
+
+        if response.status_code != 200:
+            return None
+
+        for line in response.text.splitlines():
+            for suffix in totals:
+                if line.startswith('http_request_db_queries_' + suffix + '{') and 'view="metrics_view"' not in line:
+                    totals[suffix] += float(line.rsplit(' ', 1)[1])
+
+        return totals
+
+class Command(BaseCommand):
+    help = "Test obciazeniowy API: wysylanie rozwiazan Python i Java oraz pobieranie list, wynik w formacie JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--teachers", type=int, default=2, help="Liczba nauczycieli")
+        parser.add_argument("--groups", type=int, default=2, help="Liczba grup kazdego nauczyciela")
+        parser.add_argument("--students", type=int, default=10, help="Liczba studentow w kazdej grupie")
+        parser.add_argument("--submissions", type=int, default=1, help="Liczba rozwiazan kazdego studenta dla kazdego jezyka")
+        parser.add_argument("--list-requests", type=int, default=50, help="Liczba zadan dla kazdego scenariusza list")
+        parser.add_argument("--concurrency", type=int, default=8, help="Liczba wspolbieznych zadan")
+        parser.add_argument("--languages", nargs="+", default=['Python', 'Java'], choices=sorted(SOLUTIONS), help="Jezyki rozwiazan")
+        parser.add_argument("--url", default=None, help="Adres dzialajacego serwera (domyslnie zadania obslugiwane w procesie polecenia)")
+        parser.add_argument("--timeout", type=float, default=120.0, help="Limit czasu zadania HTTP (w sekundach)")
+        parser.add_argument("--wait", action="store_true", help="Czekaj na sprawdzenie rozwiazan dodanych do kolejki (GRADING_QUEUE_ASYNC)")
+        parser.add_argument("--output", default=None, help="Plik z wynikiem (domyslnie BASE_DIR/benchmarks/grading_api-<data>.json)")
+        parser.add_argument("--compare", default=None, help="Poprzedni wynik, z ktorym porownywany jest biezacy")
+        parser.add_argument("--max-regression", type=float, default=0.2, help="Dopuszczalny wzrost p95 czasu odpowiedzi i liczby zapytan (0.2 = 20%%)")
+        parser.add_argument("--keep", action="store_true", help="Nie usuwaj danych testowych")
+
+    def handle(self, *args, **options):
+        for name in ('teachers', 'groups', 'students', 'submissions', 'concurrency'):
+            if options[name] < 1:
+                raise CommandError("Parametr --" + name + " musi byc wiekszy od 0")
+
+        prefix = "loadtest-" + uuid.uuid4().hex[:8]
+        client = HttpClient(options['url'], options['timeout']) if options['url'] else InProcessClient()
+
+        start = time.perf_counter()
+        seeded = self.seed(prefix, options['teachers'], options['groups'], options['students'], options['languages'])
+        self.stdout.write("Utworzono dane testowe {} w {:.2f} s: {} nauczycieli, {} grup, {} studentow, {} zadan".format(
+            prefix, time.perf_counter() - start, len(seeded['teachers']), len(seeded['groups']), len(seeded['students']), len(seeded['tasks'])))
+
+        # jedna pula watkow dla wszystkich scenariuszy - polaczenia z baza sa zamykane na koncu
+        pool = ThreadPoolExecutor(max_workers=options['concurrency'])
+
+        try:
+            client.login(seeded['teachers'] + seeded['students'])
+            scenarios = self.runScenarios(pool, client, seeded, options)
+        finally:
+            self.closeConnections(pool, options['concurrency'])
+            pool.shutdown()
+
+            if not options['keep']:
+                self.cleanup(prefix, seeded)
+
+        report = {'created_at': datetime.datetime.now().isoformat(),
+                  'mode': 'http' if options['url'] else 'in-process',
+                  'url': options['url'],
+                  'parameters': {name: options[name] for name in ('teachers', 'groups', 'students', 'submissions',
+                                                                  'list_requests', 'concurrency', 'languages', 'wait')},
+                  'environment': {'python': platform.python_version(),
+                                  'django': django.get_version(),
+                                  'database': connection.vendor,
+                                  'grading_queue_async': settings.GRADING_QUEUE_ASYNC,
+                                  'cpu_count': os.cpu_count()},
+                  'scenarios': scenarios}
+
+        output = options['output'] or os.path.join(settings.BASE_DIR, BENCHMARKS_DIRECTORY_ROOT,
+                                                   'grading_api-' + datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+        with open(output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+
+        self.printReport(scenarios)
+        self.stdout.write("Wynik zapisano w " + output)
+
+        if options['compare']:
+            self.compare(options['compare'], scenarios, options['max_regression'])
+
+    # ************ dane testowe ************
+    def seed(self, prefix, teachers_number, groups_number, students_number, languages):
+        # slowniki (Language, UserType, ...) z initial_data, pozostale obiekty na wzor fixtures
+        for fixture_object in load_fixture('initial_data'):
+            model = apps.get_model(*fixture_object['model'].split('.'))
+            fields = dict(fixture_object['fields'])
+            model.objects.get_or_create(name=fields.pop('name'), defaults=fields)
+
+        profiles = {profile['fields']['user']: profile['fields']['userType'] for profile in load_fixture('ProfileFixture')}
+        user_templates = load_fixture('UserFixture')
+        teacher_templates = [user['fields'] for user in user_templates if profiles.get(user['pk']) == 1]
+        student_templates = [user['fields'] for user in user_templates if profiles.get(user['pk']) == 2]
+        group_templates = [group['fields'] for group in load_fixture('GroupFixture')]
+        exercise_template = load_fixture('ExerciseFixture')[0]['fields']
+        task_template = load_fixture('TaskFixture')[0]['fields']
+
+        # uzytkownicy i profile
+        password = make_password(PASSWORD)
+        users = []
+
+        for teacher_index in range(teachers_number):
+            template = teacher_templates[teacher_index % len(teacher_templates)]
+            users.append(User(username="{}-t{}".format(prefix, teacher_index), password=password, email=template['email'],
+                              first_name=template['first_name'], last_name=template['last_name']))
+
+            for group_index in range(groups_number):
+                for student_index in range(students_number):
+                    template = student_templates[(group_index * students_number + student_index) % len(student_templates)]
+                    users.append(User(username="{}-t{}-g{}-s{}".format(prefix, teacher_index, group_index, student_index),
+                                      password=password, email=template['email'],
+                                      first_name=template['first_name'], last_name=template['last_name']))
+
+        User.objects.bulk_create(users)
+        users = {user.username: user for user in User.objects.filter(username__startswith=prefix + "-")}
+        teacher_type = UserType.objects.get(name="Teacher")
+        student_type = UserType.objects.get(name="Student")
+        Profile.objects.bulk_create([Profile(user=user, userType=student_type if "-g" in username[len(prefix):] else teacher_type)
+                                     for username, user in users.items()])
+
+        exercise_type = TaskType.objects.get(name="Exercise")
+        editor_type = SolutionType.objects.get(name="Editor")
+        level = Level.objects.order_by('pk').first()
+        seeded = {'teachers': [], 'students': [], 'groups': [], 'exercises': [], 'tasks': [], 'submissions': []}
+
+        for teacher_index in range(teachers_number):
+            teacher = users["{}-t{}".format(prefix, teacher_index)]
+            seeded['teachers'].append(teacher)
+            exercises = {}
+
+            # cwiczenia tworzone tak jak w ExerciseViewSet.create (katalog i unit testy)
+            for language_name in languages:
+                exercise = Exercise.objects.create(author=teacher, title="{} {} {}".format(exercise_template['title'], language_name, teacher_index),
+                                                   content=exercise_template['content'], level=level,
+                                                   language=Language.objects.get(name=language_name))
+
+                if not createExerciseRootDirectory(exercise):
+                    raise CommandError("Nie udalo sie utworzyc katalogu cwiczenia " + exercise.title)
+
+                create_unit_tests(exercise, SOLUTIONS[language_name]['unit_tests'])
+                exercises[language_name] = exercise
+                seeded['exercises'].append(exercise)
+
+            for group_index in range(groups_number):
+                template = group_templates[group_index % len(group_templates)]
+                group = Group.objects.create(name="{}-{}-{}".format(template['name'], teacher_index, group_index)[:32], owner=teacher)
+                students = [users["{}-t{}-g{}-s{}".format(prefix, teacher_index, group_index, student_index)] for student_index in range(students_number)]
+                group.users.add(*students)
+                seeded['groups'].append(group)
+                seeded['students'].extend(students)
+
+                for language_name, exercise in exercises.items():
+                    task = Task.objects.create(author=teacher, taskType=exercise_type, solutionType=editor_type,
+                                               title="{} {} {}-{}".format(task_template['title'], language_name, teacher_index, group_index),
+                                               exercise=exercise, assigned_to=group, isActive=True)
+                    createTaskSolutionsRootDirectory(task)
+                    seeded['tasks'].append(task)
+
+                    for student_index, student in enumerate(students):
+                        seeded['submissions'].append((language_name, student, task, 'correct' if student_index % 2 == 0 else 'incorrect'))
+
+        return seeded
+
+    def cleanup(self, prefix, seeded):
+        paths = [getExerciseDirectoryRootPath(exercise) for exercise in seeded['exercises']]
+        paths += [getTaskSolutionsDirectoryPath(task) for task in seeded['tasks']]
+
+        # usuniecie uzytkownikow usuwa rowniez ich grupy, cwiczenia, zadania i rozwiazania
+        User.objects.filter(username__startswith=prefix + "-").delete()
+
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+
+        self.stdout.write("Usunieto dane testowe " + prefix)
+
+    # ************ scenariusze ************
+    def runScenarios(self, pool, client, seeded, options):
+        scenarios = {}
+
+        for language_name in options['languages']:
+            work = [(lambda submission=submission: self.submit(client, submission, options))
+                    for round_index in range(options['submissions'])
+                    for submission in seeded['submissions'] if submission[0] == language_name]
+            scenarios['submit_' + language_name.lower()] = self.runScenario(pool, client, work)
+
+        teacher = seeded['teachers'][0]
+        student = seeded['students'][0]
+        list_scenarios = [('list_tasks_teacher', teacher, '/tasks/'),
+                          ('list_groups_teacher', teacher, '/groups/'),
+                          ('list_solutions_teacher', teacher, '/solutions/'),
+                          ('list_my_students_teacher', teacher, '/my_students/'),
+                          ('list_tasks_student', student, '/tasks/'),
+                          ('list_solutions_student', student, '/solutions/')]
+
+        for name, user, path in list_scenarios:
+            work = [(lambda user=user, path=path: client.request(user, 'get', path)) for index in range(options['list_requests'])]
+            scenarios[name] = self.runScenario(pool, client, work)
+
+        return scenarios
+
+    def submit(self, client, submission, options):
+        (language_name, student, task, variant) = submission
+        result = client.request(student, 'post', '/solutions/', {'taskPk': task.pk,
+                                                                 'solutionType': 'Editor',
+                                                                 'solution': SOLUTIONS[language_name][variant]})
+        data = result['data'] or {}
+
+        # tryb kolejki - oczekiwanie na wynik sprawdzenia (czas od wyslania do zakonczenia)
+        if options['wait'] and result['status'] == 202 and 'jobPk' in data:
+            deadline = time.perf_counter() + options['timeout']
+            grading_latency = result['latency']
+
+            while time.perf_counter() < deadline:
+                time.sleep(0.2)
+                grading_latency += 0.2
+                job = client.request(student, 'get', '/grading_jobs/{}/'.format(data['jobPk']))
+                grading_latency += job['latency']
+
+                if (job['data'] or {}).get('status') in ('DONE', 'FAILED'):
+                    result['grading_latency'] = grading_latency
+                    result['grading_status'] = job['data']['status']
+                    break
+        elif result['status'] == 200:
+            result['grading_latency'] = result['latency']
+            result['grading_status'] = data.get('status')
+
+        return result
+
+    def runScenario(self, pool, client, work):
+        server_queries_before = client.getServerQueryCounts() if isinstance(client, HttpClient) else None
+        start = time.perf_counter()
+        results = list(pool.map(lambda function: function(), work))
+        duration = time.perf_counter() - start
+
+        statuses = Counter(str(result['status']) for result in results)
+        errors = sum(1 for result in results if result['status'] >= 400)
+        queries = [result['queries'] for result in results if result['queries'] is not None]
+        grading_latencies = [result['grading_latency'] for result in results if 'grading_latency' in result]
+
+        scenario = {'requests': len(results),
+                    'errors': errors,
+                    'status_codes': dict(statuses),
+                    'duration_seconds': round(duration, 6),
+                    'throughput_rps': round(len(results) / duration, 3) if duration > 0 else None,
+                    'latency_seconds': summarize([result['latency'] for result in results]),
+                    'db_queries': summarize(queries) if queries else None}
+
+        if grading_latencies:
+            scenario['grading_latency_seconds'] = summarize(grading_latencies)
+            scenario['grading_status'] = dict(Counter(str(result.get('grading_status')) for result in results))
+
+        if server_queries_before is not None:
+            server_queries_after = client.getServerQueryCounts()
+
+            if server_queries_after is not None and server_queries_after['count'] > server_queries_before['count']:
+                # srednia z metryk serwera - obejmuje rowniez zadania innych klientow
+                scenario['db_queries'] = {'mean': round((server_queries_after['sum'] - server_queries_before['sum']) /
+                                                        (server_queries_after['count'] - server_queries_before['count']), 3)}
+
+        return scenario
+
+    def closeConnections(self, pool, workers_number):
+        # kazdy watek puli zamyka swoje polaczenie z baza (bariera - po jednym zadaniu na watek)
+        barrier = threading.Barrier(workers_number)
+
+        def close():
+            try:
+                barrier.wait(timeout=10)
+            except threading.BrokenBarrierError:
+                pass
+
+            connection.close()
+
+        list(pool.map(lambda index: close(), range(workers_number)))
+
+    # ************ raport ************
+    def printReport(self, scenarios):
+        self.stdout.write("{:<26} {:>7} {:>6} {:>9} {:>9} {:>9} {:>9} {:>8}".format(
+            "scenariusz", "zadania", "bledy", "zad./s", "p50 [ms]", "p95 [ms]", "p99 [ms]", "SQL/zad."))
+
+        for name, scenario in scenarios.items():
+            latency = scenario['latency_seconds']
+            queries = scenario['db_queries']['mean'] if scenario['db_queries'] else None
+
+            self.stdout.write("{:<26} {:>7} {:>6} {:>9} {:>9.1f} {:>9.1f} {:>9.1f} {:>8}".format(
+                name, scenario['requests'], scenario['errors'], scenario['throughput_rps'],
+                latency['p50'] * 1000, latency['p95'] * 1000, latency['p99'] * 1000,
+                "{:.1f}".format(queries) if queries is not None else "-"))
+
+    def compare(self, baseline_path, scenarios, max_regression):
+        with open(baseline_path, 'r') as baseline_file:
+            baseline = json.load(baseline_file)['scenarios']
+
+        regressions = []
+
+        for name, scenario in scenarios.items():
+            if name not in baseline:
+                continue
+
+            checks = [("p95 czasu odpowiedzi", baseline[name]['latency_seconds']['p95'], scenario['latency_seconds']['p95'])]
+
+            if baseline[name].get('db_queries') and scenario['db_queries']:
+                checks.append(("liczby zapytan SQL", baseline[name]['db_queries']['mean'], scenario['db_queries']['mean']))
+
+            for label, previous, current in checks:
+                if previous and current is not None:
+                    change = (current - previous) / previous
+                    self.stdout.write("{}: zmiana {} {:+.1f}%".format(name, label, change * 100))
+
+                    if change > max_regression:
+                        regressions.append("{} - wzrost {} o {:.1f}%".format(name, label, change * 100))
+
+        if regressions:
+            raise CommandError("Regresja wzgledem " + baseline_path + ":\n  " + "\n  ".join(regressions))
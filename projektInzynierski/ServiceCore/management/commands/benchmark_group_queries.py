@@ -0,0 +1,118 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+from ServiceCore.models import Group, Task
+
+# Porownanie pobierania studentow nauczyciela i zadan studenta:
+#   - union - dotychczasowa suma (UNION) zapytan tworzona w petli po grupach
+#   - join - pojedyncze zapytanie z filtrem po relacji
+# Dane testowe tworzone sa w transakcji, ktora na koniec jest wycofywana.
+
+class Command(BaseCommand):
+    help = "Porownuje czas i plan zapytan UNION w petli oraz pojedynczego JOIN dla roznej liczby grup"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--groups", type=int, nargs="+", default=[10, 100, 1000], help="Liczby grup, dla ktorych wykonywany jest pomiar")
+        parser.add_argument("--students", type=int, default=5, help="Liczba studentow w kazdej grupie")
+        parser.add_argument("--tasks", type=int, default=2, help="Liczba zadan przypisanych do kazdej grupy")
+        parser.add_argument("--repeat", type=int, default=5, help="Liczba powtorzen kazdego pomiaru")
+        parser.add_argument("--explain", action="store_true", help="Wypisz plany zapytan (EXPLAIN)")
+
+    def handle(self, *args, **options):
+        if min(options['groups']) < 1 or options['students'] < 1 or options['tasks'] < 1 or options['repeat'] < 1:
+            raise CommandError("Wszystkie liczby musza byc wieksze od 0")
+
+        self.stdout.write("{:>7} {:<16} {:<6} {:>8} {:>10} {:>10}".format("grupy", "zapytanie", "metoda", "wiersze", "czas [ms]", "SQL [zn.]"))
+
+        for groups_number in options['groups']:
+            with transaction.atomic():
+                teacher, student = self.createData(groups_number, options['students'], options['tasks'])
+
+                scenarios = (
+                    ("studenci", lambda: self.teachersStudentsUnion(teacher), lambda: self.teachersStudentsJoin(teacher)),
+                    ("zadania", lambda: self.studentsTasksUnion(student), lambda: self.studentsTasksJoin(student)),
+                )
+
+                for name, union, join in scenarios:
+                    for method, build_queryset in (("union", union), ("join", join)):
+                        self.measure(groups_number, name, method, build_queryset, options['repeat'], options['explain'])
+
+                # wycofanie danych testowych
+                transaction.set_rollback(True)
+
+    def createData(self, groups_number, students_number, tasks_number):
+        prefix = "benchmark_" + str(groups_number) + "_"
+
+        teacher = User.objects.create(username=prefix + "teacher")
+        student = User.objects.create(username=prefix + "student")
+        User.objects.bulk_create([User(username=prefix + str(index)) for index in range(groups_number * students_number)])
+        students = list(User.objects.filter(username__startswith=prefix).exclude(pk__in=[teacher.pk, student.pk]).order_by('pk'))
+
+        Group.objects.bulk_create([Group(name="g" + str(index), owner=teacher) for index in range(groups_number)])
+        groups = list(Group.objects.filter(owner=teacher).order_by('pk'))
+
+        # student nalezy do wszystkich grup, pozostali studenci po jednej grupie
+        memberships = [Group.users.through(group_id=group.pk, user_id=student.pk) for group in groups]
+        memberships += [Group.users.through(group_id=groups[index // students_number].pk, user_id=user.pk) for index, user in enumerate(students)]
+        Group.users.through.objects.bulk_create(memberships)
+
+        # tytul zadania musi byc unikalny wsrod zadan autora
+        Task.objects.bulk_create([Task(author=teacher, title="t" + str(group.pk) + "_" + str(index), assigned_to=group)
+                                  for group in groups for index in range(tasks_number)])
+
+        return teacher, student
+
+    # dotychczasowe zapytania (petla z UNION)
+    def teachersStudentsUnion(self, teacher):
+        queryset = User.objects.none()
+
+        for group in teacher.group.all():
+            queryset = queryset.union(group.users.all())
+
+        return queryset
+
+    def studentsTasksUnion(self, student):
+        queryset = Task.objects.none()
+
+        for group in student.membershipGroups.all():
+            queryset = queryset.union(group.tasks.all())
+
+        return queryset
+
+    # pojedyncze zapytania (JOIN)
+    def teachersStudentsJoin(self, teacher):
+        return User.objects.filter(membershipGroups__owner=teacher).distinct().order_by('pk')
+
+    def studentsTasksJoin(self, student):
+        return Task.objects.filter(assigned_to__users=student).order_by('pk')
+
+    def measure(self, groups_number, name, method, build_queryset, repeat, explain):
+        times = []
+        rows = 0
+        queryset = None
+
+        try:
+            for index in range(repeat):
+                start = time.perf_counter()
+                queryset = build_queryset()
+                rows = len(list(queryset))
+                times.append((time.perf_counter() - start) * 1000)
+        except (DatabaseError, RecursionError) as e:
+            # kazde wywolanie union() zagniezdza poprzednie zapytanie - dla wielu grup budowanie SQL
+            # przekracza limit rekurencji, a SQLite ogranicza liczbe polaczonych SELECT (SQLITE_MAX_COMPOUND_SELECT)
+            self.stdout.write("{:>7} {:<16} {:<6} blad: {}".format(groups_number, name, method, str(e)))
+            return
+
+        sql_length = len(str(queryset.query))
+        self.stdout.write("{:>7} {:<16} {:<6} {:>8} {:>10.2f} {:>10}".format(groups_number, name, method, rows, statistics.median(times), sql_length))
+
+        if explain:
+            try:
+                plan = queryset.explain()
+            except DatabaseError as e:
+                plan = "blad: " + str(e)
+
+            self.stdout.write(plan if len(plan) < 4000 else plan[:4000] + "\n...")
@@ -0,0 +1,139 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from ServiceCore.models import Exercise, Group, ResetPasswordHash, Solution, SolutionExercise, Task
+from ServiceCore.grading_metrics import summarize
+
+# Czas wyszukiwan wykonywanych przy kazdym wyslaniu rozwiazania lub utworzeniu obiektu:
+#   - rozwiazanie - Solution.objects.get(task=..., user=...)
+#   - rozwiazanie_cwiczenia - SolutionExercise.objects.get(solution=..., exercise=...)
+#   - zadanie - Task.objects.filter(title=..., author=...).exists()
+#   - grupa - Group.objects.filter(name=..., owner=...).exists()
+#   - reset_hasla - ResetPasswordHash.objects.filter(hash_value=...).exists()
+# Dane testowe (domyslnie 100 000 rozwiazan) tworzone sa w transakcji, ktora na koniec jest wycofywana.
+# Porownanie przed i po dodaniu indeksow (migracja 0055_indexes_and_constraints):
+#   python manage.py migrate ServiceCore 0054 && python manage.py benchmark_lookups
+#   python manage.py migrate ServiceCore && python manage.py benchmark_lookups
+
+class Command(BaseCommand):
+    help = "Mierzy czas wyszukiwan rozwiazan, zadan, grup i linkow resetujacych haslo dla duzej liczby rozwiazan"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=2000, help="Liczba zadan (i grup)")
+        parser.add_argument("--students", type=int, default=50, help="Liczba studentow - kazdy ma rozwiazanie kazdego zadania")
+        parser.add_argument("--teachers", type=int, default=20, help="Liczba nauczycieli, miedzy ktorych podzielone sa zadania i grupy")
+        parser.add_argument("--reset-hashes", type=int, default=10000, help="Liczba linkow resetujacych haslo")
+        parser.add_argument("--lookups", type=int, default=500, help="Liczba wyszukiwan kazdego rodzaju")
+        parser.add_argument("--seed", type=int, default=0, help="Ziarno losowania wyszukiwanych obiektow")
+        parser.add_argument("--explain", action="store_true", help="Wypisz plany zapytan (EXPLAIN)")
+
+    def handle(self, *args, **options):
+        for name in ('tasks', 'students', 'teachers', 'reset_hashes', 'lookups'):
+            if options[name] < 1:
+                raise CommandError("Wszystkie liczby musza byc wieksze od 0")
+
+        last_migration = MigrationRecorder.Migration.objects.filter(app='ServiceCore').order_by('-applied', '-pk').first()
+        self.stdout.write("Baza danych: {}, ostatnia migracja ServiceCore: {}".format(
+            connection.vendor, last_migration.name if last_migration else "-"))
+
+        with transaction.atomic():
+            start = time.perf_counter()
+            data = self.createData(options['tasks'], options['students'], options['teachers'], options['reset_hashes'])
+            self.stdout.write("Utworzono {} rozwiazan w {:.2f} s".format(len(data['solution_pks']), time.perf_counter() - start))
+
+            self.stdout.write("{:<22} {:>8} {:>10} {:>10} {:>10} {:>8}".format(
+                "wyszukiwanie", "liczba", "p50 [ms]", "p95 [ms]", "p99 [ms]", "indeks"))
+
+            for name, model, columns, lookup in self.getLookups(data, options['seed']):
+                self.measure(name, model, columns, lookup, options['lookups'], options['explain'])
+
+            # wycofanie danych testowych
+            transaction.set_rollback(True)
+
+    def createData(self, tasks_number, students_number, teachers_number, reset_hashes_number):
+        prefix = "lookups_" + str(int(time.time())) + "_"
+
+        User.objects.bulk_create([User(username=prefix + "t" + str(index)) for index in range(teachers_number)] +
+                                 [User(username=prefix + "s" + str(index)) for index in range(students_number)])
+        teachers = list(User.objects.filter(username__startswith=prefix + "t").order_by('pk'))
+        students = list(User.objects.filter(username__startswith=prefix + "s").order_by('pk'))
+        exercise = Exercise.objects.create(author=teachers[0], title=prefix + "cwiczenie", content="")
+
+        Group.objects.bulk_create([Group(name="g" + str(index), owner=teachers[index % teachers_number]) for index in range(tasks_number)])
+        Task.objects.bulk_create([Task(author=teachers[index % teachers_number], title="z" + str(index), exercise=exercise)
+                                  for index in range(tasks_number)])
+        tasks = list(Task.objects.filter(exercise=exercise).order_by('pk'))
+
+        Solution.objects.bulk_create([Solution(task=task, user=student) for task in tasks for student in students])
+        solution_pks = list(Solution.objects.filter(task__exercise=exercise).values_list('pk', flat=True))
+        SolutionExercise.objects.bulk_create([SolutionExercise(solution_id=solution_pk, exercise=exercise, pathToFile="")
+                                              for solution_pk in solution_pks])
+
+        ResetPasswordHash.objects.bulk_create([ResetPasswordHash(owner=students[index % students_number], hash_value="{:040x}".format(random.getrandbits(160)))
+                                               for index in range(reset_hashes_number)])
+
+        # aktualne statystyki tabel - planista wybiera indeksy tak jak dla danych produkcyjnych
+        if connection.vendor in ('postgresql', 'sqlite'):
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        return {'teachers': teachers, 'students': students, 'exercise': exercise, 'tasks': tasks, 'solution_pks': solution_pks,
+                'hashes': list(ResetPasswordHash.objects.filter(owner__in=students).values_list('hash_value', flat=True))}
+
+    def getLookups(self, data, seed):
+        # (nazwa, model, kolumny, funkcja tworzaca queryset dla kolejnego wyszukiwania)
+        generator = random.Random(seed)
+        teachers_number = len(data['teachers'])
+        exercise = data['exercise']
+
+        def solution():
+            return Solution.objects.filter(task=generator.choice(data['tasks']), user=generator.choice(data['students']))
+
+        def solution_exercise():
+            return SolutionExercise.objects.filter(solution_id=generator.choice(data['solution_pks']), exercise=exercise)
+
+        def task():
+            index = generator.randrange(len(data['tasks']))
+            return Task.objects.filter(title="z" + str(index), author=data['teachers'][index % teachers_number])
+
+        def group():
+            index = generator.randrange(len(data['tasks']))
+            return Group.objects.filter(name="g" + str(index), owner=data['teachers'][index % teachers_number])
+
+        def reset_hash():
+            return ResetPasswordHash.objects.filter(hash_value=generator.choice(data['hashes']))
+
+        return [("rozwiazanie", Solution, ('task_id', 'user_id'), solution),
+                ("rozwiazanie_cwiczenia", SolutionExercise, ('solution_id', 'exercise_id'), solution_exercise),
+                ("zadanie", Task, ('author_id', 'title'), task),
+                ("grupa", Group, ('owner_id', 'name'), group),
+                ("reset_hasla", ResetPasswordHash, ('hash_value',), reset_hash)]
+
+    def hasIndex(self, model, columns):
+        # indeks (lub ograniczenie unique) obejmujacy wszystkie kolumny wyszukiwania na poczatku
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+
+        return any((constraint['index'] or constraint['unique']) and set(constraint['columns'][:len(columns)]) == set(columns)
+                   for constraint in constraints.values())
+
+    def measure(self, name, model, columns, lookup, lookups_number, explain):
+        times = []
+        queryset = None
+
+        for index in range(lookups_number):
+            queryset = lookup()
+            start = time.perf_counter()
+            list(queryset)
+            times.append((time.perf_counter() - start) * 1000)
+
+        summary = summarize(times)
+        self.stdout.write("{:<22} {:>8} {:>10.3f} {:>10.3f} {:>10.3f} {:>8}".format(
+            name, lookups_number, summary['p50'], summary['p95'], summary['p99'], "tak" if self.hasIndex(model, columns) else "nie"))
+
+        if explain:
+            self.stdout.write(queryset.explain())
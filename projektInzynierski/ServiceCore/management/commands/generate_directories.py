@@ -1,56 +1,245 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Prefetch
 from ServiceCore.models import Task, Exercise, Test, UnitTest
-from ServiceCore.utils import createExerciseRootDirectory, createTestRootDirectory, createDirectoryForTaskSolutions
+from ServiceCore.utils import (EXERCISES_TEMPLATES_DIRECTORY_ROOT, createTaskSolutionsRootDirectory, createUserSolutionDirectory,
+                               getExerciseDirectoryName, getExerciseDirectoryRootPath, getTaskSolutionsDirectoryPath,
+                               getTestDirectoryRootPath, linkTree)
 from ServiceCore.unit_tests_utils import create_unit_tests
 
+# Odtworzenie struktury katalogow cwiczen, kolokwiow i zadan na podstawie bazy danych.
+# Polecenie najpierw planuje cala prace (jedno pobranie danych z bazy), a nastepnie wykonuje ja
+# rownolegle w trzech etapach: cwiczenia, kolokwia (dowiazania do plikow cwiczen) i zadania.
+# Odcisk danych kazdego katalogu zapisywany jest w pliku MANIFEST_FILE_NAME - katalogi, ktorych
+# dane sie nie zmienily, sa pomijane przy kolejnym uruchomieniu. Blad jednego katalogu nie
+# przerywa pracy; katalogi zalezne od cwiczenia zakonczonego bledem sa pomijane.
+
+MANIFEST_FILE_NAME = ".generate_directories.json"
+
+# ************ praca wykonywana w puli (bez zapytan do bazy danych) ************
+def create_exercise_directory(exercise, unit_tests):
+    path = getExerciseDirectoryRootPath(exercise)
+    os.makedirs(path, exist_ok=True)
+
+    if exercise.language.name == 'Java':
+        linkTree(os.path.join(settings.BASE_DIR, EXERCISES_TEMPLATES_DIRECTORY_ROOT, 'java'), path)
+
+    create_unit_tests(exercise, unit_tests, save_model=False)
+
+def create_test_directory(test, exercises):
+    path = getTestDirectoryRootPath(test)
+    os.makedirs(path, exist_ok=True)
+
+    # ponowne dowiazanie plikow - zmienione unit testy zastepuja poprzednia wersje
+    for exercise in exercises:
+        linkTree(getExerciseDirectoryRootPath(exercise), os.path.join(path, getExerciseDirectoryName(exercise)))
+
+def create_task_directory(task, members):
+    # katalogi uzytkownikow zawieraja ich pliki - istniejace katalogi nie sa zmieniane
+    createTaskSolutionsRootDirectory(task)
+
+    for member in members:
+        createUserSolutionDirectory(task, task.assigned_to, member)
+
+def run_work_item(item):
+    start = time.perf_counter()
+    item['function'](*item['args'])
+    return time.perf_counter() - start
+
+# ************ odciski danych katalogow ************
+def get_fingerprint(*parts):
+    fingerprint = hashlib.sha256()
+
+    for part in parts:
+        fingerprint.update(str(part).encode("utf-8"))
+        fingerprint.update(b"\0")
+
+    return fingerprint.hexdigest()
+
+def load_manifest(path):
+    try:
+        with open(path, 'r') as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(path, manifest):
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=MANIFEST_FILE_NAME + ".tmp-")
+
+    with os.fdopen(file_descriptor, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=0, sort_keys=True)
+
+    os.replace(temporary_path, path)
+
 class Command(BaseCommand):
+    help = "Tworzy strukture katalogow cwiczen, kolokwiow i zadan na podstawie bazy danych"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Liczba rownolegle tworzonych katalogow")
+        parser.add_argument("--processes", action="store_true", help="Uzyj puli procesow zamiast puli watkow")
+        parser.add_argument("--force", action="store_true", help="Utworz ponownie rowniez katalogi zapisane w manifescie")
+
     def handle(self, *args, **options):
-        # tworzenie cwiczen (w folderze exercises)
-        exercises = Exercise.objects.all()
+        if options['jobs'] < 1:
+            raise CommandError("Liczba zadan musi byc wieksza od 0")
+
+        self.verbosity = options['verbosity']
+
+        manifest_path = os.path.join(settings.BASE_DIR, MANIFEST_FILE_NAME)
+        manifest = {} if options['force'] else load_manifest(manifest_path)
+
+        start = time.perf_counter()
+        phases = self.planWork()
+        self.stdout.write("Zaplanowano {} katalogow w {:.2f} s".format(sum(len(items) for name, items in phases),
+                                                                       time.perf_counter() - start))
+
+        if options['processes']:
+            # procesy potomne nie moga wspoldzielic polaczen z baza danych
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=options['jobs'], mp_context=multiprocessing.get_context('fork'))
+        else:
+            pool = ThreadPoolExecutor(max_workers=options['jobs'])
+
+        failed_exercises = set()
+        errors = []
+        totals = {'done': 0, 'skipped': 0, 'errors': 0}
+
+        try:
+            with pool:
+                for name, items in phases:
+                    phase_stats = self.runPhase(pool, items, manifest, failed_exercises, errors)
+                    self.printStats(name, phase_stats)
+
+                    for key in totals:
+                        totals[key] += phase_stats[key]
+        finally:
+            save_manifest(manifest_path, manifest)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write("Razem: utworzono {}, pominieto {}, bledy {}, czas {:.2f} s ({:.1f} katalogow/s)".format(
+            totals['done'], totals['skipped'], totals['errors'], elapsed, totals['done'] / elapsed if elapsed > 0 else 0))
+
+        if errors:
+            for label, error in errors:
+                self.stdout.write("  {} - {}".format(label, error))
+
+            raise CommandError("Nie udalo sie utworzyc {} katalogow".format(len(errors)))
+
+        self.stdout.write("Pomyślnie utworzono strukturę katalogów dla zadań")
+
+    def planWork(self):
+        # lista etapow (nazwa, zadania); kazde zadanie to slownik z funkcja i jej argumentami,
+        # kluczem manifestu, odciskiem danych oraz cwiczeniami, od ktorych zalezy
+        exercises = Exercise.objects.select_related('language', 'author').prefetch_related(
+            Prefetch('unit_tests', queryset=UnitTest.objects.order_by('pk'))).order_by('pk')
+        tests = Test.objects.select_related('author').prefetch_related('exercises__author', 'exercises__language').order_by('pk')
+        tasks = Task.objects.select_related('author', 'taskType', 'exercise__language', 'assigned_to', 'test').prefetch_related(
+            'test__exercises__author', 'test__exercises__language', 'assigned_to__users').order_by('pk')
+
+        exercise_items = []
 
         for exercise in exercises:
-            try:
-                unit_tests = UnitTest.objects.filter(exercise=exercise)
-
-                if createExerciseRootDirectory(exercise):
-                    unit_tests_list = [unit_test.content for unit_test in unit_tests]
-                    create_unit_tests(exercise, unit_tests_list, save_model=False)
-                    self.stdout.write("Katalog dla ćwiczenia {} utworzony\n".format(exercise.title))
-                else:
-                    raise CommandError("Nie udało się utworzyć katalogu dla ćwiczenia {}".format(exercise.title))                    
-            except Exception as e:
-                self.stdout.write("Nie udalo sie utworzyc struktury katalogowej dla ćwiczeń (obiektów Exercise)")
-                return
+            unit_tests = [unit_test.content for unit_test in exercise.unit_tests.all()]
+            path = getExerciseDirectoryRootPath(exercise)
 
-        # tworzenie katalogów kolokwium (w folderze exercises_tests)
-        tests = Test.objects.all()
+            exercise_items.append({'label': "cwiczenie " + exercise.title,
+                                   'key': "exercise:" + str(exercise.pk),
+                                   'path': path,
+                                   'fingerprint': get_fingerprint(path, exercise.language.name, *unit_tests),
+                                   'depends_on': set(),
+                                   'exercise_pk': exercise.pk,
+                                   'function': create_exercise_directory,
+                                   'args': (exercise, unit_tests)})
 
-        for test in tests:
-            try:
-                if createTestRootDirectory(test):
-                    self.stdout.write("Katalog dla kolokwium {} utworzony\n".format(test.title))
-                else:
-                    raise CommandError("Nie udało się utworzyć katalogu dla kolokwium {}".format(test.title))                    
-            except Exception as e:
-                self.stdout.write("Nie udalo sie utworzyc struktury katalogowej dla kolokwium (obiektów Test)")
-                return
+        exercise_fingerprints = {item['exercise_pk']: item['fingerprint'] for item in exercise_items}
+        test_items = []
 
+        for test in tests:
+            test_exercises = list(test.exercises.all())
+            path = getTestDirectoryRootPath(test)
 
+            test_items.append({'label': "kolokwium " + test.title,
+                               'key': "test:" + str(test.pk),
+                               'path': path,
+                               'fingerprint': get_fingerprint(path, *[exercise_fingerprints.get(exercise.pk) for exercise in test_exercises]),
+                               'depends_on': {exercise.pk for exercise in test_exercises},
+                               'function': create_test_directory,
+                               'args': (test, test_exercises)})
 
-        # tworzenie katalogów zadan (w folderze solutions)
-        tasks = Task.objects.all()
+        task_items = []
 
         for task in tasks:
-            try:
-                if createDirectoryForTaskSolutions(task):
-                    self.stdout.write("Katalog dla zadania {} utworzony".format(task.title))
-                else:
-                    raise CommandError("Nie udało się utworzyć katalogu dla zadania {}".format(task.title))
+            if task.taskType is None or task.taskType.name not in ("Test", "Exercise"):
+                continue
+
+            members = list(task.assigned_to.users.all()) if task.assigned_to is not None else []
+            task_exercises = list(task.test.exercises.all()) if task.taskType.name == "Test" and task.test is not None else []
+            path = getTaskSolutionsDirectoryPath(task)
+            fingerprint_parts = [path, task.taskType.name, task.assigned_to_id]
+            fingerprint_parts += [(member.pk, member.username) for member in members]
+            fingerprint_parts += [getExerciseDirectoryName(exercise) for exercise in task_exercises]
 
+            task_items.append({'label': "zadanie " + str(task.title),
+                               'key': "task:" + str(task.pk),
+                               'path': path,
+                               'fingerprint': get_fingerprint(*fingerprint_parts),
+                               'depends_on': {exercise.pk for exercise in task_exercises},
+                               'function': create_task_directory,
+                               'args': (task, members)})
+
+        return [("cwiczenia", exercise_items), ("kolokwia", test_items), ("zadania", task_items)]
+
+    def runPhase(self, pool, items, manifest, failed_exercises, errors):
+        stats = {'total': len(items), 'done': 0, 'skipped': 0, 'errors': 0, 'time': 0.0, 'work_time': 0.0}
+        start = time.perf_counter()
+        futures = {}
+
+        for item in items:
+            if manifest.get(item['key']) == item['fingerprint'] and os.path.isdir(item['path']):
+                stats['skipped'] += 1
+                continue
+
+            if item['depends_on'] & failed_exercises:
+                stats['errors'] += 1
+                errors.append((item['label'], "pominiete - blad tworzenia katalogu cwiczenia"))
+                continue
+
+            futures[pool.submit(run_work_item, {'function': item['function'], 'args': item['args']})] = item
+
+        for future in as_completed(futures):
+            item = futures[future]
+
+            try:
+                stats['work_time'] += future.result()
             except Exception as e:
-                self.stdout.write("Nie udalo sie utworzyc struktury katalogowej dla zadań (obiektów Task)")
-                return
-        
-        self.stdout.write("Pomyślnie utworzono strukturę katalogów dla zadań")
+                stats['errors'] += 1
+                errors.append((item['label'], str(e)))
+                manifest.pop(item['key'], None)
+
+                if 'exercise_pk' in item:
+                    failed_exercises.add(item['exercise_pk'])
+
+                continue
+
+            stats['done'] += 1
+            manifest[item['key']] = item['fingerprint']
+
+            if self.verbosity >= 2:
+                self.stdout.write("Katalog {} utworzony".format(item['label']))
 
+        stats['time'] = time.perf_counter() - start
+        return stats
 
+    def printStats(self, name, stats):
+        rate = stats['done'] / stats['time'] if stats['time'] > 0 else 0
+        self.stdout.write("{}: {} katalogow, utworzono {}, pominieto {}, bledy {}, czas {:.2f} s ({:.1f} katalogow/s, suma czasu pracy {:.2f} s)".format(
+            name, stats['total'], stats['done'], stats['skipped'], stats['errors'], stats['time'], rate, stats['work_time']))
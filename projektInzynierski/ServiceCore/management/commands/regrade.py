@@ -0,0 +1,61 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from ServiceCore.models import Exercise, GradingJob, SolutionExercise, Task
+from ServiceCore.grading_cache import get_grading_result_cache
+from ServiceCore.grading_queue import enqueue_regrade, run_grading_batch
+
+# Ponowne sprawdzenie wszystkich zapisanych rozwiazan cwiczenia lub zadania (np. po zmianie unit testow).
+# Zlecenia tworzone sa jako jedna partia (GradingJob.batch) i sprawdzane rownolegle; skompilowane
+# unit testy i pamiec podreczna wynikow sa wspoldzielone przez wszystkie zlecenia partii.
+
+class Command(BaseCommand):
+    help = "Ponownie sprawdza zapisane rozwiazania cwiczenia lub zadania"
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument("--exercise", type=int, help="Klucz glowny cwiczenia")
+        target.add_argument("--task", type=int, help="Klucz glowny zadania")
+        parser.add_argument("--workers", type=int, default=settings.GRADING_REGRADE_WORKERS, help="Liczba watkow sprawdzajacych rozwiazania")
+        parser.add_argument("--enqueue-only", action="store_true", help="Tylko dodaj zlecenia do kolejki (sprawdzi je run_grading_workers)")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError("Liczba watkow musi byc wieksza od 0")
+
+        if options['exercise'] is not None:
+            if not Exercise.objects.filter(pk=options['exercise']).exists():
+                raise CommandError("Cwiczenie pk=" + str(options['exercise']) + " nie istnieje")
+
+            solution_exercises = SolutionExercise.objects.filter(exercise_id=options['exercise'])
+        else:
+            if not Task.objects.filter(pk=options['task']).exists():
+                raise CommandError("Zadanie pk=" + str(options['task']) + " nie istnieje")
+
+            solution_exercises = SolutionExercise.objects.filter(solution__task_id=options['task'])
+
+        (batch, jobs_number) = enqueue_regrade(solution_exercises.exclude(exercise__isnull=True))
+        self.stdout.write("Partia {}: {} zlecen".format(batch, jobs_number))
+
+        if options['enqueue_only'] or jobs_number == 0:
+            return
+
+        cache_hits = get_grading_result_cache().hits
+        start = time.perf_counter()
+
+        def progress(done, total, job):
+            elapsed = time.perf_counter() - start
+            rate = done / elapsed if elapsed > 0 else 0
+            eta = (total - done) / rate if rate > 0 else 0
+            self.stdout.write("{}/{} ({:.1f} rozw./s, pozostalo ok. {:.0f} s)".format(done, total, rate, eta))
+
+        finished_jobs = run_grading_batch(batch, options['workers'], progress)
+        elapsed = time.perf_counter() - start
+
+        passed = sum(1 for job in finished_jobs if job.unit_tests_passed)
+        failed = sum(1 for job in finished_jobs if job.status == GradingJob.FAILED)
+
+        self.stdout.write("Sprawdzono {} rozwiazan w {:.2f} s: zaliczone {}, niezaliczone {}, bledy {}, wyniki z pamieci podrecznej {}".format(
+            len(finished_jobs), elapsed, passed, len(finished_jobs) - passed - failed, failed,
+            get_grading_result_cache().hits - cache_hits))
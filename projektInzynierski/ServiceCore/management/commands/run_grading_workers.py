@@ -0,0 +1,50 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from ServiceCore.grading_queue import run_worker_pool
+
+class Command(BaseCommand):
+    help = "Uruchamia workery sprawdzajace rozwiazania z kolejki GradingJob"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1, help="Liczba procesow sprawdzajacych rozwiazania")
+        parser.add_argument("--threads", type=int, default=1, help="Liczba watkow sprawdzajacych rozwiazania w kazdym procesie")
+        parser.add_argument("--poll-interval", type=float, default=None, help="Czas oczekiwania na nowe zlecenia (w sekundach)")
+        parser.add_argument("--metrics-port", type=int, default=None, help="Port metryk Prometheusa pierwszego workera (kolejne workery - kolejne porty)")
+
+    def handle(self, *args, **options):
+        workers_number = options['workers']
+        threads_number = options['threads']
+        poll_interval = options['poll_interval']
+        metrics_port = options['metrics_port']
+
+        if workers_number < 1 or threads_number < 1:
+            raise CommandError("Liczba workerow i watkow musi byc wieksza od 0")
+
+        self.stdout.write("Uruchamiam {} worker(y) kolejki zlecen po {} watk(i)".format(workers_number, threads_number))
+
+        if workers_number == 1:
+            try:
+                run_worker_pool(threads_number, poll_interval, metrics_port)
+            except KeyboardInterrupt:
+                self.stdout.write("Zatrzymano workera")
+            return
+
+        # polaczenia z baza danych nie moga byc wspoldzielone przez procesy potomne
+        connections.close_all()
+
+        processes = [multiprocessing.Process(target=run_worker_pool,
+                                             args=(threads_number, poll_interval, metrics_port + index if metrics_port is not None else None))
+                     for index in range(workers_number)]
+
+        for process in processes:
+            process.start()
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            self.stdout.write("Zatrzymano workery")
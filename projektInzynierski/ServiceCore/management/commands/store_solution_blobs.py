@@ -0,0 +1,53 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ServiceCore.models import SolutionExercise
+from ServiceCore.blob_store import get_blob_age, get_blob_path, iter_blob_hashes, remove_blob, store_blob_file
+
+class Command(BaseCommand):
+    help = "Przenosi pliki z rozwiazaniami z katalogow uzytkownikow do magazynu blob_store"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--gc", action="store_true", help="Usun z magazynu pliki, do ktorych nie odwoluje sie zadne rozwiazanie")
+        parser.add_argument("--gc-grace", type=int, default=settings.GRADING_JOB_STALE_TIMEOUT,
+                            help="Nie usuwaj plikow zapisanych w ciagu ostatnich N sekund (rozwiazania w trakcie sprawdzania)")
+
+    def handle(self, *args, **options):
+        stored = 0
+        missing = 0
+
+        # rozwiazania zapisane przed wprowadzeniem magazynu
+        for solution_exercise in SolutionExercise.objects.filter(source_hash__isnull=True).only('pk', 'pathToFile').iterator():
+            if not os.path.isfile(solution_exercise.pathToFile):
+                missing += 1
+                continue
+
+            source_hash = store_blob_file(solution_exercise.pathToFile)
+            SolutionExercise.objects.filter(pk=solution_exercise.pk).update(source_hash=source_hash,
+                                                                           pathToFile=get_blob_path(source_hash))
+            stored += 1
+
+        self.stdout.write("Zapisano w magazynie {} rozwiazan, brak pliku dla {} rozwiazan".format(stored, missing))
+
+        if options['gc']:
+            used_hashes = set(SolutionExercise.objects.exclude(source_hash__isnull=True).values_list('source_hash', flat=True))
+            removed = 0
+            skipped = 0
+
+            for blob_hash in list(iter_blob_hashes()):
+                if blob_hash in used_hashes:
+                    continue
+
+                # plik zapisany przez sprawdzanie, ktore nie zapisalo jeszcze SolutionExercise
+                try:
+                    if get_blob_age(blob_hash) < options['gc_grace']:
+                        skipped += 1
+                        continue
+                except OSError:
+                    continue
+
+                if remove_blob(blob_hash):
+                    removed += 1
+
+            self.stdout.write("Usunieto {} nieuzywanych plikow z magazynu, pominieto {} nowych plikow".format(removed, skipped))
@@ -0,0 +1,272 @@
+import bisect
+import logging
+import math
+import os
+import threading
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from ServiceCore.models import GradingJob
+from ServiceCore.grading_cache import get_grading_result_cache
+from ServiceCore.user_types import get_user_type_cache
+from ServiceCore.file_cache import get_file_cache
+
+# Metryki uslugi w formacie tekstowym Prometheusa (text/plain; version=0.0.4).
+# Metryki zbierane sa w pamieci procesu (bez zewnetrznych bibliotek i uslug):
+#   - Counter, Histogram - wartosci aktualizowane w trakcie dzialania (blokada na metryke)
+#   - collector - funkcja wywolywana przy odczycie, zwracajaca biezace wartosci
+#     (np. liczba oczekujacych zlecen, statystyki pamieci podrecznych)
+# Kazdy proces ma wlasne metryki - workery kolejki udostepniaja je na osobnym porcie
+# (run_grading_workers --metrics-port) pod adresem METRICS_SERVER_ADDRESS (domyslnie 127.0.0.1).
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) + '.0'
+
+    return repr(value) if isinstance(value, float) else str(value)
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def format_labels(label_names, label_values):
+    if not label_names:
+        return ''
+
+    return '{' + ','.join('{}="{}"'.format(name, escape_label_value(value))
+                          for name, value in zip(label_names, label_values)) + '}'
+
+class Metric():
+    type_name = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def getKey(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError("Niepoprawne etykiety metryki " + self.name + ": " + str(sorted(labels)))
+
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = ['# HELP {} {}'.format(self.name, self.documentation),
+                 '# TYPE {} {}'.format(self.name, self.type_name)]
+
+        with self.lock:
+            items = sorted(self.values.items())
+
+        for key, value in items:
+            lines.extend(self.renderSample(key, value))
+
+        return lines
+
+    def renderSample(self, key, value):
+        return ['{}{} {}'.format(self.name, format_labels(self.label_names, key), format_value(value))]
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.getKey(labels)
+
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        Metric.__init__(self, name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.getKey(labels)
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self.lock:
+            # [liczniki kubelkow (bez kumulacji), suma, liczba obserwacji]
+            state = self.values.get(key)
+
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def renderSample(self, key, value):
+        with self.lock:
+            bucket_counts, total, count = list(value[0]), value[1], value[2]
+
+        lines = []
+        cumulative = 0
+        label_names = self.label_names + ('le',)
+
+        for bound, bucket_count in zip(self.buckets + (math.inf,), bucket_counts):
+            cumulative += bucket_count
+            lines.append('{}_bucket{} {}'.format(self.name, format_labels(label_names, key + (format_value(float(bound)),)), cumulative))
+
+        labels = format_labels(self.label_names, key)
+        lines.append('{}_sum{} {}'.format(self.name, labels, format_value(float(total))))
+        lines.append('{}_count{} {}'.format(self.name, labels, count))
+
+        return lines
+
+class MetricsRegistry():
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.metrics = []
+        self.collectors = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+
+        return metric
+
+    def counter(self, name, documentation, label_names=()):
+        return self.register(Counter(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def registerCollector(self, collector):
+        # collector() zwraca liste (nazwa, typ, opis, nazwy etykiet, [(wartosci etykiet, wartosc)])
+        with self.lock:
+            self.collectors.append(collector)
+
+        return collector
+
+    def render(self):
+        lines = []
+
+        with self.lock:
+            metrics = list(self.metrics)
+            collectors = list(self.collectors)
+
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        for collector in collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                # blad jednego zrodla (np. brak polaczenia z baza) nie blokuje pozostalych metryk
+                self.logger.info("Nie udalo sie odczytac metryk " + collector.__name__ + " - " + str(e))
+                continue
+
+            for name, type_name, documentation, label_names, samples in families:
+                lines.append('# HELP {} {}'.format(name, documentation))
+                lines.append('# TYPE {} {}'.format(name, type_name))
+
+                for label_values, value in samples:
+                    lines.append('{}{} {}'.format(name, format_labels(label_names, label_values), format_value(value)))
+
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+# ************ metryki zadan HTTP (MetricsMiddleware) ************
+HTTP_REQUEST_DURATION = REGISTRY.histogram('http_request_duration_seconds', "Czas obslugi zadania HTTP",
+                                           ('view', 'method', 'status'))
+HTTP_REQUEST_DB_QUERIES = REGISTRY.histogram('http_request_db_queries', "Liczba zapytan SQL wykonanych podczas obslugi zadania",
+                                             ('view', 'method'), COUNT_BUCKETS)
+
+# ************ metryki sprawdzania rozwiazan ************
+GRADING_JOBS = REGISTRY.counter('grading_jobs_total', "Liczba sprawdzonych zlecen", ('language', 'status'))
+GRADING_PHASE_DURATION = REGISTRY.histogram('grading_phase_duration_seconds',
+                                            "Czas etapow sprawdzania rozwiazania (etap subprocess - uruchomienie testow)",
+                                            ('phase', 'language'))
+WORKSPACE_BYTES_WRITTEN = REGISTRY.counter('workspace_bytes_written_total',
+                                           "Liczba bajtow zapisanych w katalogach roboczych rozwiazan",
+                                           ('kind', 'language'))
+
+def observe_grading_job(language, status, phases):
+    GRADING_JOBS.inc(language=language, status=status)
+
+    for phase, seconds in phases.items():
+        GRADING_PHASE_DURATION.observe(seconds, phase=phase, language=language)
+
+def record_bytes_written(kind, language, paths):
+    # zwieksza licznik o rozmiar zapisanych plikow (pliki nieistniejace sa pomijane)
+    written = 0
+
+    for path in paths:
+        try:
+            written += os.path.getsize(path)
+        except OSError:
+            continue
+
+    if written:
+        WORKSPACE_BYTES_WRITTEN.inc(written, kind=kind, language=language)
+
+    return written
+
+# ************ metryki odczytywane przy kazdym pobraniu ************
+def collect_grading_backlog():
+    # liczba i wiek najstarszego zlecenia oczekujacego i sprawdzanego (jedno zapytanie)
+    now = timezone.now()
+    backlog = {GradingJob.PENDING: (0, None), GradingJob.RUNNING: (0, None)}
+
+    for row in GradingJob.objects.filter(status__in=list(backlog)).values('status').annotate(count=Count('pk'), oldest=Min('created_at')).order_by():
+        backlog[row['status']] = (row['count'], row['oldest'])
+
+    statuses = sorted(backlog)
+
+    return [('grading_backlog_jobs', 'gauge', "Liczba zlecen w kolejce", ('status',),
+             [((status,), backlog[status][0]) for status in statuses]),
+            ('grading_backlog_oldest_age_seconds', 'gauge', "Wiek najstarszego zlecenia w kolejce", ('status',),
+             [((status,), (now - backlog[status][1]).total_seconds() if backlog[status][1] is not None else 0)
+              for status in statuses])]
+
+def collect_caches():
+    caches = [('grading_results', get_grading_result_cache()),
+              ('user_types', get_user_type_cache()),
+              ('file_contents', get_file_cache())]
+    stats = [(name, cache.stats()) for name, cache in caches]
+
+    return [('cache_hits_total', 'counter', "Liczba trafien w pamieci podrecznej", ('cache',),
+             [((name, ), cache_stats['hits']) for name, cache_stats in stats]),
+            ('cache_misses_total', 'counter', "Liczba chybien w pamieci podrecznej", ('cache',),
+             [((name, ), cache_stats['misses']) for name, cache_stats in stats]),
+            ('cache_hit_ratio', 'gauge', "Udzial trafien w odczytach z pamieci podrecznej", ('cache',),
+             [((name, ), cache_stats['hits'] / (cache_stats['hits'] + cache_stats['misses']) if cache_stats['hits'] + cache_stats['misses'] else 0.0)
+              for name, cache_stats in stats]),
+            ('cache_entries', 'gauge', "Liczba elementow w pamieci podrecznej", ('cache',),
+             [((name, ), cache_stats['size']) for name, cache_stats in stats])]
+
+REGISTRY.registerCollector(collect_grading_backlog)
+REGISTRY.registerCollector(collect_caches)
+
+# ************ serwer metryk dla procesow bez serwera HTTP (workery kolejki) ************
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port, address='127.0.0.1'):
+    server = HTTPServer((address, port), MetricsRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+
+    return server
@@ -0,0 +1,121 @@
+import logging
+import re
+import time
+
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+
+from ServiceCore.metrics import HTTP_REQUEST_DB_QUERIES, HTTP_REQUEST_DURATION
+
+def get_view_name(request, view_func):
+    # nazwa widoku w postaci Klasa.akcja (np. SolutionViewSet.create, TaskViewSet.list)
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+
+    if view_class is None:
+        return getattr(view_func, '__name__', 'unknown')
+
+    actions = getattr(view_func, 'actions', None)
+    action = actions.get(request.method.lower()) if actions else None
+
+    return view_class.__name__ + '.' + (action or request.method.lower())
+
+class QueryCounter():
+    # licznik zapytan SQL podlaczany do polaczen przez connection.execute_wrapper
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+# literaly (napisy i liczby) oraz listy parametrow IN (%s, %s, ...) zastepowane w odcisku zapytania
+SQL_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+SQL_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+SQL_PARAMETERS_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+SQL_WHITESPACE = re.compile(r"\s+")
+
+def get_sql_fingerprint(sql):
+    # zapytania rozniace sie jedynie wartosciami maja ten sam odcisk
+    sql = SQL_STRING_LITERAL.sub("?", sql)
+    sql = SQL_NUMBER_LITERAL.sub("?", sql)
+    sql = SQL_PARAMETERS_LIST.sub("(...)", sql)
+
+    return SQL_WHITESPACE.sub(" ", sql).strip()
+
+class QueryLog():
+    # liczba, czas i odciski zapytan SQL wykonanych podczas obslugi zadania
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.fingerprints = Counter()
+        self.fingerprint_times = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            fingerprint = get_sql_fingerprint(sql)
+            self.count += 1
+            self.time += elapsed
+            self.fingerprints[fingerprint] += 1
+            self.fingerprint_times[fingerprint] += elapsed
+
+    def getRepeatedCount(self):
+        # zapytania powtorzone (np. wykonywane w petli dla kazdego elementu)
+        return self.count - len(self.fingerprints)
+
+    def getTopQueries(self, number):
+        return [(fingerprint, count, self.fingerprint_times[fingerprint])
+                for fingerprint, count in self.fingerprints.most_common(number)]
+
+class MetricsMiddleware():
+    # czas obslugi i liczba zapytan SQL kazdego zadania HTTP (ServiceCore.metrics); w trybie DEBUG
+    # liczba i czas zapytan dodawane sa jako naglowki odpowiedzi, a zadania przekraczajace
+    # SLOW_REQUEST_THRESHOLD lub SLOW_REQUEST_QUERY_THRESHOLD zapisywane sa w logu
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def __call__(self, request):
+        query_log = QueryLog()
+        start = time.perf_counter()
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(query_log))
+
+            response = self.get_response(request)
+
+        duration = time.perf_counter() - start
+        view = getattr(request, '_metrics_view', 'unresolved')
+        HTTP_REQUEST_DURATION.observe(duration, view=view, method=request.method, status=response.status_code)
+        HTTP_REQUEST_DB_QUERIES.observe(query_log.count, view=view, method=request.method)
+
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(query_log.count)
+            response['X-Query-Repeated'] = str(query_log.getRepeatedCount())
+            response['X-Query-Time'] = "{:.3f}".format(query_log.time * 1000)
+
+        if duration >= settings.SLOW_REQUEST_THRESHOLD or query_log.count >= settings.SLOW_REQUEST_QUERY_THRESHOLD:
+            self.logSlowRequest(request, response, view, duration, query_log)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view = get_view_name(request, view_func)
+        return None
+
+    def logSlowRequest(self, request, response, view, duration, query_log):
+        lines = ["Wolne zadanie {} {} ({}, status {}): {:.3f} s, zapytania SQL: {} ({:.3f} s), powtorzone: {}".format(
+            request.method, request.path, view, response.status_code,
+            duration, query_log.count, query_log.time, query_log.getRepeatedCount())]
+
+        for fingerprint, count, fingerprint_time in query_log.getTopQueries(settings.SLOW_REQUEST_TOP_QUERIES):
+            lines.append("  {}x {:.3f} s: {}".format(count, fingerprint_time, fingerprint))
+
+        self.logger.warning("\n".join(lines))
@@ -0,0 +1,36 @@
+# Generated by Django 2.1.15 on 2026-10-18 18:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('ServiceCore', '0048_auto_20200502_2310'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradingJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], db_index=True, default='PENDING', max_length=16)),
+                ('payload', models.TextField()),
+                ('file_name', models.CharField(blank=True, max_length=256, null=True)),
+                ('file_content', models.TextField(blank=True, null=True)),
+                ('execution_success', models.BooleanField(default=False)),
+                ('unit_tests_passed', models.BooleanField(default=False)),
+                ('message', models.CharField(blank=True, max_length=256, null=True)),
+                ('test_results', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('exercise', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='ServiceCore.Exercise')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grading_jobs', to='ServiceCore.Task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grading_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
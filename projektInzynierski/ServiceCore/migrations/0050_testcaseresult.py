@@ -0,0 +1,25 @@
+# Generated by Django 2.1.15 on 2026-10-18 18:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ServiceCore', '0049_gradingjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestCaseResult',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256)),
+                ('status', models.CharField(choices=[('passed', 'Passed'), ('failed', 'Failed'), ('error', 'Error'), ('skipped', 'Skipped')], max_length=16)),
+                ('duration', models.FloatField(default=0.0)),
+                ('message', models.TextField(blank=True, null=True)),
+                ('solution_exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='test_case_results', to='ServiceCore.SolutionExercise')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.1.15 on 2026-10-18 18:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ServiceCore', '0050_testcaseresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solutionexercise',
+            name='test_output',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.1.15 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ServiceCore', '0051_solutionexercise_test_output'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solutionexercise',
+            name='source_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.1.15 on 2026-10-18 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ServiceCore', '0052_solutionexercise_source_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gradingjob',
+            name='batch',
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+    ]
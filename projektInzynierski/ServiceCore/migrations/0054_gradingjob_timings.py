@@ -0,0 +1,18 @@
+# Generated by Django 2.1.15 on 2026-10-18 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ServiceCore', '0053_gradingjob_batch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gradingjob',
+            name='timings',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,150 @@
+# Generated by Django 2.1.15 on 2026-10-18 19:16
+
+import os
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def remove_duplicate_solutions(apps, schema_editor):
+    # jedno rozwiazanie zadania na uzytkownika - pozostaje najnowsze (najwieksze pk),
+    # a rozwiazania cwiczen i kolokwium starszych rozwiazan sa do niego przenoszone
+    Solution = apps.get_model('ServiceCore', 'Solution')
+    SolutionTest = apps.get_model('ServiceCore', 'SolutionTest')
+    SolutionExercise = apps.get_model('ServiceCore', 'SolutionExercise')
+
+    duplicates = Solution.objects.values('task', 'user').annotate(newest=Max('pk'), number=Count('pk')).filter(number__gt=1)
+
+    for duplicate in duplicates:
+        older_pks = list(Solution.objects.filter(task=duplicate['task'], user=duplicate['user']).exclude(
+            pk=duplicate['newest']).values_list('pk', flat=True))
+        newest_test = SolutionTest.objects.filter(solution_id=duplicate['newest']).first()
+
+        for solution_test in SolutionTest.objects.filter(solution_id__in=older_pks).order_by('-pk'):
+            if newest_test is None:
+                solution_test.solution_id = duplicate['newest']
+                solution_test.save(update_fields=['solution'])
+                newest_test = solution_test
+            else:
+                SolutionExercise.objects.filter(test=solution_test).update(test=newest_test)
+
+        SolutionExercise.objects.filter(solution_id__in=older_pks).update(solution_id=duplicate['newest'])
+        Solution.objects.filter(pk__in=older_pks).delete()
+
+    check_constraints(schema_editor)
+
+
+def remove_duplicate_solution_exercises(apps, schema_editor):
+    # jedno rozwiazanie cwiczenia w ramach rozwiazania - pozostaje najnowsze (najwieksze pk)
+    SolutionExercise = apps.get_model('ServiceCore', 'SolutionExercise')
+
+    duplicates = SolutionExercise.objects.filter(exercise__isnull=False).values('solution', 'exercise').annotate(
+        newest=Max('pk'), number=Count('pk')).filter(number__gt=1)
+
+    for duplicate in duplicates:
+        SolutionExercise.objects.filter(solution=duplicate['solution'], exercise=duplicate['exercise']).exclude(
+            pk=duplicate['newest']).delete()
+
+    check_constraints(schema_editor)
+
+
+def get_unique_name(name, pk, max_length):
+    # nazwa z dopisanym pk, skrocona tak, aby zmiescila sie w polu
+    suffix = '-' + str(pk)
+    return name[:max_length - len(suffix)] + suffix
+
+
+def get_task_directory_path(task):
+    # katalog z rozwiazaniami zadania (utils.getTaskSolutionsDirectoryPath)
+    return os.path.join(settings.BASE_DIR, 'solutions',
+                        task.title.replace(" ", "") + '-' + task.author.username.replace(" ", "") + '-' + str(task.pk))
+
+
+def move_directory(old_path, new_path):
+    if os.path.isdir(old_path) and not os.path.exists(new_path):
+        os.rename(old_path, new_path)
+
+
+def rename_duplicate_groups(apps, schema_editor):
+    # unikalna nazwa grupy wlasciciela - najstarsza grupa zachowuje nazwe, pozostale otrzymuja dopisane pk
+    Group = apps.get_model('ServiceCore', 'Group')
+    Task = apps.get_model('ServiceCore', 'Task')
+    max_length = Group._meta.get_field('name').max_length
+
+    duplicates = Group.objects.values('owner', 'name').annotate(oldest=Min('pk'), number=Count('pk')).filter(number__gt=1)
+
+    for duplicate in duplicates:
+        for group in Group.objects.filter(owner=duplicate['owner'], name=duplicate['name']).exclude(pk=duplicate['oldest']):
+            new_name = get_unique_name(group.name, group.pk, max_length)
+
+            # katalogi rozwiazan sprawdzonych przed migracja 0056 zawieraja nazwe grupy
+            for task in Task.objects.filter(assigned_to=group, author__isnull=False, title__isnull=False).select_related('author'):
+                task_path = get_task_directory_path(task)
+                move_directory(os.path.join(task_path, group.name + '-' + str(group.pk)),
+                               os.path.join(task_path, new_name + '-' + str(group.pk)))
+
+            group.name = new_name
+            group.save(update_fields=['name'])
+
+
+def rename_duplicate_tasks(apps, schema_editor):
+    # unikalny tytul zadania autora - najstarsze zadanie zachowuje tytul, pozostale otrzymuja dopisane pk
+    Task = apps.get_model('ServiceCore', 'Task')
+    max_length = Task._meta.get_field('title').max_length
+
+    duplicates = Task.objects.filter(author__isnull=False, title__isnull=False).values('author', 'title').annotate(
+        oldest=Min('pk'), number=Count('pk')).filter(number__gt=1)
+
+    for duplicate in duplicates:
+        tasks = Task.objects.filter(author=duplicate['author'], title=duplicate['title']).exclude(
+            pk=duplicate['oldest']).select_related('author')
+
+        for task in tasks:
+            old_path = get_task_directory_path(task)
+            task.title = get_unique_name(task.title, task.pk, max_length)
+            move_directory(old_path, get_task_directory_path(task))
+            task.save(update_fields=['title'])
+
+
+def check_constraints(schema_editor):
+    # PostgreSQL nie pozwala zmienic tabeli z oczekujacymi sprawdzeniami kluczy obcych (DEFERRED)
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        schema_editor.execute('SET CONSTRAINTS ALL DEFERRED')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('ServiceCore', '0054_gradingjob_timings'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resetpasswordhash',
+            name='hash_value',
+            field=models.CharField(db_index=True, max_length=40),
+        ),
+        migrations.RunPython(remove_duplicate_solutions, migrations.RunPython.noop),
+        migrations.RunPython(remove_duplicate_solution_exercises, migrations.RunPython.noop),
+        migrations.RunPython(rename_duplicate_groups, migrations.RunPython.noop),
+        migrations.RunPython(rename_duplicate_tasks, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='group',
+            unique_together={('owner', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='solution',
+            unique_together={('task', 'user')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='solutionexercise',
+            unique_together={('solution', 'exercise')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='task',
+            unique_together={('author', 'title')},
+        ),
+    ]
@@ -0,0 +1,70 @@
+import os
+
+from django.conf import settings
+from django.db import migrations
+
+
+# Raporty z testowania rozwiazan sprawdzonych przed zapisywaniem ich w bazie danych (test_output)
+# znajdowaly sie jedynie w katalogach uzytkownikow, ktorych sciezka zawierala nazwe grupy.
+# Raporty przepisywane sa do bazy danych - zmiana nazwy grupy nie zmienia katalogow na dysku,
+# a katalogi robocze identyfikowane sa jedynie przez pk (utils.getUserSolutionRootPath).
+
+def get_directory_name(title, author, pk):
+    return title.replace(" ", "") + '-' + author.username.replace(" ", "") + '-' + str(pk)
+
+
+def get_legacy_solution_path(solution, exercise):
+    # sciezka katalogu z rozwiazaniem sprzed zmiany (nazwy zadania, grupy i uzytkownika)
+    task = solution.task
+    group = task.assigned_to
+    path = os.path.join(settings.BASE_DIR, 'solutions', get_directory_name(task.title, task.author, task.pk),
+                        group.name + '-' + str(group.pk),
+                        solution.user.username.replace(" ", "") + '-' + str(solution.user.pk))
+
+    if task.taskType.name != 'Exercise':
+        path = os.path.join(path, get_directory_name(exercise.title, exercise.author, exercise.pk))
+
+    return path
+
+
+def fill_test_output_from_files(apps, schema_editor):
+    SolutionExercise = apps.get_model('ServiceCore', 'SolutionExercise')
+
+    solution_exercises = SolutionExercise.objects.filter(
+        test_output__isnull=True, solution__task__assigned_to__isnull=False).select_related(
+        'solution__task__taskType', 'solution__task__author', 'solution__task__assigned_to', 'solution__task__exercise__language',
+        'solution__task__exercise__author', 'solution__user', 'exercise__language', 'exercise__author')
+
+    for solution_exercise in solution_exercises.iterator():
+        solution = solution_exercise.solution
+        exercise = solution_exercise.exercise or solution.task.exercise
+
+        if exercise is None or exercise.language is None or exercise.author is None or \
+                solution.task.taskType is None or solution.task.author is None:
+            continue
+
+        if exercise.language.name == 'Python':
+            result_file = 'result.txt'
+        else:
+            result_file = os.path.join('target', 'surefire-reports', 'UnitTest.txt')
+
+        result_path = os.path.join(get_legacy_solution_path(solution, exercise), result_file)
+
+        try:
+            with open(result_path, 'r') as report_file:
+                test_output = report_file.read()
+        except (OSError, UnicodeDecodeError):
+            continue
+
+        SolutionExercise.objects.filter(pk=solution_exercise.pk).update(test_output=test_output)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ServiceCore', '0055_indexes_and_constraints'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_test_output_from_files, migrations.RunPython.noop),
+    ]
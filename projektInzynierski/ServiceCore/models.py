@@ -6,7 +6,8 @@ from django.utils import timezone
 
 class ResetPasswordHash(models.Model):
     owner = models.ForeignKey(User, blank=True, null=True, on_delete=models.CASCADE)
-    hash_value = models.CharField(max_length=40)
+    # wyszukiwany przy kazdym otwarciu linku resetujacego haslo
+    hash_value = models.CharField(max_length=40, db_index=True)
     consumed = models.BooleanField(default=False)
 
 class Language(models.Model):
@@ -101,6 +102,10 @@ class Group(models.Model):
     owner = models.ForeignKey(User, related_name="group", blank=True, null=True, on_delete=models.CASCADE)
     users = models.ManyToManyField(User, related_name="membershipGroups", blank=True)
 
+    class Meta:
+        # nazwa grupy jest unikalna wsrod grup nauczyciela (GroupViewSet.create/update)
+        unique_together = (('owner', 'name'),)
+
     def __str__(self):
         return self.name
 
@@ -125,6 +130,10 @@ class Task(models.Model):
     isRated = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # tytul zadania jest unikalny wsrod zadan autora (TaskViewSet.create)
+        unique_together = (('author', 'title'),)
+
     def __str__(self):
         return self.author.username + " - " + self.taskType.name + " - " + self.title
 
@@ -139,6 +148,10 @@ class Solution(models.Model):
     user = models.ForeignKey(User, related_name="solutions", on_delete=models.CASCADE)
     rate = models.FloatField(blank=True, null=True)  
 
+    class Meta:
+        # jedno rozwiazanie uzytkownika dla zadania - wyszukiwane przy kazdym wyslaniu rozwiazania
+        unique_together = (('task', 'user'),)
+
     def __str__(self):
         return "Rozwiazanie nr {} - {}_{} - {}".format(self.pk, self.task.title, self.task.pk, self.user.username)
 
@@ -151,8 +164,87 @@ class SolutionExercise(models.Model):
     test = models.ForeignKey(SolutionTest, related_name="exercises_solutions", blank=True, null=True, on_delete=models.CASCADE)
     exercise = models.ForeignKey(Exercise,  blank=True, null=True, on_delete=models.CASCADE)
     pathToFile = models.FilePathField(max_length=1024)
+    # skrot SHA-256 pliku z rozwiazaniem w magazynie blob_store (pathToFile wskazuje na ten plik)
+    source_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)
     rate = models.FloatField(blank=True, null=True)
     github_link = models.CharField(max_length=4096, blank=True, null=True)
+    # raport z testowania (result.txt lub surefire-reports/UnitTest.txt) zapisany po sprawdzeniu
+    test_output = models.TextField(blank=True, null=True)
+
+    class Meta:
+        # jedno rozwiazanie cwiczenia w ramach rozwiazania (executory - update_or_create)
+        unique_together = (('solution', 'exercise'),)
 
     # def __str__(self):
         # return "Rozwiazanie cwiczenia z kolokwium nr {} ".format()
+
+
+# Klasa reprezentuje wynik pojedynczego unit testu dla rozwiazania cwiczenia
+#   - name - nazwa testu (metody testowej)
+#   - status - passed, failed, error lub skipped
+#   - duration - czas wykonania testu w sekundach
+#   - message - komunikat bledu (dla testow niezaliczonych)
+class TestCaseResult(models.Model):
+    PASSED = 'passed'
+    FAILED = 'failed'
+    ERROR = 'error'
+    SKIPPED = 'skipped'
+
+    STATUS_CHOICES = (
+        (PASSED, 'Passed'),
+        (FAILED, 'Failed'),
+        (ERROR, 'Error'),
+        (SKIPPED, 'Skipped'),
+    )
+
+    solution_exercise = models.ForeignKey(SolutionExercise, related_name="test_case_results", on_delete=models.CASCADE)
+    name = models.CharField(max_length=256)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES)
+    duration = models.FloatField(default=0.0)
+    message = models.TextField(blank=True, null=True)
+
+    def __str__(self):
+        return "{} - {}".format(self.name, self.status)
+
+
+# Klasa reprezentuje zlecenie sprawdzenia rozwiazania w kolejce
+#   - user, task, exercise - autor rozwiazania, zadanie i cwiczenie ktorego dotyczy
+#   - status - stan zlecenia (PENDING, RUNNING, DONE, FAILED)
+#   - payload - dane requesta zapisane jako JSON (klucz -> lista wartosci)
+#   - file_name, file_content - plik z rozwiazaniem (dla rozwiazan typu File)
+#   - execution_success, unit_tests_passed, message, test_results - wynik dzialania executora
+#   - batch - partia zlecen, do ktorej nalezy zlecenie
+#   - timings - czasy etapow sprawdzania zapisane jako JSON (grading_metrics)
+class GradingJob(models.Model):
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    user = models.ForeignKey(User, related_name="grading_jobs", on_delete=models.CASCADE)
+    task = models.ForeignKey(Task, related_name="grading_jobs", on_delete=models.CASCADE)
+    exercise = models.ForeignKey(Exercise, blank=True, null=True, on_delete=models.CASCADE)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    payload = models.TextField()
+    file_name = models.CharField(max_length=256, blank=True, null=True)
+    file_content = models.TextField(blank=True, null=True)
+    execution_success = models.BooleanField(default=False)
+    unit_tests_passed = models.BooleanField(default=False)
+    message = models.CharField(max_length=256, blank=True, null=True)
+    test_results = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # identyfikator partii zlecen (np. ponowne sprawdzenie rozwiazan po zmianie unit testow)
+    batch = models.CharField(max_length=32, blank=True, null=True, db_index=True)
+    timings = models.TextField(blank=True, null=True)
+
+    def __str__(self):
+        return "Zlecenie nr {} - {} - {}".format(self.pk, self.user.username, self.status)
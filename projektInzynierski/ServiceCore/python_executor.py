@@ -1,6 +1,8 @@
 
+import json
 import logging
 import requests
+import sys
 
 from subprocess import PIPE
 from shutil import copy
@@ -9,33 +11,44 @@ from django.conf import settings
 from ServiceCore.models import Solution, SolutionExercise, SolutionTest, Exercise
 from ServiceCore.solution_executor import *
 from ServiceCore.unit_tests_utils import insert_python_import_instruction
+from ServiceCore.grading_cache import get_runtime_version
+from ServiceCore import python_runner, sandbox_pool
+
+UNIT_TEST_MODULE_NAME = "test_unit"
 
 class PythonExecutor(SolutionExecutor):
+    languageName = 'Python'
+
     def __init__(self):
         SolutionExecutor.__init__(self)
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.testCommand = self.testCommand = ['python', '-m', 'unittest', 'discover', '-v', '-s']
+        self.testCommand = ['python', os.path.abspath(python_runner.__file__)]
 
     def configureRuntime(self):
-        group = self.task.assigned_to
-                
         if self.task.taskType.name == 'Exercise':
-            self.fs.location = getUserSolutionPath(self.task, group, self.user)
+            self.fs.location = self.getWorkspacePath()
         else:
             exercise_pk = str(self.solutionData['exercisePk'])
             print(exercise_pk)
-            self.fs.location = getUserSolutionPath(self.task, group, self.user, self.task.test.exercises.get(pk=exercise_pk))
+            self.fs.location = self.getWorkspacePath(self.task.test.exercises.get(pk=exercise_pk))
 
-        for filename in os.listdir(self.fs.location):
-            file_path = os.path.join(self.fs.location, filename)
-            try:
-                if os.path.isfile(file_path):
-                    os.unlink(file_path)
-                else:
-                    print(file_path, "to nie jest plik")
-            except Exception as e:
-                self.logger.info("Nie udalo sie usunac istniejacego rozwiazania")
-                print("Nie udalo sie usunac istniejacego rozwiazania")
+        # unit testy pozostawione w piaskownicy przez poprzednie zlecenie (stageUnitTests)
+        staged_files = sandbox_pool.get_sandbox_pool().getStagedFiles(self.sandboxPath) if self.sandboxPath is not None else []
+
+        with self.timer.phase('cleanup'):
+            for filename in os.listdir(self.fs.location):
+                if filename in staged_files:
+                    continue
+
+                file_path = os.path.join(self.fs.location, filename)
+                try:
+                    if os.path.isfile(file_path):
+                        os.unlink(file_path)
+                    else:
+                        print(file_path, "to nie jest plik")
+                except Exception as e:
+                    self.logger.info("Nie udalo sie usunac istniejacego rozwiazania")
+                    print("Nie udalo sie usunac istniejacego rozwiazania")
 
 
         self.solutionType = SolutionType.objects.get(name=self.solutionData['solutionType'])
@@ -55,17 +68,16 @@ class PythonExecutor(SolutionExecutor):
                 self.logger.info("Niepoprawny format pliku")
                 return
             
-            group = self.task.assigned_to
-
-            self.fs.location = getUserSolutionPath(self.task, group, self.user)
+            self.fs.location = self.getWorkspacePath()
             self.solutionsToRun.name = self.solutionData['filename'] = 'solution' + extensionToCheck
                 
             destinatedPath = os.path.join(self.fs.location, self.solutionsToRun.name)
 
-            if os.path.isfile(destinatedPath):
-                os.remove(destinatedPath)
-                
-            self.fs.save(destinatedPath, self.solutionsToRun)
+            with self.timer.phase('write_solution'):
+                if os.path.isfile(destinatedPath):
+                    os.remove(destinatedPath)
+
+                self.fs.save(destinatedPath, self.solutionsToRun)
         
         elif self.solutionType.name == 'Editor':
             # rozwiazanie nadeslane przez edytor
@@ -87,13 +99,11 @@ class PythonExecutor(SolutionExecutor):
                 solutionExtension = self.task.test.exercises.get(pk=exercise_pk).language.allowed_extension
             
             # tworze plik z rozwiazaniem
-            group = self.task.assigned_to
-                
             if self.task.taskType.name == 'Exercise':
-                self.fs.location = getUserSolutionPath(self.task, group, self.user)
+                self.fs.location = self.getWorkspacePath()
             else:
                 exercise_pk = str(self.solutionData['exercisePk'][0])
-                self.fs.location = getUserSolutionPath(self.task, group, self.user, self.task.test.exercises.get(pk=exercise_pk))
+                self.fs.location = self.getWorkspacePath(self.task.test.exercises.get(pk=exercise_pk))
                 
             print(self.fs.location)
             self.solutionData['filename'] = 'solution' + solutionExtension
@@ -101,31 +111,33 @@ class PythonExecutor(SolutionExecutor):
             destinatedPath = os.path.join(self.fs.location, self.solutionData['filename'])                
 
             try:
-                with open(destinatedPath, 'w+') as solution_file:
-                    solution_file.write(self.solutionData['solution'][0])
+                with self.timer.phase('write_solution'):
+                    prepareFileForWrite(destinatedPath)
+
+                    with open(destinatedPath, 'w+') as solution_file:
+                        solution_file.write(self.solutionData['solution'][0])
             except Exception as e:
                 self.logger.info("Nie udalo sie zapisac rozwiazania - " + str(e))
 
         elif self.solutionType.name == 'GitHub-Repository':
-            solution_path = getUserSolutionPath(self.task, self.task.assigned_to, self.user)
+            solution_path = self.getWorkspacePath()
             self.fs.location = solution_path
-            self.logger.info("Zmiana katalogu roboczego na " + solution_path)
-            os.chdir(solution_path)
 
             # pobieranie pliku z repozytorium
             try:
-                solution_file_binary = requests.get(self.solutionData['fileDownloadURL'])
+                with self.timer.phase('download'):
+                    solution_file_binary = requests.get(self.solutionData['fileDownloadURL'])
+
+                prepareFileForWrite(os.path.join(solution_path, self.solutionData['filename']))
 
-                with open(self.solutionData['filename'], 'wb') as solution_file:
+                with open(os.path.join(solution_path, self.solutionData['filename']), 'wb') as solution_file:
                     solution_file.write(solution_file_binary.content)
                 
                 self.logger.info("Pobrano " +  self.solutionData['fileDownloadURL'] + " i zapisano plik: " + self.solutionData['filename'] )
-                os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
                 
             except Exception as e:
                 self.logger.info("Nastapil blad pobierania pliku z GitHub i jego zapisania: " + str(e))
                 self.readyToRunSolution = False
-                os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
                 return
                         
         else:
@@ -133,8 +145,8 @@ class PythonExecutor(SolutionExecutor):
             self.readyToRunSolution = False
             return
         
-        # update command - dodanie lokalizacji self.fs.location do polecenia 
-        self.testCommand.append(self.fs.location)
+        # update command - dodanie lokalizacji self.fs.location i modulu z testami do polecenia 
+        self.testCommand.extend([self.fs.location, UNIT_TEST_MODULE_NAME])
 
         # pobranie sciezki do glownego katalogu cwiczenia i przekopiowanie z niego unit testow
         exercisePath = None
@@ -145,7 +157,8 @@ class PythonExecutor(SolutionExecutor):
             exercise_pk = str(self.solutionData['exercisePk'][0])
             exercisePath = getExerciseDirectoryRootPath(self.task.test.exercises.get(pk=exercise_pk))
 
-        self.copyUnitTestsToSolutionDir(exercisePath)
+        with self.timer.phase('copy_unit_tests'):
+            self.stageUnitTests(exercisePath)
 
         self.readyToRunSolution = True
     
@@ -159,9 +172,13 @@ class PythonExecutor(SolutionExecutor):
                         # skopiowanie unit testow
                         source_path = os.path.join(subdir, file)
                         destination_path = os.path.join(self.fs.location, file)
+                        # plik w katalogu rozwiazania moze byc dowiazaniem do unit testow cwiczenia
+                        prepareFileForWrite(destination_path)
                         copy(source_path, destination_path)
 
                         result = insert_python_import_instruction(destination_path, self.solutionData['filename'])
+                        self.unitTestFiles.append(destination_path)
+                        record_bytes_written('unit_tests', self.languageName, [destination_path])
                         
                         if not result:
                             self.readyToRunSolution = False
@@ -169,74 +186,107 @@ class PythonExecutor(SolutionExecutor):
 
             self.readyToRunSolution = True
     
-    def run(self):
-        if not self.isReady():
-            self.logger.info("Executor nie jest gotowy do uruchomienia")
-            return (False, False, "Executor nie jest gotowy do uruchomienia")
+    def getRuntimeVersion(self):
+        if settings.PYTHON_RUNNER_ENABLED and python_runner.is_available():
+            return "forkserver " + sys.version
 
-        solution_exercise = None
+        return get_runtime_version([self.testCommand[0], '--version'])
 
-        try:
-            with open(os.path.join(self.fs.location, "result.txt"), "w") as result_file:
-                self.logger.info(settings.BASE_DIR)
-                self.logger.info(self.testCommand)
-                process = subprocess.run(self.testCommand, stdout=PIPE, stderr=PIPE, shell=False)
-                            
-                result_file.write(process.stdout.decode("utf-8", errors='ignore'))                           
-                result_file.write(process.stderr.decode("utf-8", errors='ignore'))
+    def getSolutionFilePath(self):
+        return os.path.join(self.fs.location, self.solutionData['filename'])
 
-                print(process.stdout.decode("utf-8", errors='ignore'))
-                print(process.stderr.decode("utf-8", errors='ignore'))
+    def saveSolutionExercise(self):
+        # zapisanie informacji o rozwiazaniu w bazie danych
+        main_solution_object = Solution.objects.get(task=self.task, user=self.user)
+        
+        if self.task.taskType.name == 'Test':
+            test_solution, created = SolutionTest.objects.update_or_create(solution=main_solution_object)
+            exercise_pk = str(self.solutionData['exercisePk'][0])                    
+            solution_exercise, created = SolutionExercise.objects.update_or_create(solution=main_solution_object, exercise=self.task.test.exercises.get(pk=exercise_pk))
+            solution_exercise.pathToFile = self.getPersistentSolutionFilePath()
+            solution_exercise.source_hash = self.sourceHash
+            solution_exercise.test = test_solution
+            
+            if self.solutionType.name == 'GitHub-Repository':
+                solution_exercise.github_link = self.solutionData['fileDownloadURL']
 
-                main_solution_object = Solution.objects.get(task=self.task, user=self.user)
-                
-                if self.task.taskType.name == 'Test':
-                    test_solution, created = SolutionTest.objects.update_or_create(solution=main_solution_object)
-                    exercise_pk = str(self.solutionData['exercisePk'][0])                    
-                    solution_exercise, created = SolutionExercise.objects.update_or_create(solution=main_solution_object, exercise=self.task.test.exercises.get(pk=exercise_pk))
-                    solution_exercise.pathToFile = os.path.join(self.fs.location, self.solutionData['filename'])
-                    solution_exercise.test = test_solution
-                    
-                    if self.solutionType.name == 'GitHub-Repository':
-                        solution_exercise.github_link = self.solutionData['fileDownloadURL']
-
-                    test_solution.save()
-                    solution_exercise.save()
-                else:
-                    solution_exercise, created = SolutionExercise.objects.update_or_create(solution=main_solution_object)
-                    solution_exercise.pathToFile = os.path.join(self.fs.location, self.solutionData['filename'])
-                    solution_exercise.exercise = self.task.exercise
-                    
-                    if self.solutionType.name == 'GitHub-Repository':
-                        solution_exercise.github_link = self.solutionData['fileDownloadURL']
-
-                    solution_exercise.save()
+            test_solution.save()
+            solution_exercise.save()
+        else:
+            solution_exercise, created = SolutionExercise.objects.update_or_create(solution=main_solution_object)
+            solution_exercise.pathToFile = self.getPersistentSolutionFilePath()
+            solution_exercise.source_hash = self.sourceHash
+            solution_exercise.exercise = self.task.exercise
+            
+            if self.solutionType.name == 'GitHub-Repository':
+                solution_exercise.github_link = self.solutionData['fileDownloadURL']
 
-        except Exception as e:
-            self.logger.info("Nie udalo sie przetestowac kodu - " + str(e))
-            return (False, False, "Nie udalo sie przetestowac kodu")
+            solution_exercise.save()
+
+        self.solutionExercise = solution_exercise
+        return solution_exercise
+
+    def runUnitTests(self):
+        if settings.PYTHON_RUNNER_ENABLED and python_runner.is_available():
+            return self.runInForkserver()
 
-        unit_tests_passed = False
+        # forkserver jest niedostepny (np. Windows) - testy uruchamiane w nowym interpreterze
+        return self.runInSubprocess()
+
+    def runInForkserver(self):
+        # uruchomienie testow w procesie potomnym forkservera (ServiceCore.python_runner)
+        with self.timer.phase('subprocess'):
+            result = python_runner.run_in_forkserver(self.fs.location, UNIT_TEST_MODULE_NAME,
+                                                     settings.PYTHON_RUNNER_TIMEOUT,
+                                                     settings.PYTHON_RUNNER_MEMORY_LIMIT)
+
+        if result.get('timeout'):
+            self.resultCacheable = False
+
+        return self.saveRunnerResult(result)
+
+    def runInSubprocess(self):
+        # python_runner uruchomiony jako skrypt wypisuje wynik w formacie JSON
+        self.logger.info(self.testCommand)
 
         try:
-            with open(os.path.join(self.fs.location, "result.txt"), "r") as result_file:            
-                file_lines = result_file.readlines()
-                
-                file_lines_without_newline_chars = [line for line in file_lines if line != '\n']
+            with self.timer.phase('subprocess'):
+                process = subprocess.run(self.testCommand, stdout=PIPE, stderr=PIPE, shell=False,
+                                         cwd=self.fs.location, timeout=settings.PYTHON_RUNNER_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.resultCacheable = False
+            return self.saveRunnerResult({"output": "Przekroczono limit czasu wykonania testow\n",
+                                          "tests": [],
+                                          "wasSuccessful": False})
 
-                if "OK" in file_lines_without_newline_chars[-1]:
-                    unit_tests_passed = True
-                else:
-                    unit_tests_passed = False
+        try:
+            with self.timer.phase('parse_results'):
+                result = json.loads(process.stdout.decode("utf-8", errors='ignore'))
+        except ValueError:
+            result = {"output": process.stdout.decode("utf-8", errors='ignore') + process.stderr.decode("utf-8", errors='ignore'),
+                      "tests": [],
+                      "wasSuccessful": False}
 
-                for line in file_lines:
-                    if len(line) == 1:
-                        continue
-                    self.testsResult.append(line) 
-                
+        return self.saveRunnerResult(result)
+
+    def saveRunnerResult(self, result):
+        # zapisanie wyniku z python_runner - tekst do result.txt, wyniki testow do bazy danych
+        try:
+            with open(os.path.join(self.fs.location, "result.txt"), "w") as result_file:
+                result_file.write(result['output'])
+
+            with self.timer.phase('save_solution'):
+                solution_exercise = self.saveSolutionExercise()
         except Exception as e:
-            self.logger.info("Nie udalo sie odczytac wynikow testowania")
-            return (True, False, "Nie udalo sie zapisac wynikow")
+            self.logger.info("Nie udalo sie przetestowac kodu - " + str(e))
+            return (False, False, "Nie udalo sie przetestowac kodu")
+
+        for line in result['output'].splitlines(True):
+            if len(line) == 1:
+                continue
+            self.testsResult.append(line)
+
+        self.testCaseResults = result['tests']
 
         self.logger.info("Testowanie rozwiazania pk=" + str(solution_exercise.pk) + " zakonczone pomyslnie")
-        return (True, unit_tests_passed, "Testowanie zakonczone")  
\ No newline at end of file
+        return (True, self.areAllTestsPassed(), "Testowanie zakonczone")
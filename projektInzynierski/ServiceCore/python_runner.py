@@ -0,0 +1,173 @@
+import importlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+import unittest
+
+# Uruchamianie unit testow rozwiazan Python w procesach tworzonych przez forkserver.
+# Serwer forkserver startuje raz, z zaimportowanym juz modulem unittest, a kazde
+# rozwiazanie testowane jest w osobnym procesie potomnym z ograniczonymi zasobami.
+# Proces potomny laduje bezposrednio modul rozwiazania i modul z testami, bez
+# uruchamiania nowego interpretera i przeszukiwania katalogu (unittest discover).
+#
+# Modul nie moze importowac Django - jest ladowany przez serwer forkserver.
+# Uruchomiony jako skrypt (python python_runner.py <katalog> <modul>) wypisuje
+# wynik w formacie JSON - wykorzystywane, gdy forkserver jest niedostepny.
+
+_context = None
+
+def is_available():
+    return 'forkserver' in multiprocessing.get_all_start_methods()
+
+def get_context():
+    global _context
+
+    if _context is None:
+        _context = multiprocessing.get_context('forkserver')
+        _context.set_forkserver_preload(['unittest', __name__])
+
+    return _context
+
+def warm_up():
+    # uruchomienie serwera forkserver przed pierwszym rozwiazaniem
+    if not is_available():
+        return False
+
+    from multiprocessing import forkserver
+    get_context()
+    forkserver.ensure_running()
+    return True
+
+class StructuredTestResult(unittest.TextTestResult):
+    # wynik z informacja o kazdym tescie: nazwa, status, czas wykonania, komunikat
+    def __init__(self, stream, descriptions, verbosity):
+        super().__init__(stream, descriptions, verbosity)
+        self.tests = []
+        self.startTimes = {}
+
+    def startTest(self, test):
+        self.startTimes[test.id()] = time.perf_counter()
+        super().startTest(test)
+
+    def addResult(self, test, status, message=None):
+        start = self.startTimes.pop(test.id(), None)
+        duration = time.perf_counter() - start if start is not None else 0.0
+        self.tests.append({"name": test.id().split(".")[-1],
+                           "status": status,
+                           "duration": duration,
+                           "message": message})
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self.addResult(test, "passed")
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self.addResult(test, "failed", self.failures[-1][1])
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self.addResult(test, "error", self.errors[-1][1])
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self.addResult(test, "skipped", reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self.addResult(test, "passed")
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self.addResult(test, "failed", "Unexpected success")
+
+def apply_limits(cpu_time, memory):
+    try:
+        import resource
+    except ImportError:
+        return
+
+    if cpu_time:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_time, cpu_time + 1))
+
+    if memory:
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+def run_tests(solution_dir, test_module_name):
+    # zaladowanie modulu z testami (importuje on modul rozwiazania) i uruchomienie testow
+    # zwraca slownik: output (tekst jak z unittest -v), tests, wasSuccessful
+    output = io.StringIO()
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = output
+    sys.path.insert(0, solution_dir)
+
+    try:
+        try:
+            test_module = importlib.import_module(test_module_name)
+            suite = unittest.defaultTestLoader.loadTestsFromModule(test_module)
+        except BaseException:
+            output.write(traceback.format_exc())
+            return {"output": output.getvalue(), "tests": [], "wasSuccessful": False}
+
+        runner = unittest.TextTestRunner(stream=output, verbosity=2, resultclass=StructuredTestResult)
+        result = runner.run(suite)
+
+        return {"output": output.getvalue(),
+                "tests": result.tests,
+                "wasSuccessful": result.wasSuccessful() and result.testsRun > 0}
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+
+def _child_main(connection, solution_dir, test_module_name, cpu_time, memory):
+    try:
+        os.chdir(solution_dir)
+        apply_limits(cpu_time, memory)
+        result = run_tests(solution_dir, test_module_name)
+    except BaseException:
+        result = {"output": traceback.format_exc(), "tests": [], "wasSuccessful": False}
+
+    connection.send(result)
+    connection.close()
+
+def run_in_forkserver(solution_dir, test_module_name, timeout, memory=None):
+    # uruchomienie testow w procesie potomnym; po przekroczeniu czasu proces jest zabijany
+    context = get_context()
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_child_main,
+                              args=(sender, solution_dir, test_module_name, int(timeout), memory),
+                              daemon=True)
+    process.start()
+    sender.close()
+
+    result = None
+
+    try:
+        if receiver.poll(timeout):
+            result = receiver.recv()
+    except EOFError:
+        # proces zakonczyl sie bez wyniku (np. przekroczenie limitu pamieci)
+        pass
+    finally:
+        receiver.close()
+
+    if result is None:
+        process.kill()
+        process.join()
+
+        if process.exitcode is None or process.exitcode < 0:
+            message = "Przekroczono limit czasu lub zasobow podczas wykonywania testow"
+        else:
+            message = "Proces testujacy zakonczyl sie bez wyniku (kod " + str(process.exitcode) + ")"
+
+        return {"output": message + "\n", "tests": [], "wasSuccessful": False, "timeout": True}
+
+    process.join()
+    return result
+
+
+if __name__ == '__main__':
+    sys.stdout.write(json.dumps(run_tests(sys.argv[1], sys.argv[2])))
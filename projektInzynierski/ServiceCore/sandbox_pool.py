@@ -0,0 +1,233 @@
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+from collections import defaultdict
+from contextlib import contextmanager
+from django.conf import settings
+
+from ServiceCore.utils import EXERCISES_TEMPLATES_DIRECTORY_ROOT
+from ServiceCore.metrics import record_bytes_written
+
+# Pula katalogow roboczych (piaskownic), w ktorych testowane sa rozwiazania.
+# Piaskownice znajduja sie w pamieci RAM (tmpfs, domyslnie /dev/shm) i sa przygotowane
+# z wyprzedzeniem - zawieraja template jezyka (np. pom.xml i katalogi src dla Javy).
+# Executor pobiera piaskownice z puli, zapisuje w niej rozwiazanie i uruchamia testy,
+# a po zakonczeniu piaskownica jest czyszczona i wraca do puli. W katalogu uzytkownika
+# zachowywany jest jedynie plik z rozwiazaniem, a wyniki testow zapisywane sa w bazie.
+#
+# Unit testy cwiczenia skopiowane do piaskownicy (staged) pozostaja w niej po czyszczeniu
+# razem z kluczem (katalog cwiczenia i wersja testow). Zlecenie dla tego samego cwiczenia
+# otrzymuje w miare mozliwosci taka piaskownice, a executor nie kopiuje testow ponownie.
+#
+# Katalog kazdego procesu to <GRADING_SANDBOX_ROOT>/pid-<pid>; katalogi zakonczonych
+# procesow usuwane sa przy tworzeniu puli.
+
+# katalogi tworzone w piaskownicy niezaleznie od zawartosci template
+LANGUAGE_DIRECTORIES = {
+    'java': [os.path.join('src', 'main', 'java'), os.path.join('src', 'test', 'java')],
+}
+
+_sandbox_pool = None
+_sandbox_pool_lock = threading.Lock()
+
+def get_sandbox_root():
+    root = settings.GRADING_SANDBOX_ROOT
+
+    # brak tmpfs w systemie (np. macOS) - katalog tymczasowy
+    if not os.path.isdir(os.path.dirname(root)):
+        root = os.path.join(tempfile.gettempdir(), os.path.basename(root))
+
+    return root
+
+def is_process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+class SandboxPool():
+    def __init__(self, root, pool_size):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.root = root
+        self.pool_size = pool_size
+        self.directory = os.path.join(root, 'pid-' + str(os.getpid()))
+        self.free = defaultdict(list)
+        # piaskownica -> (klucz unit testow, sciezki plikow wzgledem piaskownicy)
+        self.staged = {}
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+        self.removeStaleDirectories()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def removeStaleDirectories(self):
+        # usuniecie piaskownic pozostawionych przez zakonczone procesy
+        if not os.path.isdir(self.root):
+            return
+
+        for name in os.listdir(self.root):
+            if not name.startswith('pid-'):
+                continue
+
+            try:
+                pid = int(name[len('pid-'):])
+            except ValueError:
+                continue
+
+            if pid != os.getpid() and not is_process_alive(pid):
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def getTemplatePath(self, language):
+        return os.path.join(settings.BASE_DIR, EXERCISES_TEMPLATES_DIRECTORY_ROOT, language)
+
+    def provision(self, path, language):
+        # przygotowanie pustej piaskownicy: kopia template jezyka i wymagane katalogi
+        template_path = self.getTemplatePath(language)
+
+        if os.path.isdir(template_path):
+            shutil.copytree(template_path, path)
+        else:
+            os.makedirs(path)
+
+        for directory in LANGUAGE_DIRECTORIES.get(language, []):
+            os.makedirs(os.path.join(path, directory), exist_ok=True)
+
+        record_bytes_written('sandbox', language, [os.path.join(subdir, file) for subdir, dirs, files in os.walk(path) for file in files])
+
+    def create(self, language):
+        path = os.path.join(self.directory, language + '-' + str(next(self.counter)))
+        self.provision(path, language)
+        return path
+
+    def warmUp(self, languages):
+        # przygotowanie piaskownic przed pierwszym rozwiazaniem
+        for language in languages:
+            while True:
+                with self.lock:
+                    if len(self.free[language]) >= self.pool_size:
+                        break
+
+                path = self.create(language)
+
+                with self.lock:
+                    self.free[language].append(path)
+
+    def checkout(self, language, exercise_path=None):
+        # piaskownica z unit testami cwiczenia exercise_path, a gdy jej brak - dowolna
+        with self.lock:
+            free = self.free[language]
+
+            for index in range(len(free) - 1, -1, -1):
+                staged = self.staged.get(free[index])
+
+                if exercise_path is not None and staged is not None and staged[0][0] == exercise_path:
+                    return free.pop(index)
+
+            if free:
+                return free.pop()
+
+        return self.create(language)
+
+    def getStagedKey(self, path):
+        with self.lock:
+            staged = self.staged.get(path)
+
+        return staged[0] if staged is not None else None
+
+    def getStagedFiles(self, path):
+        with self.lock:
+            staged = self.staged.get(path)
+
+        return staged[1] if staged is not None else []
+
+    def setStaged(self, path, key, files):
+        # key - krotka, ktorej pierwszym elementem jest katalog cwiczenia
+        with self.lock:
+            self.staged[path] = (key, list(files))
+
+    def removeStaged(self, path):
+        # usuniecie unit testow poprzedniego cwiczenia z piaskownicy
+        with self.lock:
+            staged = self.staged.pop(path, None)
+
+        if staged is not None:
+            for file in staged[1]:
+                try:
+                    os.remove(os.path.join(path, file))
+                except OSError:
+                    pass
+
+    def moveFiles(self, source, destination, files):
+        for file in files:
+            destination_path = os.path.join(destination, file)
+            os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+            os.replace(os.path.join(source, file), destination_path)
+
+    def checkin(self, path, language):
+        # wyczyszczenie piaskownicy (usuniecie rozwiazania i wynikow) i zwrocenie jej do puli;
+        # unit testy sa przenoszone na czas czyszczenia, nadmiarowe piaskownice sa usuwane
+        with self.lock:
+            staged = self.staged.pop(path, None)
+            keep = len(self.free[language]) < self.pool_size
+
+        if not keep:
+            shutil.rmtree(path, ignore_errors=True)
+            return
+
+        staged_path = path + '.staged'
+
+        try:
+            if staged is not None:
+                self.moveFiles(path, staged_path, staged[1])
+
+            shutil.rmtree(path, ignore_errors=True)
+            self.provision(path, language)
+
+            if staged is not None:
+                self.moveFiles(staged_path, path, staged[1])
+        except OSError as e:
+            self.logger.info("Nie udalo sie przygotowac piaskownicy " + path + " - " + str(e))
+            shutil.rmtree(path, ignore_errors=True)
+            return
+        finally:
+            shutil.rmtree(staged_path, ignore_errors=True)
+
+        with self.lock:
+            if staged is not None:
+                self.staged[path] = staged
+
+            self.free[language].append(path)
+
+    @contextmanager
+    def sandbox(self, language, exercise_path=None):
+        path = self.checkout(language, exercise_path)
+
+        try:
+            yield path
+        finally:
+            self.checkin(path, language)
+
+def get_sandbox_pool():
+    # pula tworzona jest osobno w kazdym procesie (rowniez po fork w run_grading_workers)
+    global _sandbox_pool
+
+    with _sandbox_pool_lock:
+        if _sandbox_pool is None or not _sandbox_pool.directory.endswith('pid-' + str(os.getpid())):
+            _sandbox_pool = SandboxPool(get_sandbox_root(), settings.GRADING_SANDBOX_POOL_SIZE)
+
+    return _sandbox_pool
+
+def warm_up():
+    if not settings.GRADING_SANDBOX_ENABLED:
+        return False
+
+    get_sandbox_pool().warmUp(['python', 'java'])
+    return True
@@ -1,9 +1,80 @@
 
 import os
+import json
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth.models import User
+from django.db.models import OuterRef, Subquery
 from ServiceCore.models import *
 from ServiceCore.utils import getUserSolutionPath
+from ServiceCore.db_utils import apply_eager_loading
+from ServiceCore.file_cache import read_file_cached
+from ServiceCore.user_types import USER_TYPE_CLAIM, get_user_type
+
+
+# Sciezki relacji odczytywanych przez serializery - wykorzystywane do pobrania
+# danych z wyprzedzeniem (setup_eager_loading), aby liczba zapytan nie zalezala
+# od liczby zadan, grup, studentow i rozwiazan. prefix - sciezka do obiektu
+def user_lookups(prefix=''):
+    return [prefix + 'profile__userType']
+
+def exercise_lookups(prefix=''):
+    return user_lookups(prefix + 'author__') + [prefix + 'language', prefix + 'level', prefix + 'unit_tests']
+
+def test_lookups(prefix=''):
+    return exercise_lookups(prefix + 'exercises__')
+
+def group_lookups(prefix=''):
+    return user_lookups(prefix + 'users__')
+
+def task_lookups(prefix=''):
+    return user_lookups(prefix + 'author__') + \
+           [prefix + 'taskType', prefix + 'solutionType'] + \
+           group_lookups(prefix + 'assigned_to__') + \
+           exercise_lookups(prefix + 'exercise__') + \
+           test_lookups(prefix + 'test__')
+
+def solution_exercise_lookups(prefix=''):
+    return exercise_lookups(prefix + 'exercise__') + [prefix + 'test_case_results']
+
+def solution_lookups(prefix='', with_task=True):
+    # with_task=False - rozwiazania pobierane z zadania (task.solutions), zadanie jest juz pobrane
+    lookups = user_lookups(prefix + 'user__') + \
+              solution_exercise_lookups(prefix + 'solution_exercise__') + \
+              solution_exercise_lookups(prefix + 'solution_test__exercises_solutions__') + \
+              [prefix + 'solution_test__exercises_solutions__solution__user',
+               prefix + 'solution_test__exercises_solutions__solution__task__taskType',
+               prefix + 'solution_test__exercises_solutions__solution__task__author',
+               prefix + 'solution_test__exercises_solutions__solution__task__assigned_to']
+
+    if with_task:
+        lookups += task_lookups(prefix + 'task__')
+
+    return lookups
+
+
+# Serializer z wyborem zwracanych pol
+#   - fields - lista zwracanych pol (pozostale pola sa pomijane)
+#   - expand - relacje z expandable_fields zwracane jako zagniezdzone obiekty zamiast pk
+# Parametry przekazywane sa przez widoki z DynamicFieldsViewMixin (?fields=, ?expand=)
+class DynamicFieldsMixin():
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+
+        super().__init__(*args, **kwargs)
+
+        for field_name in (expand or []):
+            if field_name in self.expandable_fields:
+                serializer_class, serializer_kwargs = self.expandable_fields[field_name]
+                self.fields[field_name] = serializer_class(read_only=True, **serializer_kwargs)
+
+        if fields:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
 
 #UnitTest model serializer
 class UnitTestSerializer(serializers.ModelSerializer):
@@ -54,6 +125,10 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('pk', 'username', 'email', 'first_name', 'last_name', 'profile')
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return apply_eager_loading(queryset, user_lookups())
     
 
 # ServiceCore Group model serializer 
@@ -79,6 +154,10 @@ class ExerciseSerializer(serializers.ModelSerializer):
         model = Exercise
         fields = ('pk', 'author', 'title', 'language', 'content', 'level', 'unit_tests')
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return apply_eager_loading(queryset, exercise_lookups())
+
 
 class TestSerializer(serializers.ModelSerializer):
     exercises = ExerciseSerializer(many=True)
@@ -86,6 +165,10 @@ class TestSerializer(serializers.ModelSerializer):
         model = Test
         fields = ('pk', 'title', 'exercises')
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return apply_eager_loading(queryset, test_lookups())
+
 class TaskTypeSerializer(serializers.ModelSerializer):
     class Meta:
         model = TaskType
@@ -105,7 +188,7 @@ class TaskSerializer(serializers.ModelSerializer):
         fields = ('pk', 'author', 'taskType', 'assigned_to', 'title', 'exercise', 'test', 'isActive', 'isRated', 'solutionType')
 
 
-class GroupWithAssignedTasksSerializer(serializers.ModelSerializer):
+class GroupWithAssignedTasksSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     users = UserSerializer(many=True)
     activeTasks = serializers.SerializerMethodField('getActiveTasks') # wyswietla zadania ktore sa przypisane do grup
     archivedTasks = serializers.SerializerMethodField('getArchivedTasks') # wyswietla zadania nieaktywne juz
@@ -114,13 +197,18 @@ class GroupWithAssignedTasksSerializer(serializers.ModelSerializer):
         model = Group
         fields = ('pk', 'name', 'users', 'activeTasks', 'archivedTasks')
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return apply_eager_loading(queryset, group_lookups() + task_lookups('tasks__'))
+
+    # zadania filtrowane w pamieci, aby wykorzystac pobrane z wyprzedzeniem group.tasks
     def getActiveTasks(self, group):
-        activeTasks = group.tasks.filter(isActive=True)
-        return TaskSerializer(activeTasks, many=True).data
+        activeTasks = [task for task in group.tasks.all() if task.isActive]
+        return TaskSerializer(activeTasks, many=True, context=self.context).data
     
     def getArchivedTasks(self, group):
-        archivedTasks = group.tasks.filter(isActive=False)
-        return TaskSerializer(archivedTasks, many=True).data
+        archivedTasks = [task for task in group.tasks.all() if not task.isActive]
+        return TaskSerializer(archivedTasks, many=True, context=self.context).data
 
 
 class TaskWithAssignedGroupsSerializer(serializers.ModelSerializer):
@@ -135,7 +223,7 @@ class TaskWithAssignedGroupsSerializer(serializers.ModelSerializer):
         model = Task
         fields = ('pk', 'author', 'taskType', 'title', 'assigned_to', 'exercise', 'test', 'isActive', 'isRated', 'solutionType')
 
-class TaskWithSolutionData(serializers.ModelSerializer):    
+class TaskWithSolutionData(DynamicFieldsMixin, serializers.ModelSerializer):    
     author = UserSerializer()
     taskType = TaskTypeSerializer()
     exercise = ExerciseSerializer()
@@ -147,22 +235,50 @@ class TaskWithSolutionData(serializers.ModelSerializer):
     class Meta:
         model = Task
         fields = ('pk', 'author', 'taskType', 'title', 'assigned_to', 'exercise', 'test' ,'isActive', 'isRated','solution', 'solutionType')
+
+    @staticmethod
+    def setup_eager_loading(queryset, with_solutions=True):
+        if not with_solutions:
+            return apply_eager_loading(queryset, task_lookups())
+
+        return apply_eager_loading(queryset, task_lookups() + solution_lookups('solutions__', with_task=False))
     
     def getSolution(self, task):
         solution = task.solutions.all()
-        return SolutionSerializer(solution, many=True).data
+        return SolutionSerializer(solution, many=True, context=self.context).data
+
+class TestCaseResultSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TestCaseResult
+        fields = ('name', 'status', 'duration', 'message')
 
 class SolutionExerciseSerializer(serializers.ModelSerializer):
     exercise = ExerciseSerializer()    
     solution_value = serializers.SerializerMethodField('get_solution_value_from_file')
     test_results = serializers.SerializerMethodField()
+    test_cases = TestCaseResultSerializer(source='test_case_results', many=True, read_only=True)
 
     class Meta:
         model = SolutionExercise
-        fields = ('pk', 'rate', 'github_link', 'solution_value', 'exercise', 'test_results')
+        fields = ('pk', 'rate', 'github_link', 'solution_value', 'exercise', 'test_results', 'test_cases')
     
+    def to_representation(self, solution_exercise):
+        # na listach zawartosc pliku z rozwiazaniem zwracana jest jedynie z parametrem ?include=source
+        if not self.isSourceIncluded():
+            self.fields.pop('solution_value', None)
+
+        return super().to_representation(solution_exercise)
+
+    def isSourceIncluded(self):
+        request = self.context.get('request')
+        view = self.context.get('view')
+
+        if request is None or view is None or getattr(view, 'action', None) != 'list':
+            return True
+
+        return 'source' in request.query_params.get('include', '').split(',')
+
     def get_solution_value_from_file(self, solution_exercise):
-        sol_val = None
         solution_file_path = None
 
         try:
@@ -171,13 +287,14 @@ class SolutionExerciseSerializer(serializers.ModelSerializer):
             print(e)
             return ""
         
-        if os.path.isfile(solution_file_path):
-            with open(solution_file_path, 'r') as f:
-                sol_val = f.read()
-            
-            return sol_val
+        return read_file_cached(solution_file_path)
         
     def get_test_results(self, solution_exercise):
+        if solution_exercise.test_output is not None:
+            return solution_exercise.test_output
+
+        # raport bez zapisu w bazie danych - odczyt z katalogu roboczego
+        # (raporty rozwiazan sprawdzonych przed zapisywaniem ich w bazie przepisuje migracja 0056)
         solution = solution_exercise.solution
         test_results = None
         results_file_path = ""
@@ -195,12 +312,10 @@ class SolutionExerciseSerializer(serializers.ModelSerializer):
         else:
             results_file_path = os.path.join(solution_path, 'target', 'surefire-reports', 'UnitTest.txt')
 
-        if os.path.isfile(results_file_path):
-            try:
-                with open(results_file_path, 'r') as f:
-                    test_results = f.read()
-            except Exception as e:
-                print(str(e))
+        try:
+            test_results = read_file_cached(results_file_path)
+        except Exception as e:
+            print(str(e))
 
         return test_results
 
@@ -216,9 +331,9 @@ class SolutionTestSerializer(serializers.ModelSerializer):
 
     def get_exercises_solutions(self, solution_test):
         solutions_exerc = solution_test.exercises_solutions.all()
-        return SolutionExerciseSerializer(solutions_exerc, many=True).data
+        return SolutionExerciseSerializer(solutions_exerc, many=True, context=self.context).data
 
-class SolutionSerializer(serializers.ModelSerializer):
+class SolutionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer()
     task = TaskSerializer()
     solution_test = SolutionTestSerializer()
@@ -229,3 +344,76 @@ class SolutionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Solution
         fields = ('pk', 'user', 'task', 'rate', 'solution_test', 'solution_exercise')
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return apply_eager_loading(queryset, solution_lookups())
+
+# Rozwiazanie bez zagniezdzonego zadania, grupy i cwiczen - relacje zwracane sa jako pk,
+# a pelne obiekty jedynie na zadanie (?expand=user,task,solution_exercise)
+#   - status - stan ostatniego zlecenia sprawdzenia rozwiazania (GradingJob)
+class CompactSolutionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    task = serializers.PrimaryKeyRelatedField(read_only=True)
+    solution_exercise = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    status = serializers.SerializerMethodField()
+
+    expandable_fields = {
+        'user': (UserSerializer, {}),
+        'task': (TaskSerializer, {}),
+        'solution_exercise': (SolutionExerciseSerializer, {'many': True}),
+    }
+
+    class Meta:
+        model = Solution
+        fields = ('pk', 'user', 'task', 'rate', 'status', 'solution_exercise')
+
+    @staticmethod
+    def setup_eager_loading(queryset, expand=()):
+        lookups = ['solution_exercise']
+
+        if 'user' in expand:
+            lookups += user_lookups('user__')
+
+        if 'task' in expand:
+            lookups += task_lookups('task__')
+
+        if 'solution_exercise' in expand:
+            lookups += solution_exercise_lookups('solution_exercise__') + \
+                       ['task__taskType', 'task__author', 'task__assigned_to', 'user']
+
+        latest_job = GradingJob.objects.filter(task=OuterRef('task'), user=OuterRef('user')).order_by('-pk')
+        queryset = queryset.annotate(grading_status=Subquery(latest_job.values('status')[:1]))
+
+        return apply_eager_loading(queryset, lookups)
+
+    def get_status(self, solution):
+        return getattr(solution, 'grading_status', None)
+
+class GradingJobSerializer(serializers.ModelSerializer):
+    result = serializers.BooleanField(source='unit_tests_passed')
+    test_results = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GradingJob
+        fields = ('pk', 'task', 'exercise', 'batch', 'status', 'result', 'message', 'test_results', 'created_at', 'started_at', 'finished_at')
+
+    def get_test_results(self, grading_job):
+        if not grading_job.test_results:
+            return []
+
+        return json.loads(grading_job.test_results)
+
+# token JWT z rodzajem uzytkownika (claim user_type) - widoki nie musza pobierac obiektu Profile
+class UserTypeTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+
+        try:
+            token[USER_TYPE_CLAIM] = get_user_type(user)
+        except Profile.DoesNotExist:
+            # np. administrator bez profilu - rodzaj ustalany przy kazdym zadaniu
+            pass
+
+        return token
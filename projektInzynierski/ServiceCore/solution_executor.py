@@ -1,11 +1,19 @@
 
 import subprocess
 
-from ServiceCore.models import Task, TaskType, SolutionType, Solution, Language
+from ServiceCore.models import Task, TaskType, SolutionType, Solution, Language, TestCaseResult
 from ServiceCore.utils import *
+from ServiceCore.grading_cache import get_grading_result_cache, get_grading_cache_key
+from ServiceCore.blob_store import get_blob_path, store_blob_file
+from ServiceCore.grading_metrics import PhaseTimer
+from ServiceCore.metrics import record_bytes_written
+from ServiceCore import sandbox_pool
 from django.core.files.storage import FileSystemStorage
 
 class SolutionExecutor():
+    # nazwa jezyka uzywana w etykietach pomiarow czasu
+    languageName = None
+
     def __init__(self):
         self.user = None
         self.task = None
@@ -15,27 +23,264 @@ class SolutionExecutor():
         self.solutionsToRun = None
         self.testCommand = []
         self.testsResult = []
+        # wyniki poszczegolnych testow - slowniki z kluczami name, status, duration, message
+        self.testCaseResults = []
+        self.solutionExercise = None
+        self.resultCacheable = True
+        # piaskownica (sandbox_pool), w ktorej testowane jest rozwiazanie - None oznacza katalog uzytkownika
+        self.sandboxPath = None
+        # pliki z unit testami skopiowane przez copyUnitTestsToSolutionDir
+        self.unitTestFiles = []
+        # skrot pliku z rozwiazaniem w magazynie blob_store
+        self.sourceHash = None
+        # czasy etapow sprawdzania rozwiazania (grading_metrics)
+        self.timer = PhaseTimer()
         self.fs = FileSystemStorage()
 
-    def configure(self, user, task, solutionData):
+    def configure(self, user, task, solutionData, sandboxPath=None):
         self.user = user
         self.task = task
         self.solutionData = solutionData
+        self.sandboxPath = sandboxPath
 
-        self.configureRuntime()
+        with self.timer.phase('configure'):
+            self.configureRuntime()
 
     def configureRuntime(self):
         pass
 
     def copyUnitTestsToSolutionDir(self):
         pass
+
+    def getUnitTestsVersion(self, exercisePath):
+        # nazwy, rozmiary i czasy modyfikacji plikow cwiczenia (bez skompilowanych klas w target)
+        version = []
+
+        for subdir, dirs, files in os.walk(exercisePath):
+            dirs[:] = [directory for directory in dirs if directory != 'target']
+
+            for file in files:
+                file_stat = os.stat(os.path.join(subdir, file))
+                version.append((os.path.relpath(os.path.join(subdir, file), exercisePath), file_stat.st_mtime_ns, file_stat.st_size))
+
+        return tuple(sorted(version))
+
+    def stageUnitTests(self, exercisePath, *key):
+        # kopiowanie unit testow cwiczenia; w piaskownicy wykorzystywane sa testy pozostawione
+        # przez poprzednie zlecenie dla tego samego cwiczenia (i tej samej wersji testow)
+        # zwraca True, jezeli testy nie byly kopiowane
+        if self.sandboxPath is None:
+            self.copyUnitTestsToSolutionDir(exercisePath)
+            return False
+
+        pool = sandbox_pool.get_sandbox_pool()
+        stage_key = (exercisePath, self.solutionData['filename']) + key + (self.getUnitTestsVersion(exercisePath),)
+
+        if pool.getStagedKey(self.sandboxPath) == stage_key:
+            return True
+
+        pool.removeStaged(self.sandboxPath)
+        self.unitTestFiles = []
+        self.copyUnitTestsToSolutionDir(exercisePath)
+
+        if self.readyToRunSolution and self.unitTestFiles:
+            pool.setStaged(self.sandboxPath, stage_key, [os.path.relpath(path, self.sandboxPath) for path in self.unitTestFiles])
+
+        return False
     
     def run(self):
+        if not self.isReady():
+            self.logger.info("Executor nie jest gotowy do uruchomienia")
+            return (False, False, "Executor nie jest gotowy do uruchomienia")
+
+        try:
+            with self.timer.phase('persist_solution'):
+                self.persistSolutionFile()
+
+            record_bytes_written('solution', self.languageName, [self.getSolutionFilePath()])
+        except Exception as e:
+            self.logger.info("Nie udalo sie zachowac pliku z rozwiazaniem - " + str(e))
+            return (False, False, "Nie udalo sie zapisac rozwiazania")
+
+        cache_key = None
+
+        try:
+            with self.timer.phase('cache_lookup'):
+                cache_key = self.getResultCacheKey(self.getSolutionFilePath())
+                cached_result = self.restoreCachedResult(cache_key)
+
+            if cached_result is not None:
+                self.logger.info("Wynik rozwiazania odczytany z pamieci podrecznej")
+
+                with self.timer.phase('save_results'):
+                    self.saveTestResults()
+
+                return cached_result
+        except Exception as e:
+            self.logger.info("Nie udalo sie odczytac wyniku z pamieci podrecznej - " + str(e))
+
+        with self.timer.phase('run_tests'):
+            result = self.runUnitTests()
+
+        self.storeResultInCache(cache_key, result, self.getResultFiles())
+
+        with self.timer.phase('save_results'):
+            self.saveTestResults()
+
+        record_bytes_written('results', self.languageName, [os.path.join(self.fs.location, relative_path)
+                                                            for relative_path in self.getResultFiles()])
+        return result
+
+    def getTimingLabels(self):
+        # etykiety pomiarow czasu etapow (grading_metrics.LABEL_NAMES)
+        solution_type = None
+
+        if self.solutionData is not None:
+            solution_type = self.solutionData.get('solutionType')
+
+        if isinstance(solution_type, list):
+            solution_type = solution_type[0] if solution_type else None
+
+        return {'language': self.languageName,
+                'solution_type': solution_type,
+                'task_type': self.task.taskType.name if self.task is not None else None}
+
+    def saveTestResults(self):
+        # zapisanie w bazie danych raportu z testowania oraz wynikow poszczegolnych testow,
+        # aby serializery nie musialy odczytywac plikow z wynikami
+        if self.solutionExercise is None:
+            return
+
+        test_output_path = os.path.join(self.fs.location, self.getTestOutputFile())
+        test_output = None
+
+        if os.path.isfile(test_output_path):
+            with open(test_output_path, "r") as test_output_file:
+                test_output = test_output_file.read()
+
+        self.solutionExercise.test_output = test_output
+        self.solutionExercise.save(update_fields=['test_output'])
+        self.saveTestCaseResults()
+
+    def saveTestCaseResults(self):
+        # zastapienie wynikow poprzedniego rozwiazania wynikami biezacego
+        if self.solutionExercise is None:
+            return
+
+        TestCaseResult.objects.filter(solution_exercise=self.solutionExercise).delete()
+        TestCaseResult.objects.bulk_create([TestCaseResult(solution_exercise=self.solutionExercise,
+                                                           name=test_case['name'][:256],
+                                                           status=test_case['status'],
+                                                           duration=test_case['duration'],
+                                                           message=test_case['message'])
+                                            for test_case in self.testCaseResults])
+
+    def areAllTestsPassed(self):
+        return len(self.testCaseResults) > 0 and \
+               all([test_case['status'] not in (TestCaseResult.FAILED, TestCaseResult.ERROR) for test_case in self.testCaseResults])
+
+    def runUnitTests(self):
         pass
 
+    def getSolutionFilePath(self):
+        pass
+
+    def getTestOutputFile(self):
+        # raport z testowania zwracany przez API (sciezka wzgledem self.fs.location)
+        return "result.txt"
+
+    def getResultFiles(self):
+        # pliki z wynikami (sciezki wzgledem self.fs.location) odtwarzane z pamieci podrecznej
+        return ["result.txt"]
+
     def isReady(self):
         return self.readyToRunSolution
 
+    def getWorkspacePath(self, exercise=None):
+        # katalog, w ktorym zapisywane i testowane jest rozwiazanie
+        if self.sandboxPath is not None:
+            return self.sandboxPath
+
+        return getUserSolutionPath(self.task, self.task.assigned_to, self.user, exercise)
+
+    def getPersistentSolutionFilePath(self):
+        # sciezka pliku z rozwiazaniem w magazynie blob_store (zapisywana w SolutionExercise.pathToFile)
+        return get_blob_path(self.sourceHash)
+
+    def persistSolutionFile(self):
+        # zapisanie pliku z rozwiazaniem w magazynie adresowanym skrotem zawartosci
+        self.sourceHash = store_blob_file(self.getSolutionFilePath())
+
+    def getExercise(self):
+        # cwiczenie, ktorego dotyczy rozwiazanie (rowniez cwiczenie w ramach testu)
+        if self.task.taskType.name == 'Exercise':
+            return self.task.exercise
+
+        exercise_pk = self.solutionData['exercisePk']
+
+        if isinstance(exercise_pk, list):
+            exercise_pk = exercise_pk[0]
+
+        return self.task.test.exercises.get(pk=exercise_pk)
+
+    def getRuntimeVersion(self):
+        return ""
+
+    def saveSolutionExercise(self):
+        pass
+
+    def getResultCacheKey(self, solution_path):
+        with open(solution_path, "rb") as solution_file:
+            return get_grading_cache_key(solution_file.read(), self.getExercise(), self.getRuntimeVersion())
+
+    def restoreCachedResult(self, cache_key):
+        # odtworzenie wyniku identycznego rozwiazania bez ponownego uruchamiania testow
+        cached = get_grading_result_cache().get(cache_key)
+
+        if cached is None:
+            return None
+
+        for relative_path, content in cached['files'].items():
+            file_path = os.path.join(self.fs.location, relative_path)
+
+            if content is None:
+                if os.path.isfile(file_path):
+                    os.remove(file_path)
+                continue
+
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+            with open(file_path, "w") as result_file:
+                result_file.write(content)
+
+        self.saveSolutionExercise()
+        self.testsResult.extend(cached['tests_result'])
+        self.testCaseResults = list(cached['test_case_results'])
+
+        return tuple(cached['result'])
+
+    def storeResultInCache(self, cache_key, result, result_files):
+        # zapamietywane sa jedynie wyniki zakonczonego testowania
+        if cache_key is None or not result[0] or not self.resultCacheable:
+            return
+
+        files = {}
+
+        for relative_path in result_files:
+            file_path = os.path.join(self.fs.location, relative_path)
+
+            if os.path.isfile(file_path):
+                with open(file_path, "r") as result_file:
+                    files[relative_path] = result_file.read()
+            else:
+                files[relative_path] = None
+
+        get_grading_result_cache().put(cache_key, {"exercise_pk": self.getExercise().pk,
+                                                   "result": result,
+                                                   "tests_result": list(self.testsResult),
+                                                   "test_case_results": list(self.testCaseResults),
+                                                   "files": files})
+
     '''
     def configureForExercise(self):
         self.solutionType = SolutionType.objects.get(name=self.solutionData['solutionType'])
@@ -1,3 +1,245 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from ServiceCore.models import (Exercise, GradingJob, Group, Language, Level, Profile, Solution, SolutionExercise, SolutionType,
+                                Task, TaskType, TestCaseResult, UnitTest, UserType)
+from ServiceCore.serializers import UserTypeTokenObtainPairSerializer
+from ServiceCore.grading_queue import enqueue_solution, process_grading_job, run_grading_batch
+from ServiceCore.python_executor import PythonExecutor
+from ServiceCore.unit_tests_utils import create_unit_tests
+from ServiceCore.utils import (EXERCISES_DIRECTORY_ROOT, SOLUTIONS_DIRECTORY_ROOT, TESTS_DIRECTORY_ROOT,
+                               createExerciseRootDirectory, createTaskSolutionsRootDirectory)
+
+def create_reference_data():
+    # slowniki tworzone przez initial_data.json
+    Language.objects.get_or_create(name='Python', defaults={'allowed_extension': '.py'})
+    Level.objects.get_or_create(name='Podstawowy')
+    TaskType.objects.get_or_create(name='Exercise')
+    SolutionType.objects.get_or_create(name='Editor')
+
+    for name in ('Teacher', 'Student'):
+        UserType.objects.get_or_create(name=name)
+
+def create_base_directory():
+    # katalog BASE_DIR z glownymi katalogami cwiczen, kolokwiow i rozwiazan
+    base_dir = tempfile.mkdtemp(prefix='servicecore-test-')
+
+    for directory in (EXERCISES_DIRECTORY_ROOT, TESTS_DIRECTORY_ROOT, SOLUTIONS_DIRECTORY_ROOT):
+        os.makedirs(os.path.join(base_dir, directory))
+
+    return base_dir
+
+def create_user(username, user_type):
+    user = User.objects.create(username=username)
+    Profile.objects.create(user=user, userType=UserType.objects.get(name=user_type))
+    return user
+
+def create_exercise(author, title, unit_tests):
+    exercise = Exercise.objects.create(author=author, title=title, content="Suma dwoch liczb",
+                                       level=Level.objects.get(name='Podstawowy'),
+                                       language=Language.objects.get(name='Python'))
+    createExerciseRootDirectory(exercise)
+    create_unit_tests(exercise, unit_tests)
+    return exercise
+
+def create_task(author, title, exercise, group):
+    task = Task.objects.create(author=author, title=title, exercise=exercise, assigned_to=group,
+                               taskType=TaskType.objects.get(name='Exercise'),
+                               solutionType=SolutionType.objects.get(name='Editor'))
+    createTaskSolutionsRootDirectory(task)
+    return task
+
+# Rownolegle sprawdzanie rozwiazan w watkach jednego procesu (executory nie zmieniaja
+# katalogu roboczego procesu). Wymaga interpretera Python do uruchomienia unit testow.
+class ConcurrentGradingTest(TransactionTestCase):
+    JOBS_NUMBER = 64
+
+    def setUp(self):
+        self.base_dir = create_base_directory()
+        self.settings_override = override_settings(BASE_DIR=self.base_dir, GRADING_QUEUE_ASYNC=True)
+        self.settings_override.enable()
+        create_reference_data()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_concurrent_gradings_in_sandboxes(self):
+        self.runConcurrentGradings()
+
+    @override_settings(GRADING_SANDBOX_ENABLED=False)
+    def test_concurrent_gradings_in_solution_directories(self):
+        self.runConcurrentGradings()
+
+    def runConcurrentGradings(self):
+        teacher = create_user('nauczyciel', 'Teacher')
+        exercise = create_exercise(teacher, 'Suma', ['self.assertEqual(suma(1, 2), 3)', 'self.assertEqual(suma(-1, 1), 0)'])
+        expected_results = {}
+
+        # kazde zlecenie ma wlasnego studenta i zadanie; co drugie rozwiazanie jest niepoprawne,
+        # a kazde ma inna tresc (bez trafien w pamieci podrecznej wynikow)
+        for index in range(self.JOBS_NUMBER):
+            student = create_user('student' + str(index), 'Student')
+            group = Group.objects.create(name='grupa' + str(index), owner=teacher)
+            group.users.add(student)
+            task = create_task(teacher, 'zadanie' + str(index), exercise, group)
+
+            correct = index % 2 == 0
+            # tak jak w SolutionViewSet.create - obiekt Solution tworzony przed dodaniem zlecenia
+            Solution.objects.create(task=task, user=student)
+            solution = "# student {}\ndef suma(a, b):\n    return a {} b\n".format(index, '+' if correct else '-')
+            job = enqueue_solution(student, task, exercise, {'taskPk': task.pk, 'solutionType': 'Editor', 'solution': solution})
+            expected_results[job.pk] = correct
+
+        GradingJob.objects.filter(pk__in=list(expected_results)).update(batch='stress')
+        cwd = os.getcwd()
+
+        finished_jobs = run_grading_batch('stress', self.JOBS_NUMBER)
+
+        self.assertEqual(os.getcwd(), cwd)
+        self.assertEqual(len(finished_jobs), self.JOBS_NUMBER)
+
+        for job in GradingJob.objects.filter(batch='stress'):
+            self.assertEqual(job.status, GradingJob.DONE, job.message)
+            self.assertTrue(job.execution_success, job.message)
+            self.assertEqual(job.unit_tests_passed, expected_results[job.pk], "zlecenie pk=" + str(job.pk))
+
+# Unit testy cwiczenia pozostaja w piaskownicy i sa wykorzystywane przez kolejne
+# rozwiazanie tego samego cwiczenia, dopoki testy nie zostana zmienione.
+class SandboxUnitTestsStagingTest(TransactionTestCase):
+    def setUp(self):
+        self.base_dir = create_base_directory()
+        self.settings_override = override_settings(BASE_DIR=self.base_dir)
+        self.settings_override.enable()
+        create_reference_data()
+
+        self.teacher = create_user('nauczyciel', 'Teacher')
+        self.student = create_user('student', 'Student')
+        self.exercise = create_exercise(self.teacher, 'Suma', ['self.assertEqual(suma(1, 2), 3)'])
+        group = Group.objects.create(name='grupa', owner=self.teacher)
+        group.users.add(self.student)
+        self.task = create_task(self.teacher, 'zadanie', self.exercise, group)
+        Solution.objects.create(task=self.task, user=self.student)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def grade(self, index, correct):
+        solution = "# rozwiazanie {}\ndef suma(a, b):\n    return a {} b\n".format(index, '+' if correct else '-')
+        job = enqueue_solution(self.student, self.task, self.exercise, {'taskPk': self.task.pk, 'solutionType': 'Editor', 'solution': solution})
+        process_grading_job(job)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, GradingJob.DONE, job.message)
+        self.assertEqual(job.unit_tests_passed, correct, job.message)
+
+    def test_unit_tests_are_copied_once_per_exercise_version(self):
+        copy_unit_tests = PythonExecutor.copyUnitTestsToSolutionDir
+
+        with mock.patch.object(PythonExecutor, 'copyUnitTestsToSolutionDir', autospec=True, side_effect=copy_unit_tests) as copy_mock:
+            self.grade(0, True)
+            self.grade(1, False)
+            self.grade(2, True)
+            self.assertEqual(copy_mock.call_count, 1)
+
+            # zmiana unit testow - nowa wersja kopiowana jest do piaskownicy
+            create_unit_tests(self.exercise, ['self.assertEqual(suma(2, 2), 4)'])
+            self.grade(3, True)
+            self.grade(4, False)
+            self.assertEqual(copy_mock.call_count, 2)
+
+# Liczba zapytan SQL list zadan i rozwiazan nie zalezy od liczby zadan i studentow
+# (brak zapytan N+1 w serializerach). Dane tworzone sa jedynie w bazie danych.
+class ListQueryCountTest(TestCase):
+    TASKS_NUMBER = 6
+    STUDENTS_NUMBER = 5
+    URLS = ('/tasks/', '/solutions/')
+
+    def setUp(self):
+        create_reference_data()
+        self.teacher = create_user('nauczyciel', 'Teacher')
+        self.students = []
+        self.groups = []
+
+    def getClient(self, user):
+        # token z rodzajem uzytkownika - jak po zalogowaniu przez /token/
+        client = APIClient()
+        access_token = UserTypeTokenObtainPairSerializer.get_token(user).access_token
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(access_token))
+        return client
+
+    def addTask(self):
+        index = len(self.groups)
+        exercise = Exercise.objects.create(author=self.teacher, title='cwiczenie' + str(index), content="Suma dwoch liczb",
+                                           level=Level.objects.get(name='Podstawowy'),
+                                           language=Language.objects.get(name='Python'))
+
+        for test_index in range(2):
+            UnitTest.objects.create(exercise=exercise, pathToFile="", content='self.assertEqual(suma(1, 2), 3)')
+
+        group = Group.objects.create(name='grupa' + str(index), owner=self.teacher)
+        Task.objects.create(author=self.teacher, title='zadanie' + str(index), exercise=exercise, assigned_to=group,
+                            taskType=TaskType.objects.get(name='Exercise'),
+                            solutionType=SolutionType.objects.get(name='Editor'))
+        self.groups.append(group)
+
+        for student in self.students:
+            self.addSolution(group, student)
+
+    def addStudent(self):
+        student = create_user('student' + str(len(self.students)), 'Student')
+        self.students.append(student)
+
+        for group in self.groups:
+            self.addSolution(group, student)
+
+    def addSolution(self, group, student):
+        group.users.add(student)
+        task = group.tasks.get()
+        solution = Solution.objects.create(task=task, user=student)
+        solution_exercise = SolutionExercise.objects.create(solution=solution, exercise=task.exercise, pathToFile="",
+                                                            test_output="OK")
+        TestCaseResult.objects.create(solution_exercise=solution_exercise, name='test_0', status=TestCaseResult.PASSED)
+
+    def countQueries(self):
+        counts = {}
+
+        for user in (self.teacher, self.students[0]):
+            client = self.getClient(user)
+
+            for url in self.URLS:
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url)
+
+                self.assertEqual(response.status_code, 200)
+                counts[(user.username, url)] = (len(queries), len(response.data))
+
+        return counts
+
+    def test_query_count_does_not_grow_with_tasks_and_students(self):
+        self.addStudent()
+        self.addTask()
+        small_counts = self.countQueries()
+
+        for index in range(self.TASKS_NUMBER - 1):
+            self.addTask()
+
+        for index in range(self.STUDENTS_NUMBER - 1):
+            self.addStudent()
+
+        large_counts = self.countQueries()
+
+        for key, (queries_number, objects_number) in small_counts.items():
+            large_queries_number, large_objects_number = large_counts[key]
+            self.assertGreater(large_objects_number, objects_number, key)
+            self.assertEqual(large_queries_number, queries_number, key)
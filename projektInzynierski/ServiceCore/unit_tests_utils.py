@@ -1,5 +1,9 @@
+import shutil
+
 from ServiceCore.utils import *
 from ServiceCore.models import UnitTest
+from ServiceCore.jvm_daemon import get_test_classes_cache_path
+from ServiceCore.grading_cache import invalidate_exercise_results
 
 
 def create_python_unit_tests(exercise, unit_tests_data, save_model=True):
@@ -12,6 +16,9 @@ def create_python_unit_tests(exercise, unit_tests_data, save_model=True):
     lines_to_write = ['import unittest\n', 'import sys\n',
                       'class FirstTest(unittest.TestCase):\n']
 
+    # nowy plik - katalogi kolokwium i rozwiazan zawierajace dowiazania do poprzedniej wersji nie zmieniaja sie
+    prepareFileForWrite(pathToFile)
+
     with open(pathToFile, "w+") as unit_test_file:
         unit_test_file.writelines(lines_to_write)
 
@@ -42,10 +49,16 @@ def create_java_unit_tests(exercise, unit_tests_data, save_model=True):
     unitTestFileName = "UnitTest.java"
     pathToFile = os.path.join(pathToUnitTestsDir, unitTestFileName)
 
+    # skompilowane wczesniej unit testy sa nieaktualne
+    shutil.rmtree(get_test_classes_cache_path(pathToExerciseDir), ignore_errors=True)
+
     lines_to_write = ['import static org.junit.jupiter.api.Assertions.*;\n',
                       'import org.junit.jupiter.api.Test;\n\n',
                       'public class UnitTest {\n']
 
+    # nowy plik - katalogi kolokwium i rozwiazan zawierajace dowiazania do poprzedniej wersji nie zmieniaja sie
+    prepareFileForWrite(pathToFile)
+
     with open(pathToFile, "w+") as unit_test_file:
         unit_test_file.writelines(lines_to_write)
 
@@ -73,6 +86,9 @@ def create_unit_tests(exercise, unit_tests_data, save_model=True):
         create_java_unit_tests(exercise, unit_tests_data, save_model)
     else:
         print("Nie da sie utworzyc unit testow dla podanego jezyka")
+        return
+
+    invalidate_exercise_results(exercise)
 
 
 def insert_python_import_instruction(path_to_unit_test, filename):
@@ -86,6 +102,8 @@ def insert_python_import_instruction(path_to_unit_test, filename):
         with open(path_to_unit_test, 'r') as unit_test_file:
             unit_test_file_content_tmp = unit_test_file.read()
 
+        prepareFileForWrite(path_to_unit_test)
+
         with open(path_to_unit_test, 'w') as unit_test_file:
             import_instruction = "from " + filename_without_extension + " import * \n"
             unit_test_file.write(import_instruction)
@@ -106,6 +124,8 @@ def insert_java_package_instruction(path_to_unit_test, package_name):
         with open(path_to_unit_test, 'r') as unit_test_file:
             unit_test_file_content_tmp = unit_test_file.read()
 
+        prepareFileForWrite(path_to_unit_test)
+
         with open(path_to_unit_test, 'w') as unit_test_file:
             import_instruction = "import " + package_name + ".*; \n"
             unit_test_file.write(import_instruction)
@@ -3,10 +3,7 @@ from . import views
 from django.urls import path, include
 
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenRefreshView
 
 router = DefaultRouter()
 router.register('users', views.UserViewSet)
@@ -16,15 +13,18 @@ router.register('exercises', views.ExerciseViewSet, basename="Exercises")
 router.register('tests', views.TestViewSet, basename="Tests")
 router.register('tasks', views.TaskViewSet, basename="Tasks")
 router.register('solutions', views.SolutionViewSet, basename="Solutions")
+router.register('grading_jobs', views.GradingJobViewSet, basename="GradingJobs")
 
 urlpatterns = [
-    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('token/', views.UserTypeTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_obtain_refresh'),
     path('profile/<str:username>', views.ProfileView.as_view()),
     path('levels/', views.LevelView.as_view()),
     path('languages/', views.LanguageView.as_view()),
     path('solution_types/', views.SolutionTypeView.as_view()),
     path('my_students/', views.TeachersStudentsView.as_view()),
+    path('grading_metrics/', views.GradingMetricsView.as_view()),
+    path('metrics', views.metrics_view),
     path('reset_password/', views.ResetPasswordHashView.as_view()), # default view - wykorzysta parametr domyslny hash_string=None
     path('reset_password/<str:hash_string>', views.ResetPasswordHashView.as_view()),
     path('maven_test/', views.MavenTestView.as_view()),
@@ -0,0 +1,60 @@
+import threading
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ServiceCore.models import Profile
+from ServiceCore.lru_cache import LRUCache
+
+# Rodzaj uzytkownika (nazwa UserType, np. "Student") wysylajacego zadanie.
+# Kolejnosc odczytu:
+#   - wartosc zapamietana w obiekcie request (jedno sprawdzenie na zadanie)
+#   - claim USER_TYPE_CLAIM tokenu JWT (dodawany przy logowaniu)
+#   - pamiec podreczna procesu, a gdy jej brak - zapytanie o Profile
+# Zmiana lub usuniecie obiektu Profile usuwa wpis z pamieci podrecznej procesu.
+
+USER_TYPE_CLAIM = 'user_type'
+
+_user_type_cache = None
+_user_type_cache_lock = threading.Lock()
+
+def get_user_type_cache():
+    global _user_type_cache
+
+    with _user_type_cache_lock:
+        if _user_type_cache is None:
+            _user_type_cache = LRUCache(settings.USER_TYPE_CACHE_SIZE)
+
+    return _user_type_cache
+
+def get_user_type(user):
+    # nazwa rodzaju uzytkownika; Profile.DoesNotExist, gdy uzytkownik nie ma profilu
+    user_type = get_user_type_cache().get(user.pk)
+
+    if user_type is None:
+        user_type = Profile.objects.select_related('userType').get(user=user).userType.name
+        get_user_type_cache().put(user.pk, user_type)
+
+    return user_type
+
+def get_request_user_type(request):
+    user_type = getattr(request, '_user_type', None)
+
+    if user_type is None:
+        token = request.auth
+
+        if token is not None and hasattr(token, 'get'):
+            user_type = token.get(USER_TYPE_CLAIM)
+
+        if user_type is None:
+            user_type = get_user_type(request.user)
+
+        request._user_type = user_type
+
+    return user_type
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def forget_user_type(sender, instance, **kwargs):
+    get_user_type_cache().remove(instance.user_id)
@@ -1,12 +1,24 @@
 import os
+import shutil
+import threading
+from contextlib import contextmanager
 from django.conf import settings
-from distutils.dir_util import copy_tree
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 EXERCISES_TEMPLATES_DIRECTORY_ROOT = "exercises_templates"
 EXERCISES_DIRECTORY_ROOT = "exercises"
 TESTS_DIRECTORY_ROOT = "exercises_tests"
 SOLUTIONS_DIRECTORY_ROOT = "solutions"
 
+# blokady watkow dla katalogow z rozwiazaniami: sciezka -> [blokada, liczba watkow ja wykorzystujacych]
+# - wpis usuwany, gdy zaden watek nie korzysta z blokady
+_workspaceLocks = {}
+_workspaceLocksLock = threading.Lock()
+
 def createDirectory(pathToCreate):
     # funkcja tworzy folder w lokalizacji path/dirName
     if not os.path.exists(pathToCreate):
@@ -15,6 +27,33 @@ def createDirectory(pathToCreate):
     else:
         return False
 
+def linkTree(source, destination, ignore=('target', '__pycache__')):
+    # funkcja odtwarza drzewo katalogow source w destination, a pliki tworzy jako dowiazania
+    # twarde do plikow z source (bez kopiowania zawartosci); gdy dowiazanie nie jest mozliwe
+    # (np. inny system plikow) plik jest kopiowany. Katalogi z ignore (wyniki kompilacji) sa pomijane.
+    # Pliki w destination nalezy przed zapisem usunac (prepareFileForWrite) - inaczej zapis
+    # zmienilby rowniez plik zrodlowy i pozostale katalogi z nim powiazane
+    for subdir, dirs, files in os.walk(source):
+        dirs[:] = [directory for directory in dirs if directory not in ignore]
+        destinationDir = os.path.join(destination, os.path.relpath(subdir, source))
+        os.makedirs(destinationDir, exist_ok=True)
+
+        for file in files:
+            sourcePath = os.path.join(subdir, file)
+            destinationPath = os.path.join(destinationDir, file)
+            prepareFileForWrite(destinationPath)
+
+            try:
+                os.link(sourcePath, destinationPath)
+            except OSError:
+                shutil.copy2(sourcePath, destinationPath)
+
+def prepareFileForWrite(path):
+    # usuniecie pliku (lub dowiazania twardego) przed zapisem nowej zawartosci - zapis tworzy
+    # nowy plik, wiec nie zmienia szablonu ani katalogow innych uzytkownikow
+    if os.path.lexists(path):
+        os.remove(path)
+
 # ************ funkcje dla cwiczen - Exercises *******************
 def getExerciseDirectoryName(exercise):
     # funkcja zwraca nazwe folderu odpowiednia dla podanego cwiczenia
@@ -43,7 +82,7 @@ def createExerciseRootDirectory(exercise):
         if rootPathCreated:
             javaTemplateDirPath = os.path.join(cwd, EXERCISES_TEMPLATES_DIRECTORY_ROOT, exercise.language.name.lower())
             print(javaTemplateDirPath)
-            copy_tree(javaTemplateDirPath, pathToExercise) # skopiowanie templatki do folderu z cwiczeniem
+            linkTree(javaTemplateDirPath, pathToExercise) # dowiazanie plikow templatki w folderze z cwiczeniem
         
         return rootPathCreated
 
@@ -86,7 +125,7 @@ def createTestRootDirectory(test):
                 exerciseInTestDirPath = os.path.join(pathToTest, exerciseDirName)
                 print("Bede kopiowal z: " + exerciseRootPath)
                 print("Do: " + exerciseInTestDirPath)
-                copy_tree(exerciseRootPath, exerciseInTestDirPath)
+                linkTree(exerciseRootPath, exerciseInTestDirPath)
             else:
                 return False        
 
@@ -109,7 +148,7 @@ def createTestDirectory(test, relPath):
                 exerciseDirName = getExerciseDirectoryName(exercise)
                 exerciseInTestDirPath = os.path.join(pathToTest, exerciseDirName)
 
-                copy_tree(exerciseRootPath, exerciseInTestDirPath)
+                linkTree(exerciseRootPath, exerciseInTestDirPath)
             else:
                 return False        
 
@@ -122,25 +161,133 @@ def getTaskSolutionsDirectoryName(task):
     # funkcja zwraca nazwe folderu w ktorym znajduja sie rozwiazania zadania 'task'
     return task.title.replace(" ", "") + '-' + task.author.username.replace(" ", "") + '-' + str(task.pk)    
 
+def getTaskSolutionsDirectoryPath(task):
+    # funkcja zwraca sciezke do folderu z rozwiazaniami zadania 'task'
+    return os.path.join(settings.BASE_DIR, SOLUTIONS_DIRECTORY_ROOT, getTaskSolutionsDirectoryName(task))
+
+def getUserSolutionRootPath(task, group, user):
+    # funkcja zwraca sciezke do katalogu uzytkownika z rozwiazaniami zadania 'task'
+    # - jedynie pk grupy i uzytkownika, wiec zmiana nazwy grupy nie wymaga zmian na dysku
+    groupName = 'group-' + str(group.pk)
+    userName = 'user-' + str(user.pk)
+
+    return os.path.join(getTaskSolutionsDirectoryPath(task), groupName, userName)
+
 def getUserSolutionPath(task, group, user, exercise=None):
     if task.taskType.name == "Exercise":    
-        taskDirName = getTaskSolutionsDirectoryName(task)
-        groupName = group.name + '-' + str(group.pk)
-        userName = user.username.replace(" ", "") + '-' + str(user.pk)
-        cwd = settings.BASE_DIR
-
         #if task.exercise.language.name == 'Java':
-        #    return os.path.join(cwd, SOLUTIONS_DIRECTORY_ROOT, taskDirName, groupName, userName, 'src', 'main', 'java')
+        #    return os.path.join(getUserSolutionRootPath(task, group, user), 'src', 'main', 'java')
         
-        return os.path.join(cwd, SOLUTIONS_DIRECTORY_ROOT, taskDirName, groupName, userName)
+        return getUserSolutionRootPath(task, group, user)
     else:
-        taskDirName = getTaskSolutionsDirectoryName(task)
-        groupName = group.name + '-' + str(group.pk)
-        userName = user.username.replace(" ", "") + '-' + str(user.pk)
-        cwd = settings.BASE_DIR
+        return os.path.join(getUserSolutionRootPath(task, group, user), getExerciseDirectoryName(exercise))   
+
+def getUserSolutionLockPath(task, user):
+    # sciezka blokady rozwiazan uzytkownika dla zadania - niezalezna od nazw zadania, grupy i uzytkownika
+    return os.path.join(settings.BASE_DIR, SOLUTIONS_DIRECTORY_ROOT, '.locks', 'task-' + str(task.pk) + '-user-' + str(user.pk))
+
+@contextmanager
+def workspaceLock(path):
+    # blokada katalogu z rozwiazaniem uzytkownika na czas jego tworzenia i testowania rozwiazania
+    # - threading.Lock dla watkow workera, flock na pliku <katalog>.lock dla pozostalych procesow
+    # (blokady roznych katalogow moga byc zagniezdzone, dlatego kazdy katalog ma osobna blokade)
+    with _workspaceLocksLock:
+        entry = _workspaceLocks.setdefault(path, [threading.Lock(), 0])
+        entry[1] += 1
+
+    try:
+        with entry[0]:
+            if fcntl is None:
+                yield
+                return
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            lockFile = openLockFile(path + '.lock')
+
+            try:
+                yield
+            finally:
+                # plik usuwany przed zwolnieniem blokady - proces oczekujacy na blokade usunietego
+                # pliku otworzy go ponownie (openLockFile)
+                try:
+                    os.remove(path + '.lock')
+                except FileNotFoundError:
+                    pass
+
+                fcntl.flock(lockFile, fcntl.LOCK_UN)
+                lockFile.close()
+    finally:
+        with _workspaceLocksLock:
+            entry[1] -= 1
+
+            if entry[1] == 0:
+                del _workspaceLocks[path]
+
+def openLockFile(lockPath):
+    # funkcja otwiera i blokuje (flock) plik 'lockPath'; jezeli w czasie oczekiwania plik zostal
+    # usuniety lub zastapiony innym, blokada dotyczy nieaktualnego pliku i jest ponawiana
+    while True:
+        lockFile = open(lockPath, 'a')
+        fcntl.flock(lockFile, fcntl.LOCK_EX)
+
+        try:
+            if os.path.samestat(os.fstat(lockFile.fileno()), os.stat(lockPath)):
+                return lockFile
+        except FileNotFoundError:
+            pass
+
+        fcntl.flock(lockFile, fcntl.LOCK_UN)
+        lockFile.close()
+
+def materializeDirectory(path, source=None):
+    # funkcja tworzy katalog 'path' (z dowiazaniami do plikow z 'source'), jezeli jeszcze nie istnieje;
+    # katalog budowany jest pod tymczasowa nazwa i przenoszony, wiec przerwane tworzenie nie
+    # pozostawia niekompletnego katalogu
+    if os.path.isdir(path):
+        return False
+
+    temporaryPath = path + '.tmp-' + str(os.getpid()) + '-' + str(threading.get_ident())
+    shutil.rmtree(temporaryPath, ignore_errors=True)
+    os.makedirs(temporaryPath)
+
+    if source is not None:
+        linkTree(source, temporaryPath)
+
+    os.rename(temporaryPath, path)
+    return True
+
+def createUserSolutionDirectory(task, group, user):
+    # funkcja tworzy katalog z rozwiazaniami uzytkownika dla zadania 'task' (o ile nie istnieje)
+    # - wywolywana przy pierwszym sprawdzaniu rozwiazania uzytkownika
+    # - Exercise: UserA dir (z plikami template dla Javy)
+    # - Test: UserA dir z katalogami ExerciseA dir, ExerciseB dir (z plikami cwiczen Java)
+    # funkcja zwraca True, gdy utworzono jakikolwiek katalog
+    pathToUserSolution = getUserSolutionRootPath(task, group, user)
+    created = False
+
+    with workspaceLock(pathToUserSolution):
+        if task.taskType.name == "Exercise":
+            template = None
+
+            # dowiazanie plikow template z EXERCISES_TEMPLATES_DIRECTORY_ROOT w folderze z rozwiazaniem uzytkownika
+            if task.exercise.language.name == 'Java':
+                template = os.path.join(settings.BASE_DIR, EXERCISES_TEMPLATES_DIRECTORY_ROOT, task.exercise.language.name.lower())
+
+            created = materializeDirectory(pathToUserSolution, template)
+        elif task.taskType.name == "Test":
+            if not os.path.isdir(pathToUserSolution):
+                os.makedirs(pathToUserSolution)
+                created = True
+
+            for exercise in task.test.exercises.all():
+                exerciseRootPath = None
 
-        return os.path.join(cwd, SOLUTIONS_DIRECTORY_ROOT, taskDirName, groupName, userName, getExerciseDirectoryName(exercise))   
+                if exercise.language.name == 'Java':
+                    exerciseRootPath = getExerciseDirectoryRootPath(exercise)
 
+                created = materializeDirectory(os.path.join(pathToUserSolution, getExerciseDirectoryName(exercise)), exerciseRootPath) or created
+
+    return created
 
 def createExerciseSolutionDirectory(task):
     # funkcja tworzy strukture katalogow dla zadania typu exercise
@@ -151,34 +298,8 @@ def createExerciseSolutionDirectory(task):
     #           - UserB solution
     group = task.assigned_to
     
-    directoryName = getTaskSolutionsDirectoryName(task)
-
-    cwd = settings.BASE_DIR
-    pathToSolution = os.path.join(cwd, SOLUTIONS_DIRECTORY_ROOT, directoryName)
-    
-    if not createDirectory(pathToSolution):
-        return False
-
-    groupName = group.name + '-' + str(group.pk)
-    pathToAssignedGroupSolution = os.path.join(pathToSolution, groupName)
-    created = createDirectory(pathToAssignedGroupSolution)
-
-    if not created:
-        return False
-        
     for member in group.users.all():
-        memberName = member.username.replace(" ", "") + '-' + str(member.pk)
-        pathToGroupMemberSolution = os.path.join(pathToAssignedGroupSolution, memberName)
-
-        created = createDirectory(pathToGroupMemberSolution)
-
-        if not created:
-            return False
-
-        # skopiowanie template z EXERCISES_TEMPLATES_DIRECTORY_ROOT do folderu z rozwiazaniem uzytkownika      
-        if task.exercise.language.name == 'Java':
-            javaTemplateDirPath = os.path.join(cwd, EXERCISES_TEMPLATES_DIRECTORY_ROOT, task.exercise.language.name.lower())
-            copy_tree(javaTemplateDirPath, pathToGroupMemberSolution)
+        createUserSolutionDirectory(task, group, member)
 
     return True
 
@@ -192,42 +313,21 @@ def createTestSolutionDirectory(task):
     #               - ExerciseA dir
     #               - ExerciseB dir
     group = task.assigned_to 
-    directoryName = getTaskSolutionsDirectoryName(task)
-    cwd = settings.BASE_DIR
-    pathToSolution = os.path.join(cwd, SOLUTIONS_DIRECTORY_ROOT, directoryName)
-
-    if not createDirectory(pathToSolution):
-        return False
-    
-    groupName = group.name + '-' + str(group.pk)
-    pathToAssignedGroupSolution = os.path.join(pathToSolution, groupName)
-    created = createDirectory(pathToAssignedGroupSolution)
-
-    if not created:
-        return False
 
     for member in group.users.all():
-        memberName = member.username.replace(" ", "") + '-' + str(member.pk)
-        pathToGroupMemberSolution = os.path.join(pathToAssignedGroupSolution, memberName)
+        createUserSolutionDirectory(task, group, member)
 
-        if not createDirectory(pathToGroupMemberSolution):
-            return False
-
-        for exercise in task.test.exercises.all():
-            exerciseDirName = getExerciseDirectoryName(exercise)
-            exerciseInTestPath = os.path.join(pathToGroupMemberSolution, exerciseDirName)
-
-            if not createDirectory(exerciseInTestPath):
-                return False
-                
-            if exercise.language.name == 'Java':
-                exerciseRootPath = getExerciseDirectoryRootPath(exercise)
-                copy_tree(exerciseRootPath, exerciseInTestPath)
+    return True
 
+def createTaskSolutionsRootDirectory(task):
+    # funkcja tworzy jedynie folder zadania 'task' - katalogi uzytkownikow tworzone sa
+    # przy pierwszym sprawdzaniu ich rozwiazan (createUserSolutionDirectory)
+    os.makedirs(getTaskSolutionsDirectoryPath(task), exist_ok=True)
     return True
 
 def createDirectoryForTaskSolutions(task):
     # funkcja tworzy folder ktory bedzie przechowywal rozwiazania zadania 'task'
+    # wraz z katalogami wszystkich czlonkow grupy (np. polecenie generate_directories)
     typeOfTask = task.taskType.name
     print(typeOfTask)
     
@@ -246,95 +346,16 @@ def createDirectoryForTaskSolutions(task):
     return result
 
 def createAllUserSolutionDirectory(group, user):
-    # funkcja wykorzystywana w momencie dodania nowego uzytkownika do grupy
-    # dla tego uzytkownika tworzone sa katalogi z rozwiazaniami w kazdym zadaniu 
+    # funkcja tworzy dla uzytkownika katalogi z rozwiazaniami w kazdym zadaniu 
     # przypisanym grupie do ktorej zostal dodany
     tasks = group.tasks.all()
     result = False
 
     for task in tasks:
-        task_type = task.taskType.name
-
-        if task_type == "Test":
-            directoryName = getTaskSolutionsDirectoryName(task)
-            cwd = settings.BASE_DIR
-            pathToSolution = os.path.join(cwd, SOLUTIONS_DIRECTORY_ROOT, directoryName)
-            
-            groupName = group.name + '-' + str(group.pk)
-            pathToAssignedGroupSolution = os.path.join(pathToSolution, groupName)
-            
-            memberName = user.username.replace(" ", "") + '-' + str(user.pk)
-            pathToGroupMemberSolution = os.path.join(pathToAssignedGroupSolution, memberName)
-
-            if not createDirectory(pathToGroupMemberSolution):
-                return False
-
-            for exercise in task.test.exercises.all():
-                exerciseDirName = getExerciseDirectoryName(exercise)
-                exerciseInTestPath = os.path.join(pathToGroupMemberSolution, exerciseDirName)
-
-                if not createDirectory(exerciseInTestPath):
-                    return False
-                        
-                if exercise.language.name == 'Java':
-                    exerciseRootPath = getExerciseDirectoryRootPath(exercise)
-                    copy_tree(exerciseRootPath, exerciseInTestPath)
-
-        elif task_type == "Exercise":            
-            directoryName = getTaskSolutionsDirectoryName(task)
-
-            cwd = settings.BASE_DIR
-            pathToSolution = os.path.join(cwd, SOLUTIONS_DIRECTORY_ROOT, directoryName)
-
-            groupName = group.name + '-' + str(group.pk)
-            pathToAssignedGroupSolution = os.path.join(pathToSolution, groupName)
-                
-            memberName = user.username.replace(" ", "") + "-" + str(user.pk)
-            pathToGroupMemberSolution = os.path.join(pathToAssignedGroupSolution, memberName)
-
-            created = createDirectory(pathToGroupMemberSolution)
-
-            if not created:
-                return False
-
-            # skopiowanie template z EXERCISES_TEMPLATES_DIRECTORY_ROOT do folderu z rozwiazaniem uzytkownika      
-            if task.exercise.language.name == 'Java':
-                javaTemplateDirPath = os.path.join(cwd, EXERCISES_TEMPLATES_DIRECTORY_ROOT, task.exercise.language.name.lower())
-                copy_tree(javaTemplateDirPath, pathToGroupMemberSolution)
-
-            result = True
-        else:
+        if task.taskType.name not in ("Test", "Exercise"):
             return False
 
-    return result
-
-def changeGroupSolutionDirectoryName(group, newGroupName):
-    # funkcja zmienia nazwe katalogow z rozwiazaniem 
-    tasks = group.tasks.all()
-    result = False
-
-    for task in tasks:
-        task_type = task.taskType.name
-        directoryName = ""
-
-        if task_type == "Test":
-            directoryName = getTaskSolutionsDirectoryName(task)
-        elif task_type == "Exercise":
-            directoryName = getTaskSolutionsDirectoryName(task)
-        else:
-            return False
-
-        cwd = settings.BASE_DIR
-        pathToSolution = os.path.join(cwd, SOLUTIONS_DIRECTORY_ROOT, directoryName)
-        
-        groupName = group.name + '-' + str(group.pk)
-        newGroupNameDir = newGroupName + '-' + str(group.pk)
-        
-        pathToAssignedGroupSolution = os.path.join(pathToSolution, groupName)
-        pathToAssignedGroupSolutionWithNewGroupName = os.path.join(pathToSolution, newGroupNameDir)
-
-        os.rename(pathToAssignedGroupSolution, pathToAssignedGroupSolutionWithNewGroupName)
-
+        createUserSolutionDirectory(task, group, user)
         result = True
 
     return result
@@ -1,4 +1,5 @@
 import os
+import json
 import subprocess
 import shutil
 import logging
@@ -13,20 +14,30 @@ from ServiceCore.python_executor import *
 from ServiceCore.java_executor import *
 from ServiceCore.utils import *
 from ServiceCore.unit_tests_utils import create_unit_tests
-
+from ServiceCore.grading_queue import enqueue_solution, claim_job, process_grading_job, start_regrade
+from ServiceCore.file_cache import read_file_cached
+from ServiceCore.db_utils import bulk_update_fields
+from ServiceCore.api_utils import OptionalCursorPagination, DynamicFieldsViewMixin, get_query_param_list, is_query_param_true
+from ServiceCore.user_types import get_request_user_type
+from ServiceCore.grading_metrics import get_phase_statistics
+from ServiceCore.metrics import REGISTRY, CONTENT_TYPE
+
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.files.storage import FileSystemStorage
 from django.core.signing import Signer
-from django.db.models import FilePathField
-from django.db import transaction
+from django.db.models import FilePathField, Q
+from django.db import IntegrityError, transaction
 from django.http.response import HttpResponse
 from django.shortcuts import render
 
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework.renderers import JSONRenderer        
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.views import TokenObtainPairView        
 
 class MavenTestView(APIView):
     def get(self, request):
@@ -58,19 +69,18 @@ class TeachersStudentsView(APIView):
     def get(self, request):
         logger = logging.getLogger(__name__)   
         
-        queryset = User.objects.none()
-
-        groups = self.request.user.group.all()
-
-        for group in groups:
-            queryset = queryset.union(group.users.all())
-        
-        queryset = queryset.distinct()
+        # jedno zapytanie (JOIN) zamiast sumy (UNION) zapytan dla kazdej grupy nauczyciela
+        queryset = User.objects.filter(membershipGroups__owner=self.request.user).distinct().order_by('pk')
+        queryset = UserSerializer.setup_eager_loading(queryset)
 
         serializer_data = UserSerializer(queryset, many=True)
 
         return Response(serializer_data.data)
 
+# logowanie - token zawiera rodzaj uzytkownika (claim user_type)
+class UserTypeTokenObtainPairView(TokenObtainPairView):
+    serializer_class = UserTypeTokenObtainPairSerializer
+
 class SolutionTypeView(APIView):
     def get(self, request):
         solutionsTypes = SolutionType.objects.all()
@@ -118,15 +128,11 @@ class UserViewSet(viewsets.ModelViewSet):
         try:
             user = User.objects.get(pk=pk)        
             user_serializer = UserSerializer(user)
-            solutions_serializer = SolutionSerializer(user.solutions.all(), many=True)
+            solutions = SolutionSerializer.setup_eager_loading(user.solutions.all())
+            solutions_serializer = SolutionSerializer(solutions, many=True)
 
-            groups = user.membershipGroups.all()            
-            tasks = Task.objects.none()
-
-            for group in groups:
-                tasks = tasks.union(group.tasks.all())
-
-            tasks = tasks.distinct()
+            # zadania przypisane do grup uzytkownika - jedno zapytanie zamiast sumy (UNION) zapytan dla kazdej grupy
+            tasks = TaskWithSolutionData.setup_eager_loading(Task.objects.filter(assigned_to__users=user).order_by('pk'))
 
             tasks_with_solutions_serializer = TaskWithSolutionData(tasks, many=True)
             response_data = {}        
@@ -198,24 +204,25 @@ class StudentViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         studentType = UserType.objects.get(name="Student")
         queryset = User.objects.filter(profile__userType=studentType)
-        return queryset
+        return UserSerializer.setup_eager_loading(queryset)
 
 
-class GroupViewSet(viewsets.ModelViewSet):
+class GroupViewSet(DynamicFieldsViewMixin, viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated,)
     serializer_class = GroupWithAssignedTasksSerializer
+    pagination_class = OptionalCursorPagination
 
     # zdefiniowanie zbioru grup na podstawie rodzaju użytkownika, który żąda o dane
     def get_queryset(self):
         queryset = None
-        profile = Profile.objects.get(user=self.request.user)
+        user_type = get_request_user_type(self.request)
 
-        if profile.userType.name == "Student":
+        if user_type == "Student":
             queryset = self.request.user.membershipGroups.all()
         else:
             queryset = self.request.user.group.all()
         
-        return queryset
+        return GroupWithAssignedTasksSerializer.setup_eager_loading(queryset)
 
     # tworzenie nowej grupy
     def create(self, request):
@@ -238,6 +245,10 @@ class GroupViewSet(viewsets.ModelViewSet):
                 newGroup.users.add(user)
             newGroup.save()
             logger.info("Grupa " + newGroup.name + " zostala utworzona")
+        except IntegrityError:
+            # grupa o tej nazwie utworzona rownolegle (unique_together owner, name)
+            logger.info("Grupa o nazwie " + data['groupName'] + " juz istnieje")
+            return Response({"message": "Juz posiadasz grupe o takiej nazwie!"}, status=400)
         except Exception as e:
             logger.info("Nastapil blad podczas tworzenia grupy. " + str(e))
             return Response({"message": "Nastąpił błąd podczas tworzenia grupy"}, status=500)
@@ -265,24 +276,30 @@ class GroupViewSet(viewsets.ModelViewSet):
                 return Response({"message": "Juz posiadasz grupe o takiej nazwie!"}, status=400)
 
         try:
-            groupToUpdate = Group.objects.get(name=data['oldName'], owner=request.user)            
+            # zmiana nazwy na juz istniejaca wycofuje rowniez zmiany czlonkow grupy
+            with transaction.atomic():
+                groupToUpdate = Group.objects.get(name=data['oldName'], owner=request.user)
 
-            for userToAddToGroup in data['usersToAdd']:
-                user = User.objects.get(pk=userToAddToGroup['pk'])
-                groupToUpdate.users.add(user)
-                createAllUserSolutionDirectory(groupToUpdate, user)
-            groupToUpdate.save()
+                for userToAddToGroup in data['usersToAdd']:
+                    user = User.objects.get(pk=userToAddToGroup['pk'])
+                    groupToUpdate.users.add(user)
+                groupToUpdate.save()
 
-            for userToRemoveFromGroup in data['usersToRemove']:
-                user = User.objects.get(pk=userToRemoveFromGroup['pk'])
-                groupToUpdate.users.remove(user)
-            groupToUpdate.save()           
+                for userToRemoveFromGroup in data['usersToRemove']:
+                    user = User.objects.get(pk=userToRemoveFromGroup['pk'])
+                    groupToUpdate.users.remove(user)
+                groupToUpdate.save()
 
-            changeGroupSolutionDirectoryName(groupToUpdate, data['groupName']) # (obiekt Group ze stara nazwa, nowa nazwa grupy)
-            groupToUpdate.name = data['groupName']
-            groupToUpdate.save()
+                # zmiana nazwy nie wymaga zmian na dysku - pliki z rozwiazaniami zapisane sa w magazynie blob_store,
+                # a katalogi robocze identyfikowane sa przez pk grupy
+                groupToUpdate.name = data['groupName']
+                groupToUpdate.save()
 
             logger.info("Grupa " + groupToUpdate.name + " zostala zaktualizowana")
+        except IntegrityError:
+            # grupa o nowej nazwie utworzona rownolegle (unique_together owner, name)
+            logger.info("Grupa o nazwie " + data['groupName'] + " juz istnieje")
+            return Response({"message": "Juz posiadasz grupe o takiej nazwie!"}, status=400)
         except Exception as e:
             logger.info("Nastapil blad podczas aktualizacji grupy " + data['oldName'] + " - " + str(e))
             return Response({"message": "Nastąpił błąd podczas aktualizacji grupy"}, status=500)
@@ -317,18 +334,18 @@ class ExerciseViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         logger = logging.getLogger(__name__)
         queryset = Exercise.objects.none()
-        profile = Profile.objects.get(user=self.request.user)
+        user_type = get_request_user_type(self.request)
 
-        logger.info("Uzytkownik " + str(self.request.user.username) + " - " + profile.userType.name + " pobiera cwiczenia")
+        logger.info("Uzytkownik " + str(self.request.user.username) + " - " + user_type + " pobiera cwiczenia")
 
-        if profile.userType.name == "Student":
+        if user_type == "Student":
             # student nie powinien miec mozliwosci ogladania cwiczen
             # wglad do nich powinien byc jedynie poprzez Task
             queryset = Exercise.objects.none()
         else:
             queryset = self.request.user.exercises.all()
         
-        return queryset
+        return ExerciseSerializer.setup_eager_loading(queryset)
     
     # tworzenie cwiczenia
     def create(self, request):
@@ -420,6 +437,19 @@ class ExerciseViewSet(viewsets.ModelViewSet):
         
         return Response({"message": "Cwiczenie zostalo usuniete"})
 
+    # ponowne sprawdzenie wszystkich rozwiazan cwiczenia (np. po zmianie unit testow)
+    @action(detail=True, methods=['post'])
+    def regrade(self, request, pk=None):
+        logger = logging.getLogger(self.__class__.__name__)
+
+        if not Exercise.objects.filter(pk=pk, author=request.user).exists():
+            return Response({"message": "Takie cwiczenie nie istnieje"}, status=404)
+
+        (batch, jobs_number) = start_regrade(SolutionExercise.objects.filter(exercise_id=pk))
+        logger.info("Ponowne sprawdzenie rozwiazan cwiczenia pk=" + str(pk) + " - partia " + batch)
+
+        return Response({"batch": batch, "jobs": jobs_number}, status=202)
+
 
 # viewset z kolokwiami
 class TestViewSet(viewsets.ModelViewSet):    
@@ -429,18 +459,18 @@ class TestViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         logger = logging.getLogger(__name__)
         queryset = None
-        profile = Profile.objects.get(user=self.request.user)
+        user_type = get_request_user_type(self.request)
 
-        logger.info("Uzytkownik " + str(self.request.user.username) + " - " + profile.userType.name + " pobiera kolokwia")
+        logger.info("Uzytkownik " + str(self.request.user.username) + " - " + user_type + " pobiera kolokwia")
 
-        if profile.userType.name == "Student":
+        if user_type == "Student":
             # student nie powinien miec mozliwosci ogladania kolokwium, teoretycznie
             # wglad do nich powinien byc jedynie poprzez Task
             queryset = Test.objects.none()
         else:
             queryset = self.request.user.tests.all()
         
-        return queryset
+        return TestSerializer.setup_eager_loading(queryset)
     
     # utworz kolokwium
     # tu dopisac tworzenie folderow dla kolokwium
@@ -508,32 +538,29 @@ class TestViewSet(viewsets.ModelViewSet):
         return Response({"message": "Kolokwium zostalo usuniete"})
 
 # viewset z zadaniami przydzielanymi studentom
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(DynamicFieldsViewMixin, viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated,)
     serializer_class = TaskWithSolutionData
+    pagination_class = OptionalCursorPagination
 
     def get_queryset(self):
         logger = logging.getLogger(__name__)
         queryset = None
 
-        profile = Profile.objects.get(user=self.request.user)
-
-        logger.info("Uzytkownik " + str(self.request.user.username) + " - " + profile.userType.name + " pobiera zadania")
+        user_type = get_request_user_type(self.request)
 
-        if profile.userType.name == "Student":
-            groups = self.request.user.membershipGroups.all()            
+        logger.info("Uzytkownik " + str(self.request.user.username) + " - " + user_type + " pobiera zadania")
 
-            if groups.count() > 0:
-                queryset = groups[0].tasks.all()
-
-                for group in groups:
-                    queryset = queryset.union(group.tasks.all())
-                
-                queryset = queryset.distinct()
+        if user_type == "Student":
+            # zadania przypisane do grup, do ktorych nalezy student
+            queryset = Task.objects.filter(assigned_to__users=self.request.user)
         else:
             queryset = self.request.user.my_tasks.all()
+
+        # rozwiazania pobierane sa jedynie, gdy zostana zwrocone
+        fields = get_query_param_list(self.request, 'fields')
         
-        return queryset
+        return TaskWithSolutionData.setup_eager_loading(queryset, with_solutions=not fields or 'solution' in fields)
 
 
     # utworz zadanie
@@ -579,9 +606,14 @@ class TaskViewSet(viewsets.ModelViewSet):
             
             newTask.save()
 
-            # tworzenie katalogu w ktorym beda odpowiednie podfoldery z rozwiazaniami
-            createDirectoryForTaskSolutions(newTask)
+            # tworzenie katalogu zadania - katalogi z rozwiazaniami studentow tworzone sa
+            # przy pierwszym sprawdzaniu ich rozwiazan (grading_queue.process_grading_job)
+            createTaskSolutionsRootDirectory(newTask)
 
+        except IntegrityError:
+            # zadanie o tym tytule utworzone rownolegle (unique_together author, title)
+            logger.info("Zadanie o tytule" + data['title'] + " juz istnieje")
+            return Response({"message": "Zadanie o takim tytule juz istnieje"}, status=400)
         except Exception as e:
             print(str(e))
             logger.info("Nie udalo sie utworzyc zadania - " + str(e))
@@ -599,23 +631,25 @@ class TaskViewSet(viewsets.ModelViewSet):
             # zablokowanie zadania - niemozliwe bedzie wysylanie odpowiedzi
             # zadanie oczekuje na zatwierdzenie ocen
             try:
-                task_to_close = Task.objects.get(pk=data['pk'])
-                task_to_close.isActive = False
-                task_to_close.save()
+                with transaction.atomic():
+                    # blokada wiersza zadania - rownolegle zablokowanie nie utworzy podwojnych rozwiazan
+                    task_to_close = Task.objects.select_for_update().get(pk=data['pk'])
 
-                assigned_to = task_to_close.assigned_to
-                group_members = assigned_to.users.all()
-                solutions = task_to_close.solutions.all()
+                    # bez grupy filtr membershipGroups=None wybralby wszystkich uzytkownikow spoza grup
+                    if task_to_close.assigned_to_id is None:
+                        logger.info("Nie mozna zablokowac zadania o pk=" + str(data['pk']) + " - zadanie nie jest przypisane do grupy")
+                        return Response({"message": "Zadanie nie jest przypisane do grupy"}, status=400)
 
-                for group_member in group_members:
-                    intersection_qs = group_member.solutions.intersection(solutions)
-                    print(intersection_qs)
+                    task_to_close.isActive = False
+                    task_to_close.save(update_fields=['isActive'])
 
-                    if len(intersection_qs) == 0:
-                        new_solution = Solution.objects.create(task=task_to_close, user=group_member, rate=2)
-                        new_solution.save()
+                    # czlonkowie grupy bez rozwiazania zadania (jedno zapytanie) otrzymuja ocene 2
+                    missing_members = User.objects.filter(membershipGroups=task_to_close.assigned_to_id).exclude(
+                        solutions__task=task_to_close).values_list('pk', flat=True)
+                    created_solutions = Solution.objects.bulk_create(
+                        [Solution(task=task_to_close, user_id=user_pk, rate=2) for user_pk in missing_members])
 
-                logger.info("Zablokowano zadanie o pk=" + str(data['pk']))
+                logger.info("Zablokowano zadanie o pk=" + str(data['pk']) + ", dodano " + str(len(created_solutions)) + " rozwiazan")
 
                 return Response({"message": "Zablokowano zadanie"}, status=200)
             except Exception as e:
@@ -627,14 +661,13 @@ class TaskViewSet(viewsets.ModelViewSet):
             # zatwierdzenie ocen konkretnego zadania
             try:
                 task_to_close = Task.objects.get(pk=data['pk'])
-                
-                for solution in task_to_close.solutions.all():
-                    if solution.rate == None:
-                        return Response({"message": "Nie mozna zamknac zadania dopoki nie wszystkie rozwiazania zostaly ocenione"}, status=400)
-                    
+
+                if task_to_close.solutions.filter(rate__isnull=True).exists():
+                    return Response({"message": "Nie mozna zamknac zadania dopoki nie wszystkie rozwiazania zostaly ocenione"}, status=400)
+
                 task_to_close.isRated = True
                 task_to_close.isActive = False
-                task_to_close.save()
+                task_to_close.save(update_fields=['isRated', 'isActive'])
 
                 logger.info("Zamknieto zadanie o pk=" + str(data['pk']))
 
@@ -646,32 +679,49 @@ class TaskViewSet(viewsets.ModelViewSet):
 
         return Response({"message": "UPDATE ZAKONCZONY"}, status=200)
 
+    # ponowne sprawdzenie wszystkich rozwiazan zadania (np. po zmianie unit testow)
+    @action(detail=True, methods=['post'])
+    def regrade(self, request, pk=None):
+        logger = logging.getLogger(self.__class__.__name__)
+
+        if not Task.objects.filter(pk=pk, author=request.user).exists():
+            return Response({"message": "Takie zadanie nie istnieje"}, status=404)
+
+        (batch, jobs_number) = start_regrade(SolutionExercise.objects.filter(solution__task_id=pk, exercise__isnull=False))
+        logger.info("Ponowne sprawdzenie rozwiazan zadania pk=" + str(pk) + " - partia " + batch)
+
+        return Response({"batch": batch, "jobs": jobs_number}, status=202)
+
 # viewset z rozwiazaniami zadan
-class SolutionViewSet(viewsets.ModelViewSet):
+class SolutionViewSet(DynamicFieldsViewMixin, viewsets.ModelViewSet):
     permission_classes = (AllowAny,)
     serializer_class = SolutionSerializer
+    pagination_class = OptionalCursorPagination
+
+    def get_serializer_class(self):
+        # ?compact=true - rozwiazania bez zagniezdzonego zadania i grupy
+        if is_query_param_true(self.request, 'compact'):
+            return CompactSolutionSerializer
+
+        return SolutionSerializer
 
     def get_queryset(self):
         logger = logging.getLogger(__name__)
         queryset = None
-        profile = Profile.objects.get(user=self.request.user)
+        user_type = get_request_user_type(self.request)
 
-        logger.info("Uzytkownik " + str(self.request.user.username) + " - " + profile.userType.name + " pobiera rozwiazania")
+        logger.info("Uzytkownik " + str(self.request.user.username) + " - " + user_type + " pobiera rozwiazania")
 
-        if profile.userType.name == "Student":        
+        if user_type == "Student":        
             queryset = Solution.objects.filter(user=self.request.user)
         else:
-            teacher_tasks = self.request.user.my_tasks.all()
-            print(teacher_tasks)
-            if teacher_tasks.count() > 0:
-                queryset = teacher_tasks[0].solutions.all()
-
-                for task in teacher_tasks:
-                    queryset = queryset.union(task.solutions.all())
+            # rozwiazania zadan utworzonych przez nauczyciela
+            queryset = Solution.objects.filter(task__author=self.request.user).order_by('pk')
 
-                queryset = queryset.distinct()
+        if is_query_param_true(self.request, 'compact'):
+            return CompactSolutionSerializer.setup_eager_loading(queryset, get_query_param_list(self.request, 'expand'))
 
-        return queryset
+        return SolutionSerializer.setup_eager_loading(queryset)
     
     # zwroc rozwiazanie o podanym pk
     def retrieve(self, request, pk=None):
@@ -692,19 +742,16 @@ class SolutionViewSet(viewsets.ModelViewSet):
                 logger.info("Uzytkownik nie przyslal rozwiazania - " + str(e))
                 return Response(serializer.data, status=400)
 
-            if os.path.isfile(solution_file_path):
-                with open(solution_file_path, 'r') as f:
-                    solutionValue = f.read()
+            solutionValue = read_file_cached(solution_file_path)
         else:
             solutionValue = []
 
             try:
                 for solution_exercise in solution.solution_test.exercises_solutions.all():
-                    solution_file_path = solution_exercise.pathToFile
+                    solution_file_value = read_file_cached(solution_exercise.pathToFile)
                 
-                    if os.path.isfile(solution_file_path):
-                        with open(solution_file_path, 'r') as f:
-                            solutionValue.append(f.read())
+                    if solution_file_value is not None:
+                        solutionValue.append(solution_file_value)
             except Exception as e:
                 logger.info("Uzytkownik nie przyslal rozwiazania - " + str(e))
                 return Response(serializer.data, status=400)
@@ -716,7 +763,7 @@ class SolutionViewSet(viewsets.ModelViewSet):
 
         return Response(newdict)
     
-    # tworzenie rozwiazania i testowanie:
+    # tworzenie rozwiazania i dodanie go do kolejki testowania:
     # aktualne obslugiwane metody rozwiazania:
     #   - przeslanie pliku
     #   - edytor
@@ -725,9 +772,7 @@ class SolutionViewSet(viewsets.ModelViewSet):
         logger = logging.getLogger(self.__class__.__name__)
 
         data = request.data
-        print(data)
         print(data['solutionType'])     
-        # return Response(status=200)
         task = Task.objects.get(pk=data['taskPk'])
 
         # tworzenie glownego obiektu Solution
@@ -740,24 +785,22 @@ class SolutionViewSet(viewsets.ModelViewSet):
         else:
             exercise = task.test.exercises.get(pk=data['exercisePk'])
 
-        concreteExecutor = None
+        # rozwiazanie trafia do kolejki, testowanie odbywa sie w workerze
+        job = enqueue_solution(request.user, task, exercise, data)
+        logger.info("Dodano do kolejki zlecenie pk=" + str(job.pk))
 
-        if exercise.language.name == 'Python':
-            concreteExecutor = PythonExecutor()
-        elif exercise.language.name == 'Java':
-            concreteExecutor = JavaExecutor()
+        if not settings.GRADING_QUEUE_ASYNC:
+            # tryb synchroniczny - zlecenie sprawdzane od razu w procesie serwera
+            claim_job(job)
+            job = process_grading_job(job)
 
-        concreteExecutor.configure(request.user, task, data)
-        
-        solExecutor = Executor(concreteExecutor)
-        
-        (execution_success, unit_tests_passed, message) = solExecutor.execute()
+            return Response({"jobPk": job.pk,
+                             "status": job.status,
+                             "result": job.unit_tests_passed,
+                             "message": job.message,
+                             "test_results": json.loads(job.test_results) if job.test_results else []})
 
-        logger.info("Wynik dzialania Executora: Wykonanie testów: " + str(execution_success) + \
-                    "; Zaliczenie testow jednostkowych: " + str(unit_tests_passed) + \
-                    "; Komunikat executora: " + message)
-
-        return Response({"result": unit_tests_passed, "message": message, "test_results": solExecutor.get_result()})
+        return Response({"jobPk": job.pk, "status": job.status}, status=202)
     
     def update(self, request, pk=None):
         # logger
@@ -768,28 +811,45 @@ class SolutionViewSet(viewsets.ModelViewSet):
         if not data['mode'] == 'RATE':
             return Response({"message": "Niepoprawny typ operacji"}, status=400)
         
-        final_rate = 0
-        
+        # ocena jednego rozwiazania ({pk, solRates}) lub wielu rozwiazan naraz ({solutions: [{pk, solRates}, ...]})
+        ratings = data['solutions'] if 'solutions' in data else [{'pk': data['pk'], 'solRates': data['solRates']}]
+
         try:
             with transaction.atomic():
-                solution_to_rate = Solution.objects.get(pk=data['pk'])
-                for exercise_rate in data['solRates']:
-                    solution_exercise = SolutionExercise.objects.get(pk=exercise_rate['pk'])
-                    solution_exercise.rate = float(exercise_rate['rate'])
-                    final_rate += float(exercise_rate['rate'])
-                    solution_exercise.save()
-
-                    logger.info("Ustawiono pole rate=" + str(exercise_rate['rate']) + " obiektu SolutionExericse pk=" + str(exercise_rate['pk']))
-            
-                if solution_to_rate.task.taskType.name == 'Test':
-                    final_rate = final_rate / len(data['solRates'])
-                    final_rate = round(final_rate * 2) / 2
-                    solution_to_rate.rate = final_rate
-                    solution_to_rate.solution_test.rate = final_rate
-                else:
-                    solution_to_rate.rate = final_rate
-                
-                solution_to_rate.save()
+                # stala liczba zapytan niezaleznie od liczby ocenianych rozwiazan
+                solutions = Solution.objects.select_related('task__taskType', 'solution_test').in_bulk(
+                    [rating['pk'] for rating in ratings])
+                solution_exercises = SolutionExercise.objects.in_bulk(
+                    [exercise_rate['pk'] for rating in ratings for exercise_rate in rating['solRates']])
+                solution_tests = []
+
+                for rating in ratings:
+                    solution_to_rate = solutions[int(rating['pk'])]
+                    final_rate = 0
+
+                    for exercise_rate in rating['solRates']:
+                        solution_exercise = solution_exercises[int(exercise_rate['pk'])]
+
+                        if solution_exercise.solution_id != solution_to_rate.pk:
+                            raise ValueError("obiekt SolutionExercise pk=" + str(exercise_rate['pk']) + " nie nalezy do rozwiazania pk=" + str(rating['pk']))
+
+                        solution_exercise.rate = float(exercise_rate['rate'])
+                        final_rate += float(exercise_rate['rate'])
+
+                    if solution_to_rate.task.taskType.name == 'Test':
+                        final_rate = final_rate / len(rating['solRates'])
+                        final_rate = round(final_rate * 2) / 2
+                        solution_to_rate.rate = final_rate
+                        solution_to_rate.solution_test.rate = final_rate
+                        solution_tests.append(solution_to_rate.solution_test)
+                    else:
+                        solution_to_rate.rate = final_rate
+
+                bulk_update_fields(SolutionExercise, solution_exercises.values(), ['rate'])
+                bulk_update_fields(SolutionTest, solution_tests, ['rate'])
+                bulk_update_fields(Solution, solutions.values(), ['rate'])
+
+                logger.info("Ocenione rozwiazania pk=" + str(sorted(solutions)) + ", obiekty SolutionExercise pk=" + str(sorted(solution_exercises)))
         except Exception as e:
             logger.info("Wystapil blad podczas zapisywania ocen - " + str(e))
             print(e)
@@ -797,6 +857,51 @@ class SolutionViewSet(viewsets.ModelViewSet):
         
         return Response({"message": "Zadanie zostalo ocenione"}, status=200) 
 
+# viewset ze zleceniami sprawdzenia rozwiazan - pozwala odpytywac o stan zlecenia
+class GradingJobViewSet(viewsets.ReadOnlyModelViewSet):
+    permission_classes = (IsAuthenticated,)
+    serializer_class = GradingJobSerializer
+
+    def get_queryset(self):
+        # uzytkownik widzi swoje zlecenia, nauczyciel rowniez zlecenia do swoich zadan
+        queryset = GradingJob.objects.filter(Q(user=self.request.user) | Q(task__author=self.request.user))
+        batch = self.request.query_params.get('batch')
+
+        if batch:
+            queryset = queryset.filter(batch=batch)
+
+        return queryset
+
+# statystyki czasow etapow sprawdzania rozwiazan (p50/p95/p99) z ostatnich zlecen
+class GradingMetricsView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        logger = logging.getLogger(self.__class__.__name__)
+
+        if get_request_user_type(request) == "Student":
+            return Response({"message": "Brak dostepu do statystyk"}, status=403)
+
+        try:
+            window = int(request.query_params.get('last', settings.GRADING_METRICS_WINDOW))
+        except ValueError:
+            return Response({"message": "Niepoprawny parametr last"}, status=400)
+
+        window = max(1, min(window, settings.GRADING_METRICS_WINDOW))
+        timings = GradingJob.objects.exclude(timings__isnull=True).order_by('-pk').values_list('timings', flat=True)[:window]
+        records = [json.loads(record) for record in timings]
+
+        logger.info("Zwracam statystyki czasow sprawdzania z " + str(len(records)) + " zlecen")
+        return Response({"jobs": len(records), "phases": get_phase_statistics(records)}, status=200)
+
+# metryki procesu w formacie Prometheusa - zwykly widok Django (bez uwierzytelniania JWT),
+# dostep mozna ograniczyc do adresow z METRICS_ALLOWED_IPS
+def metrics_view(request):
+    if settings.METRICS_ALLOWED_IPS is not None and request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponse(status=403)
+
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
+
 # Klasa obslugujaca resetowanie hasla
 class ResetPasswordHashView(APIView):
     def get(self, request, hash_string=None):
@@ -0,0 +1,796 @@
+import java.io.BufferedInputStream;
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.DataInputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.net.InetAddress;
+import java.net.ServerSocket;
+import java.net.Socket;
+import java.net.URI;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.DirectoryStream;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.Paths;
+import java.nio.file.StandardCopyOption;
+import java.security.MessageDigest;
+import java.security.NoSuchAlgorithmException;
+import java.security.Permission;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.HashMap;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.TreeMap;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.ExecutionException;
+import java.util.concurrent.Executors;
+import java.util.concurrent.FutureTask;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.TimeoutException;
+import java.util.concurrent.atomic.AtomicLong;
+
+import javax.tools.Diagnostic;
+import javax.tools.DiagnosticCollector;
+import javax.tools.FileObject;
+import javax.tools.ForwardingJavaFileManager;
+import javax.tools.JavaCompiler;
+import javax.tools.JavaFileManager;
+import javax.tools.JavaFileObject;
+import javax.tools.SimpleJavaFileObject;
+import javax.tools.StandardJavaFileManager;
+import javax.tools.ToolProvider;
+
+import org.junit.platform.engine.TestExecutionResult;
+import org.junit.platform.engine.TestSource;
+import org.junit.platform.engine.discovery.DiscoverySelectors;
+import org.junit.platform.engine.support.descriptor.MethodSource;
+import org.junit.platform.launcher.Launcher;
+import org.junit.platform.launcher.LauncherDiscoveryRequest;
+import org.junit.platform.launcher.TestExecutionListener;
+import org.junit.platform.launcher.TestIdentifier;
+import org.junit.platform.launcher.core.LauncherDiscoveryRequestBuilder;
+import org.junit.platform.launcher.core.LauncherFactory;
+
+/*
+ * Demon sprawdzajacy rozwiazania Java.
+ *
+ * Uruchamiany raz przez ServiceCore.jvm_daemon i wykorzystywany wielokrotnie.
+ * Nasluchuje na porcie lokalnym (wypisuje "PORT <numer> <0|1>" na standardowe wyjscie,
+ * 1 - System.exit w rozwiazaniach jest blokowane),
+ * kompiluje nadeslane zrodla w pamieci i uruchamia testy przez JUnit Platform Launcher.
+ *
+ * Zadanie:
+ *   FILE <nazwa pliku> <liczba bajtow>\n<zawartosc pliku>   (powtorzone dla kazdego pliku)
+ *   CACHE <katalog>\n                                      (opcjonalnie)
+ *   RUN <nazwa klasy z testami>\n
+ * Odpowiedz: jedna linia JSON z wynikiem kompilacji i wynikami poszczegolnych testow.
+ *
+ * Kazde zadanie sprawdzane jest w osobnym watku (i osobnej grupie watkow). Jezeli nie
+ * zakonczy sie w ciagu <limit czasu> sekund (argument wywolania, domyslnie 20), watki
+ * zadania sa przerywane i zatrzymywane, a odpowiedz zawiera "timeout": true oraz
+ * "stopped" - czy wszystkie watki zadania zakonczyly dzialanie (Thread.stop jest niedostepne
+ * od Java 20, a watek ignorujacy przerwanie dziala dalej - klient restartuje wtedy demona).
+ * System.exit wywolane przez rozwiazanie jest blokowane przez SecurityManager (Java 18-23
+ * wymaga -Djava.security.manager=allow).
+ *
+ * Jezeli podano katalog CACHE, skompilowane klasy testow sa w nim zapisywane
+ * (w podkatalogu o nazwie rownej skrotowi SHA-256 zrodla testow i wartosci stalych
+ * rozwiazania) i przy kolejnych rozwiazaniach kompilowany jest jedynie plik studenta.
+ * javac wstawia wartosci stalych (rowniez niejawnie statycznych stalych interfejsow)
+ * bezposrednio do klas testow, dlatego wartosci stalych odczytywane sa z atrybutow
+ * ConstantValue skompilowanych klas rozwiazania, a testy skompilowane wzgledem innych
+ * wartosci nie sa uzywane.
+ */
+public class GradingDaemon {
+
+    // skompilowane klasy testow: katalog cache + skrot zrodla -> nazwa klasy -> bajty
+    private static final Map<String, Map<String, byte[]>> TEST_CLASSES = new ConcurrentHashMap<>();
+
+    // grupa nadrzedna dla watkow sprawdzajacych rozwiazania (i watkow tworzonych przez rozwiazania)
+    private static final ThreadGroup GRADING_THREADS = new ThreadGroup("grading");
+    private static final AtomicLong REQUEST_NUMBER = new AtomicLong();
+    private static final long STOP_WAIT_MILLIS = 1000;
+
+    private static long requestTimeoutMillis = 20000;
+
+    public static void main(String[] args) throws IOException {
+        if (args.length > 0) {
+            requestTimeoutMillis = (long) (Double.parseDouble(args[0]) * 1000);
+        }
+
+        boolean exitBlocked = blockSystemExit();
+
+        ServerSocket server = new ServerSocket(0, 50, InetAddress.getLoopbackAddress());
+
+        System.out.println("PORT " + server.getLocalPort() + " " + (exitBlocked ? 1 : 0));
+        System.out.flush();
+
+        // wyjscie rozwiazan studentow nie jest nigdzie odczytywane
+        System.setOut(new PrintStream(new NullOutputStream()));
+        System.setErr(new PrintStream(new NullOutputStream()));
+
+        ExecutorService pool = Executors.newCachedThreadPool();
+
+        while (true) {
+            Socket socket = server.accept();
+            pool.submit(() -> handle(socket));
+        }
+    }
+
+    private static void handle(Socket socket) {
+        try (Socket client = socket) {
+            InputStream in = new BufferedInputStream(client.getInputStream());
+            Map<String, String> sources = new LinkedHashMap<>();
+            String testClassName = null;
+            String cacheDir = null;
+
+            while (true) {
+                String header = readLine(in);
+
+                if (header == null) {
+                    return;
+                }
+
+                if (header.startsWith("FILE ")) {
+                    int lengthSeparator = header.lastIndexOf(' ');
+                    String fileName = header.substring(5, lengthSeparator);
+                    int length = Integer.parseInt(header.substring(lengthSeparator + 1));
+                    sources.put(fileName, new String(readBytes(in, length), StandardCharsets.UTF_8));
+                } else if (header.startsWith("CACHE ")) {
+                    cacheDir = header.substring(6).trim();
+                } else if (header.startsWith("RUN ")) {
+                    testClassName = header.substring(4).trim();
+                    break;
+                }
+            }
+
+            String response = gradeWithTimeout(sources, testClassName, cacheDir);
+            OutputStream out = client.getOutputStream();
+            out.write((response + "\n").getBytes(StandardCharsets.UTF_8));
+            out.flush();
+        } catch (Exception e) {
+            // blad pojedynczego polaczenia nie moze zatrzymac demona
+        }
+    }
+
+    private static boolean blockSystemExit() {
+        try {
+            System.setSecurityManager(new ExitBlockingSecurityManager());
+            return true;
+        } catch (UnsupportedOperationException | SecurityException e) {
+            // JVM bez obslugi SecurityManager (Java 18+ bez -Djava.security.manager=allow, Java 24+)
+            return false;
+        }
+    }
+
+    private static String gradeWithTimeout(Map<String, String> sources, String testClassName, String cacheDir)
+            throws InterruptedException {
+        ThreadGroup requestThreads = new ThreadGroup(GRADING_THREADS, "request-" + REQUEST_NUMBER.incrementAndGet());
+        // grupa usuwana automatycznie po zakonczeniu ostatniego watku
+        requestThreads.setDaemon(true);
+        FutureTask<String> task = new FutureTask<>(() -> grade(sources, testClassName, cacheDir));
+        Thread worker = new Thread(requestThreads, task, requestThreads.getName());
+        worker.setDaemon(true);
+        worker.start();
+
+        try {
+            return task.get(requestTimeoutMillis, TimeUnit.MILLISECONDS);
+        } catch (TimeoutException e) {
+            return timeoutResult(testClassName, stopThreads(requestThreads));
+        } catch (ExecutionException e) {
+            return errorResult(testClassName, e.getCause());
+        }
+    }
+
+    @SuppressWarnings("deprecation")
+    private static boolean stopThreads(ThreadGroup threads) throws InterruptedException {
+        // najpierw przerwanie, a jezeli watki nadal dzialaja (np. petla nieskonczona) - zatrzymanie
+        // zwraca false, jezeli ktorys z watkow zadania nadal dziala
+        threads.interrupt();
+
+        if (waitForThreads(threads)) {
+            return true;
+        }
+
+        Thread[] active = new Thread[threads.activeCount() + 16];
+        int count = threads.enumerate(active, true);
+
+        for (int index = 0; index < count; index++) {
+            try {
+                active[index].stop();
+            } catch (Throwable e) {
+                // Thread.stop niedostepne (Java 20+) - watek pozostaje przerwany
+            }
+        }
+
+        return waitForThreads(threads);
+    }
+
+    private static boolean waitForThreads(ThreadGroup threads) throws InterruptedException {
+        long deadline = System.currentTimeMillis() + STOP_WAIT_MILLIS;
+
+        while (threads.activeCount() > 0 && System.currentTimeMillis() < deadline) {
+            Thread.sleep(10);
+        }
+
+        return threads.activeCount() == 0;
+    }
+
+    private static String timeoutResult(String testClassName, boolean stopped) {
+        return "{\"compiled\": true, \"compilationErrors\": \"\", \"timeout\": true, \"stopped\": " + stopped + ", \"tests\": [{\"name\": "
+               + json(testClassName) + ", \"status\": \"error\", \"duration\": " + (requestTimeoutMillis / 1000.0)
+               + ", \"message\": \"Przekroczono limit czasu wykonania testow\"}]}";
+    }
+
+    private static String errorResult(String testClassName, Throwable error) {
+        ResultListener listener = new ResultListener();
+        listener.addResult(testClassName, "error", 0.0, String.valueOf(error));
+        return listener.toJson();
+    }
+
+    private static String grade(Map<String, String> sources, String testClassName, String cacheDir) {
+        String testSource = sources.get(testClassName + ".java");
+        String cacheKey = null;
+
+        if (cacheDir != null && testSource != null) {
+            // kompilacja jedynie rozwiazania - klucz cache zalezy od wartosci jego stalych
+            Map<String, String> solutionSources = new LinkedHashMap<>(sources);
+            solutionSources.remove(testClassName + ".java");
+
+            DiagnosticCollector<JavaFileObject> diagnostics = new DiagnosticCollector<>();
+            Map<String, byte[]> classes = compile(solutionSources, diagnostics);
+
+            if (classes == null) {
+                return compilationError(diagnostics);
+            }
+
+            cacheKey = cacheDir + "/" + sha256(testSource + "\n" + constantValues(classes));
+            Map<String, byte[]> testClasses = loadTestClasses(cacheKey);
+
+            if (testClasses != null) {
+                // testy pochodza z cache
+                classes.putAll(testClasses);
+                ResultListener listener = runTests(classes, testClassName);
+
+                // rozwiazanie o innym interfejsie niz to, dla ktorego skompilowano testy
+                // wymaga ponownej kompilacji testow
+                if (!listener.linkageError) {
+                    return listener.toJson();
+                }
+            }
+        }
+
+        DiagnosticCollector<JavaFileObject> diagnostics = new DiagnosticCollector<>();
+        Map<String, byte[]> classes = compile(sources, diagnostics);
+
+        if (classes == null) {
+            return compilationError(diagnostics);
+        }
+
+        ResultListener listener = runTests(classes, testClassName);
+
+        // klasy testow zapisywane sa tylko wtedy, gdy rozwiazanie przeszlo wszystkie testy,
+        // czyli gdy zostaly skompilowane wzgledem poprawnego interfejsu rozwiazania
+        if (cacheKey != null && listener.allPassed()) {
+            storeTestClasses(cacheKey, classes, testClassName);
+        }
+
+        return listener.toJson();
+    }
+
+    private static String compilationError(DiagnosticCollector<JavaFileObject> diagnostics) {
+        StringBuilder errors = new StringBuilder();
+
+        for (Diagnostic<? extends JavaFileObject> diagnostic : diagnostics.getDiagnostics()) {
+            if (diagnostic.getKind() == Diagnostic.Kind.ERROR) {
+                String source = diagnostic.getSource() != null ? diagnostic.getSource().getName() : "";
+                errors.append(source).append(":").append(diagnostic.getLineNumber()).append(": ")
+                      .append(diagnostic.getMessage(null)).append("\n");
+            }
+        }
+
+        return "{\"compiled\": false, \"compilationErrors\": " + json(errors.toString()) + ", \"tests\": []}";
+    }
+
+    private static ResultListener runTests(Map<String, byte[]> classes, String testClassName) {
+        ClassLoader previousLoader = Thread.currentThread().getContextClassLoader();
+        MemoryClassLoader loader = new MemoryClassLoader(classes, GradingDaemon.class.getClassLoader());
+        ResultListener listener = new ResultListener();
+
+        try {
+            Thread.currentThread().setContextClassLoader(loader);
+            Class<?> testClass = loader.loadClass(testClassName);
+
+            LauncherDiscoveryRequest request = LauncherDiscoveryRequestBuilder.request()
+                    .selectors(DiscoverySelectors.selectClass(testClass))
+                    .build();
+
+            Launcher launcher = LauncherFactory.create();
+            launcher.execute(request, listener);
+        } catch (Throwable e) {
+            listener.addResult(testClassName, "error", 0.0, e.toString());
+        } finally {
+            Thread.currentThread().setContextClassLoader(previousLoader);
+        }
+
+        return listener;
+    }
+
+    private static boolean isTestClass(String className, String testClassName) {
+        return className.equals(testClassName) || className.startsWith(testClassName + "$");
+    }
+
+    private static Map<String, byte[]> loadTestClasses(String cacheKey) {
+        Map<String, byte[]> testClasses = TEST_CLASSES.get(cacheKey);
+
+        if (testClasses != null) {
+            return testClasses;
+        }
+
+        Path directory = Paths.get(cacheKey);
+
+        if (!Files.isDirectory(directory)) {
+            return null;
+        }
+
+        testClasses = new HashMap<>();
+
+        try (DirectoryStream<Path> classFiles = Files.newDirectoryStream(directory, "*.class")) {
+            for (Path classFile : classFiles) {
+                String fileName = classFile.getFileName().toString();
+                testClasses.put(fileName.substring(0, fileName.length() - ".class".length()), Files.readAllBytes(classFile));
+            }
+        } catch (IOException e) {
+            return null;
+        }
+
+        if (testClasses.isEmpty()) {
+            return null;
+        }
+
+        TEST_CLASSES.put(cacheKey, testClasses);
+        return testClasses;
+    }
+
+    private static void storeTestClasses(String cacheKey, Map<String, byte[]> classes, String testClassName) {
+        Map<String, byte[]> testClasses = new HashMap<>();
+
+        for (Map.Entry<String, byte[]> compiledClass : classes.entrySet()) {
+            if (isTestClass(compiledClass.getKey(), testClassName)) {
+                testClasses.put(compiledClass.getKey(), compiledClass.getValue());
+            }
+        }
+
+        TEST_CLASSES.put(cacheKey, testClasses);
+
+        // zapis na dysk do katalogu tymczasowego i zmiana nazwy, aby inne procesy
+        // nie odczytaly niekompletnego katalogu
+        Path directory = Paths.get(cacheKey);
+
+        if (Files.isDirectory(directory)) {
+            return;
+        }
+
+        try {
+            Files.createDirectories(directory.getParent());
+            Path temporaryDirectory = Files.createTempDirectory(directory.getParent(), "tmp-");
+
+            for (Map.Entry<String, byte[]> testClass : testClasses.entrySet()) {
+                Files.write(temporaryDirectory.resolve(testClass.getKey() + ".class"), testClass.getValue());
+            }
+
+            try {
+                Files.move(temporaryDirectory, directory, StandardCopyOption.ATOMIC_MOVE);
+            } catch (IOException e) {
+                // katalog zostal juz zapisany przez inny proces
+                for (Map.Entry<String, byte[]> testClass : testClasses.entrySet()) {
+                    Files.deleteIfExists(temporaryDirectory.resolve(testClass.getKey() + ".class"));
+                }
+                Files.deleteIfExists(temporaryDirectory);
+            }
+        } catch (IOException e) {
+            // brak zapisu na dysk - klasy pozostaja w pamieci
+        }
+    }
+
+    private static String constantValues(Map<String, byte[]> classes) {
+        // wartosci stalych (atrybuty ConstantValue pol) ze wszystkich klas rozwiazania
+        StringBuilder values = new StringBuilder();
+
+        for (Map.Entry<String, byte[]> compiledClass : new TreeMap<>(classes).entrySet()) {
+            values.append(compiledClass.getKey()).append("\n");
+
+            try {
+                appendConstantValues(compiledClass.getValue(), values);
+            } catch (IOException | RuntimeException e) {
+                // nieobslugiwany format klasy - klucz zalezy od calej klasy
+                values.append(sha256(new String(compiledClass.getValue(), StandardCharsets.ISO_8859_1))).append("\n");
+            }
+        }
+
+        return values.toString();
+    }
+
+    private static void appendConstantValues(byte[] classBytes, StringBuilder values) throws IOException {
+        DataInputStream in = new DataInputStream(new ByteArrayInputStream(classBytes));
+
+        if (in.readInt() != 0xCAFEBABE) {
+            throw new IOException("Niepoprawny plik klasy");
+        }
+
+        in.readUnsignedShort();
+        in.readUnsignedShort();
+
+        // pula stalych: teksty (Utf8), wartosci liczbowe i indeksy tekstow dla wpisow String
+        int constantPoolCount = in.readUnsignedShort();
+        String[] texts = new String[constantPoolCount];
+        String[] constants = new String[constantPoolCount];
+
+        for (int index = 1; index < constantPoolCount; index++) {
+            int tag = in.readUnsignedByte();
+
+            switch (tag) {
+                case 1:
+                    texts[index] = in.readUTF();
+                    break;
+                case 3:
+                    constants[index] = Integer.toString(in.readInt());
+                    break;
+                case 4:
+                    constants[index] = Float.toString(in.readFloat());
+                    break;
+                case 5:
+                    constants[index] = Long.toString(in.readLong());
+                    index++;
+                    break;
+                case 6:
+                    constants[index] = Double.toString(in.readDouble());
+                    index++;
+                    break;
+                case 8:
+                    constants[index] = "#" + in.readUnsignedShort();
+                    break;
+                case 7:
+                case 16:
+                case 19:
+                case 20:
+                    in.readUnsignedShort();
+                    break;
+                case 15:
+                    in.readUnsignedByte();
+                    in.readUnsignedShort();
+                    break;
+                case 9:
+                case 10:
+                case 11:
+                case 12:
+                case 17:
+                case 18:
+                    in.readInt();
+                    break;
+                default:
+                    throw new IOException("Nieznany wpis puli stalych: " + tag);
+            }
+        }
+
+        in.readUnsignedShort();
+        in.readUnsignedShort();
+        in.readUnsignedShort();
+        in.skipBytes(2 * in.readUnsignedShort());
+
+        int fieldsCount = in.readUnsignedShort();
+
+        for (int field = 0; field < fieldsCount; field++) {
+            in.readUnsignedShort();
+            String name = texts[in.readUnsignedShort()];
+            String descriptor = texts[in.readUnsignedShort()];
+            int attributesCount = in.readUnsignedShort();
+
+            for (int attribute = 0; attribute < attributesCount; attribute++) {
+                String attributeName = texts[in.readUnsignedShort()];
+                int length = in.readInt();
+
+                if (!"ConstantValue".equals(attributeName)) {
+                    in.skipBytes(length);
+                    continue;
+                }
+
+                String value = constants[in.readUnsignedShort()];
+
+                if (value != null && value.startsWith("#")) {
+                    value = json(texts[Integer.parseInt(value.substring(1))]);
+                }
+
+                values.append(name).append(" ").append(descriptor).append(" = ").append(value).append("\n");
+            }
+        }
+    }
+
+    private static String sha256(String value) {
+        try {
+            MessageDigest digest = MessageDigest.getInstance("SHA-256");
+            StringBuilder hex = new StringBuilder();
+
+            for (byte hashByte : digest.digest(value.getBytes(StandardCharsets.UTF_8))) {
+                hex.append(String.format("%02x", hashByte));
+            }
+
+            return hex.toString();
+        } catch (NoSuchAlgorithmException e) {
+            throw new IllegalStateException(e);
+        }
+    }
+
+    private static Map<String, byte[]> compile(Map<String, String> sources, DiagnosticCollector<JavaFileObject> diagnostics) {
+        JavaCompiler compiler = ToolProvider.getSystemJavaCompiler();
+        StandardJavaFileManager standardManager = compiler.getStandardFileManager(diagnostics, null, StandardCharsets.UTF_8);
+        MemoryFileManager fileManager = new MemoryFileManager(standardManager);
+
+        List<JavaFileObject> units = new ArrayList<>();
+
+        for (Map.Entry<String, String> source : sources.entrySet()) {
+            units.add(new SourceFile(source.getKey(), source.getValue()));
+        }
+
+        List<String> options = Arrays.asList("-classpath", System.getProperty("java.class.path"), "-encoding", "UTF-8");
+        boolean compiled = compiler.getTask(null, fileManager, diagnostics, options, null, units).call();
+
+        return compiled ? fileManager.getClasses() : null;
+    }
+
+    private static String readLine(InputStream in) throws IOException {
+        ByteArrayOutputStream line = new ByteArrayOutputStream();
+        int character;
+
+        while ((character = in.read()) != -1) {
+            if (character == '\n') {
+                return new String(line.toByteArray(), StandardCharsets.UTF_8);
+            }
+            line.write(character);
+        }
+
+        return line.size() > 0 ? new String(line.toByteArray(), StandardCharsets.UTF_8) : null;
+    }
+
+    private static byte[] readBytes(InputStream in, int length) throws IOException {
+        byte[] buffer = new byte[length];
+        int offset = 0;
+
+        while (offset < length) {
+            int read = in.read(buffer, offset, length - offset);
+
+            if (read == -1) {
+                throw new IOException("Niekompletne zadanie");
+            }
+            offset += read;
+        }
+
+        return buffer;
+    }
+
+    static String json(String value) {
+        if (value == null) {
+            return "null";
+        }
+
+        StringBuilder escaped = new StringBuilder("\"");
+
+        for (char character : value.toCharArray()) {
+            switch (character) {
+                case '"': escaped.append("\\\""); break;
+                case '\\': escaped.append("\\\\"); break;
+                case '\n': escaped.append("\\n"); break;
+                case '\r': escaped.append("\\r"); break;
+                case '\t': escaped.append("\\t"); break;
+                default:
+                    if (character < 0x20) {
+                        escaped.append(String.format("\\u%04x", (int) character));
+                    } else {
+                        escaped.append(character);
+                    }
+            }
+        }
+
+        return escaped.append("\"").toString();
+    }
+
+    // zbiera wyniki poszczegolnych testow
+    static class ResultListener implements TestExecutionListener {
+        final List<String> results = new ArrayList<>();
+        boolean linkageError = false;
+        private boolean failures = false;
+        private final Map<String, Long> startTimes = new HashMap<>();
+
+        boolean allPassed() {
+            return !failures && !results.isEmpty();
+        }
+
+        String toJson() {
+            return "{\"compiled\": true, \"compilationErrors\": \"\", \"tests\": [" + String.join(", ", results) + "]}";
+        }
+
+        void addResult(String name, String status, double duration, String message) {
+            if (!status.equals("passed")) {
+                failures = true;
+            }
+
+            results.add("{\"name\": " + json(name) + ", \"status\": " + json(status)
+                        + ", \"duration\": " + duration + ", \"message\": " + json(message) + "}");
+        }
+
+        private String testName(TestIdentifier identifier) {
+            if (identifier.getSource().isPresent()) {
+                TestSource source = identifier.getSource().get();
+
+                if (source instanceof MethodSource) {
+                    return ((MethodSource) source).getMethodName();
+                }
+            }
+
+            return identifier.getDisplayName();
+        }
+
+        @Override
+        public void executionStarted(TestIdentifier identifier) {
+            startTimes.put(identifier.getUniqueId(), System.nanoTime());
+        }
+
+        @Override
+        public void executionSkipped(TestIdentifier identifier, String reason) {
+            if (identifier.isTest()) {
+                addResult(testName(identifier), "skipped", 0.0, reason);
+            }
+        }
+
+        @Override
+        public void executionFinished(TestIdentifier identifier, TestExecutionResult result) {
+            Long start = startTimes.remove(identifier.getUniqueId());
+            double duration = start == null ? 0.0 : (System.nanoTime() - start) / 1e9;
+            String message = result.getThrowable().map(Throwable::toString).orElse(null);
+
+            if (result.getThrowable().isPresent() && result.getThrowable().get() instanceof LinkageError) {
+                linkageError = true;
+            }
+
+            if (identifier.isTest()) {
+                String status;
+
+                if (result.getStatus() == TestExecutionResult.Status.SUCCESSFUL) {
+                    status = "passed";
+                } else if (result.getStatus() == TestExecutionResult.Status.ABORTED) {
+                    status = "skipped";
+                } else if (result.getThrowable().isPresent() && result.getThrowable().get() instanceof AssertionError) {
+                    status = "failed";
+                } else {
+                    status = "error";
+                }
+
+                addResult(testName(identifier), status, duration, message);
+            } else if (result.getStatus() == TestExecutionResult.Status.FAILED) {
+                // blad na poziomie klasy (np. wyjatek w konstruktorze)
+                addResult(identifier.getDisplayName(), "error", duration, message);
+            }
+        }
+    }
+
+    static class SourceFile extends SimpleJavaFileObject {
+        private final String content;
+
+        SourceFile(String fileName, String content) {
+            super(URI.create("string:///" + fileName), JavaFileObject.Kind.SOURCE);
+            this.content = content;
+        }
+
+        @Override
+        public CharSequence getCharContent(boolean ignoreEncodingErrors) {
+            return content;
+        }
+    }
+
+    static class ClassFile extends SimpleJavaFileObject {
+        private final ByteArrayOutputStream bytes = new ByteArrayOutputStream();
+
+        ClassFile(String className) {
+            super(URI.create("bytes:///" + className.replace('.', '/') + ".class"), JavaFileObject.Kind.CLASS);
+        }
+
+        @Override
+        public OutputStream openOutputStream() {
+            return bytes;
+        }
+
+        byte[] getBytes() {
+            return bytes.toByteArray();
+        }
+    }
+
+    static class MemoryFileManager extends ForwardingJavaFileManager<StandardJavaFileManager> {
+        private final Map<String, ClassFile> classFiles = new LinkedHashMap<>();
+
+        MemoryFileManager(StandardJavaFileManager fileManager) {
+            super(fileManager);
+        }
+
+        @Override
+        public JavaFileObject getJavaFileForOutput(JavaFileManager.Location location, String className,
+                                                   JavaFileObject.Kind kind, FileObject sibling) {
+            ClassFile classFile = new ClassFile(className);
+            classFiles.put(className, classFile);
+            return classFile;
+        }
+
+        Map<String, byte[]> getClasses() {
+            Map<String, byte[]> classes = new HashMap<>();
+
+            for (Map.Entry<String, ClassFile> classFile : classFiles.entrySet()) {
+                classes.put(classFile.getKey(), classFile.getValue().getBytes());
+            }
+
+            return classes;
+        }
+    }
+
+    static class MemoryClassLoader extends ClassLoader {
+        private final Map<String, byte[]> classes;
+
+        MemoryClassLoader(Map<String, byte[]> classes, ClassLoader parent) {
+            super(parent);
+            this.classes = new ConcurrentHashMap<>(classes);
+        }
+
+        @Override
+        protected Class<?> findClass(String name) throws ClassNotFoundException {
+            byte[] bytes = classes.get(name);
+
+            if (bytes == null) {
+                throw new ClassNotFoundException(name);
+            }
+
+            return defineClass(name, bytes, 0, bytes.length);
+        }
+    }
+
+    // blokuje System.exit, Runtime.halt i zmiane SecurityManager w watkach sprawdzajacych rozwiazania,
+    // pozostale uprawnienia bez zmian
+    static class ExitBlockingSecurityManager extends SecurityManager {
+        private boolean isGradingThread() {
+            ThreadGroup group = Thread.currentThread().getThreadGroup();
+            return group != null && GRADING_THREADS.parentOf(group);
+        }
+
+        @Override
+        public void checkPermission(Permission permission) {
+            if (permission instanceof RuntimePermission && permission.getName().equals("setSecurityManager") && isGradingThread()) {
+                throw new SecurityException("Zmiana SecurityManager w rozwiazaniu jest niedozwolona");
+            }
+        }
+
+        @Override
+        public void checkPermission(Permission permission, Object context) {
+            checkPermission(permission);
+        }
+
+        @Override
+        public void checkExit(int status) {
+            if (isGradingThread()) {
+                throw new SecurityException("Wywolanie System.exit w rozwiazaniu jest niedozwolone");
+            }
+        }
+    }
+
+    static class NullOutputStream extends OutputStream {
+        @Override
+        public void write(int b) {
+        }
+
+        @Override
+        public void write(byte[] b, int off, int len) {
+        }
+    }
+}
@@ -20,6 +20,61 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 MAVEN_HOME = '/usr/share/maven/bin/mvn'
 
+# Kolejka sprawdzania rozwiazan (GradingJob)
+# GRADING_QUEUE_ASYNC = False - rozwiazanie sprawdzane od razu w procesie serwera
+GRADING_QUEUE_ASYNC = True
+GRADING_WORKER_POLL_INTERVAL = 1.0
+GRADING_JOB_STALE_TIMEOUT = 600
+# liczba watkow sprawdzajacych rozwiazania przy ponownym sprawdzaniu (regrade)
+GRADING_REGRADE_WORKERS = 4
+# zapis czasow etapow kazdego zlecenia w logu logs/grading_timings.log (wiersz JSON)
+GRADING_TIMINGS_LOG = False
+# liczba ostatnich zlecen, z ktorych liczone sa statystyki etapow (grading_metrics/)
+GRADING_METRICS_WINDOW = 1000
+# adresy, z ktorych mozna pobrac metryki /metrics (None - bez ograniczen)
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+# adres, na ktorym workery udostepniaja metryki (run_grading_workers --metrics-port, '' - wszystkie interfejsy)
+METRICS_SERVER_ADDRESS = '127.0.0.1'
+# zadania wolniejsze niz SLOW_REQUEST_THRESHOLD sekund lub wykonujace co najmniej SLOW_REQUEST_QUERY_THRESHOLD
+# zapytan SQL zapisywane sa w logu razem z SLOW_REQUEST_TOP_QUERIES najczesciej powtarzanymi zapytaniami
+SLOW_REQUEST_THRESHOLD = 1.0
+SLOW_REQUEST_QUERY_THRESHOLD = 50
+SLOW_REQUEST_TOP_QUERIES = 5
+
+# Demon JVM sprawdzajacy rozwiazania Java (java_daemon/src/GradingDaemon.java)
+# Maven (MAVEN_HOME) wykorzystywany jest jedynie gdy demon jest niedostepny
+JAVA_GRADING_DAEMON_ENABLED = True
+JAVA_BIN = '/usr/bin/java'
+JAVAC_BIN = '/usr/bin/javac'
+JUNIT_PLATFORM_CONSOLE_JAR = '/usr/share/java/junit-platform-console-standalone.jar'
+JAVA_GRADING_DAEMON_SOURCE_DIR = os.path.join(BASE_DIR, 'java_daemon', 'src')
+JAVA_GRADING_DAEMON_BUILD_DIR = os.path.join(BASE_DIR, 'java_daemon', 'classes')
+# limit czasu sprawdzania jednego rozwiazania w demonie (watek rozwiazania jest zatrzymywany)
+# oraz dluzszy limit oczekiwania na odpowiedz demona, po ktorym demon jest restartowany
+JAVA_GRADING_TEST_TIMEOUT = 20
+JAVA_GRADING_DAEMON_TIMEOUT = 30
+
+# Testy rozwiazan Python uruchamiane w procesach forkservera (ServiceCore.python_runner)
+# Limit czasu procesora i czasu oczekiwania w sekundach, limit pamieci w bajtach
+PYTHON_RUNNER_ENABLED = True
+PYTHON_RUNNER_TIMEOUT = 10
+PYTHON_RUNNER_MEMORY_LIMIT = 512 * 1024 * 1024
+
+# Piaskownice (ServiceCore.sandbox_pool), w ktorych testowane sa rozwiazania - katalogi w pamieci RAM (tmpfs)
+# GRADING_SANDBOX_POOL_SIZE - liczba przygotowanych piaskownic dla kazdego jezyka w procesie workera
+GRADING_SANDBOX_ENABLED = True
+GRADING_SANDBOX_ROOT = '/dev/shm/grading-sandboxes'
+GRADING_SANDBOX_POOL_SIZE = 4
+
+# Pamiec podreczna wynikow sprawdzania identycznych rozwiazan (liczba wynikow w procesie)
+GRADING_RESULT_CACHE_SIZE = 1024
+
+# Pamiec podreczna zawartosci plikow z rozwiazaniami odczytywanych przez serializery (liczba plikow)
+FILE_CONTENT_CACHE_SIZE = 2048
+
+# Pamiec podreczna rodzajow uzytkownikow (ServiceCore.user_types), gdy token JWT nie zawiera claimu user_type
+USER_TYPE_CACHE_SIZE = 4096
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.1/howto/deployment/checklist/
 
@@ -52,6 +107,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'ServiceCore.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -148,6 +204,13 @@ CORS_ORIGIN_WHITELIST = (
     'localhost:8000',
 )
 
+# naglowki z liczba zapytan SQL (MetricsMiddleware, tryb DEBUG) dostepne dla aplikacji klienckiej
+CORS_EXPOSE_HEADERS = (
+    'X-Query-Count',
+    'X-Query-Repeated',
+    'X-Query-Time',
+)
+
 # Konfiguracja Rest Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -172,6 +235,10 @@ LOGGING = {
         'standard': {
             'format': '{asctime} {levelname} {module} {filename} {name} {funcName} {lineno} {message}',
             'style': '{'
+        },
+        'json_line': {
+            'format': '{message}',
+            'style': '{'
         }
     },
 
@@ -189,6 +256,13 @@ LOGGING = {
         },
         'console': {
             'class': 'logging.StreamHandler',
+        },
+        'grading_timings': {
+            'level': 'INFO',
+            'class': 'logging.FileHandler',
+            'filename': os.path.join(BASE_DIR, 'logs', 'grading_timings.log'),
+            'formatter': 'json_line',
+            'delay': True
         }
     },
     'loggers': {
@@ -201,7 +275,12 @@ LOGGING = {
             'handlers': ['file', 'console'],
             'level': 'INFO',
             'propagate': False,
-        },    
+        },
+        'grading.timings': {
+            'handlers': ['grading_timings'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 